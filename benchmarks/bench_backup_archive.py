@@ -0,0 +1,56 @@
+# Benchmark for archive-mode backups on a synthetic world.
+#   python benchmarks/bench_backup_archive.py --regions 64 --levels 1 6 --threads 1 4
+
+import os
+import sys
+import random
+import argparse
+import resource
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.backup_manager import archive_server
+
+def make_world(root, regions, region_kb):
+    rng = random.Random(1)
+    server = Path(root) / "bench_server"
+    region_dir = server / "world" / "region"
+    region_dir.mkdir(parents=True)
+    # Region payloads are already zlib-compressed chunks in real worlds, so
+    # random bytes are a fair stand-in.
+    for i in range(regions):
+        with open(region_dir / f"r.{i % 8}.{i // 8}.mca", "wb") as f:
+            f.write(os.urandom(region_kb * 1024))
+    words = ["stone", "dirt", "grass", "player", "joined", "left", "tick", "chunk"]
+    for i in range(200):
+        with open(server / "world" / f"data_{i}.json", "w") as f:
+            f.write(" ".join(rng.choice(words) for _ in range(4000)))
+    with open(server / "server.properties", "w") as f:
+        f.write("motd=bench\nmax-players=20\n")
+    return server
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--regions", type=int, default=64)
+    parser.add_argument("--region-kb", type=int, default=4096)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 6])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = make_world(tmp, args.regions, args.region_kb)
+        print(f"{'level':>5} {'threads':>7} {'MB':>8} {'MB/s':>8} {'ratio':>6} {'time s':>7}")
+        for level in args.levels:
+            for threads in sorted(set(args.threads)):
+                archive = Path(tmp) / f"bench_{level}_{threads}.tar.gz"
+                report = archive_server(server, archive, level=level, threads=threads)
+                print(f"{level:>5} {threads:>7} {report['bytes_in'] / 2**20:>8.1f} "
+                      f"{report['mb_per_s']:>8.1f} {report['ratio']:>6.2f} {report['duration']:>7.2f}")
+                archive.unlink()
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f"peak RSS: {peak / 1024:.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# GC log parser throughput on a synthetic log built from the fixtures.
+#   python benchmarks/bench_gc_log.py --mb 500
+
+import re
+import sys
+import time
+import argparse
+import resource
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from core.gc_log import GCLogTailer
+
+FIXTURE = ROOT / "benchmarks" / "fixtures" / "gc" / "g1.log"
+GC_ID = re.compile(r"GC\((\d+)\)")
+UPTIME = re.compile(r"\[(\d+\.\d+)s\]")
+
+def write_log(path, target_bytes):
+    template = FIXTURE.read_text().splitlines(keepends=True)
+    written = 0
+    rounds = 0
+    with open(path, "w") as f:
+        while written < target_bytes:
+            base_id = rounds * 10
+            base_time = rounds * 120.0
+            for line in template:
+                line = GC_ID.sub(lambda m: f"GC({int(m.group(1)) + base_id})", line)
+                line = UPTIME.sub(lambda m: f"[{float(m.group(1)) + base_time:.3f}s]", line)
+                f.write(line)
+                written += len(line)
+            rounds += 1
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mb", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_log(Path(tmp) / "gc.log", args.mb * 1024 * 1024)
+        started = time.perf_counter()
+        summary = GCLogTailer(tmp).poll()
+        elapsed = time.perf_counter() - started
+        again = time.perf_counter()
+        GCLogTailer(tmp).poll()
+        reread = time.perf_counter() - again
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f"lines: {summary['lines']}  pauses: {summary['pauses']}  p99: {summary['pause_p99_ms']} ms")
+        print(f"parse: {elapsed:.2f}s  {summary['lines'] / elapsed:,.0f} lines/s  {args.mb / elapsed:.1f} MB/s")
+        print(f"resume from saved offset: {reread * 1000:.1f} ms")
+        print(f"peak RSS: {peak / 1024:.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# Measures how long autosave stays paused during ServerManager.hot_backup,
+# using benchmarks/stub_server.py in place of java.
+#   python benchmarks/bench_hot_backup.py --regions 64 --runs 5
+
+import os
+import sys
+import argparse
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+STUB = ROOT / "benchmarks" / "stub_server.py"
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--regions", type=int, default=64)
+    parser.add_argument("--region-kb", type=int, default=1024)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--mode", default="archive", choices=["copy", "archive", "incremental"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        from core.server_manager import ServerManager
+
+        manager = ServerManager(server_path="servers", starters_path="starters")
+        manager.JAVA_PATH = str(STUB)
+        region_dir = Path("servers/bench/world/region")
+        region_dir.mkdir(parents=True)
+        for i in range(args.regions):
+            with open(region_dir / f"r.{i % 8}.{i // 8}.mca", "wb") as f:
+                f.write(os.urandom(args.region_kb * 1024))
+
+        manager.start_server("bench")
+        pauses = []
+        try:
+            for _ in range(args.runs):
+                report = manager.hot_backup("bench", mode=args.mode, background=False)
+                pauses.append(report["pause_ms"])
+                print(f"pause {report['pause_ms']:8.1f} ms  snapshot {report['snapshot']}  -> {report['backup']}")
+        finally:
+            manager.stop_server("bench", deadline=10)
+        pauses.sort()
+        print(f"min {pauses[0]:.1f} ms  median {pauses[len(pauses) // 2]:.1f} ms  max {pauses[-1]:.1f} ms")
+
+if __name__ == "__main__":
+    main()
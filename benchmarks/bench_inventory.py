@@ -0,0 +1,115 @@
+# Server list cost with a large fleet: the old listdir + isdir scan and
+# QListWidget rebuild per refresh versus the cached inventory (cold sweep,
+# warm sweep, sweep after one server changed) and diff-applying Qt model.
+#   python benchmarks/bench_inventory.py --servers 500
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+def build_fleet(servers_dir, servers, regions, libraries):
+    # Roughly the shape of a modded server: a world with a few dimensions,
+    # logs, and a deep libraries/ tree
+    for i in range(servers):
+        server = servers_dir / f"srv{i:03d}"
+        for dimension in ("world/region", "world/DIM-1/region", "world/DIM1/region", "world/entities", "world/poi"):
+            (server / dimension).mkdir(parents=True)
+            for r in range(regions):
+                with open(server / dimension / f"r.{r}.0.mca", "wb") as f:
+                    f.truncate(8192 * (1 + r % 4))
+        (server / "logs").mkdir()
+        for day in range(10):
+            (server / "logs" / f"2024-01-{day + 1:02d}-1.log.gz").write_bytes(b"x" * 2000)
+        for lib in range(libraries):
+            lib_dir = server / "libraries" / "org" / f"group{lib % 5}" / f"artifact{lib}" / "1.0"
+            lib_dir.mkdir(parents=True)
+            (lib_dir / f"artifact{lib}-1.0.jar").write_bytes(b"x" * 4096)
+        (server / "server.properties").write_text("motd=A Minecraft Server\n")
+        with open(server / "config.json", "w") as f:
+            json.dump({"starter": f"Fabric 1.21.{i % 6}.jar"}, f)
+
+def median_ms(function, runs):
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--servers", type=int, default=500)
+    parser.add_argument("--regions", type=int, default=20, help="region files per dimension")
+    parser.add_argument("--libraries", type=int, default=40, help="library jars per server, one directory chain each")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication, QListWidget, QTableView
+    from core.inventory import Inventory, POLL_INTERVAL, USAGE_INTERVAL
+    from gui.server_model import ServerTableModel
+
+    app = QApplication([])
+    with tempfile.TemporaryDirectory() as tmp:
+        servers_dir = Path(tmp) / "servers"
+        started = time.perf_counter()
+        build_fleet(servers_dir, args.servers, args.regions, args.libraries)
+        dirs = sum(1 for _ in os.walk(servers_dir))
+        print(f"built {args.servers} servers ({dirs} directories) in {time.perf_counter() - started:.1f}s")
+
+        # Before: listdir + isdir per entry, and a full QListWidget rebuild on every refresh
+        def old_list():
+            return [f for f in os.listdir(servers_dir) if os.path.isdir(servers_dir / f)]
+        widget = QListWidget()
+        def old_refresh():
+            widget.clear()
+            for server in old_list():
+                widget.addItem(server)
+        print(f"\nold list_servers():          {median_ms(old_list, args.runs):8.2f} ms (names only)")
+        print(f"old refresh_servers():       {median_ms(old_refresh, args.runs):8.2f} ms (rebuilds every row)")
+
+        inventory = Inventory(servers_dir)
+        listing_ms = median_ms(lambda: inventory.refresh(measure=False), 1)
+        started = time.perf_counter()
+        inventory.refresh()
+        cold_ms = (time.perf_counter() - started) * 1000
+        print(f"\ninventory listing + configs: {listing_ms:8.2f} ms (first paint: names, loader, version)")
+        print(f"inventory cold sweep:        {cold_ms:8.2f} ms (disk usage of {dirs} directories)")
+        print(f"inventory warm sweep:        {median_ms(inventory.refresh, args.runs):8.2f} ms "
+              f"(nothing changed; re-checks 1/{USAGE_INTERVAL / POLL_INTERVAL:.0f} of the fleet)")
+        full_ms = median_ms(lambda: [inventory.usage.measure(str(servers_dir / name)) for name in inventory.names()], 3)
+        print(f"  (re-checking every server:  {full_ms:8.2f} ms)")
+
+        target = servers_dir / "srv007" / "world" / "region"
+        def one_change():
+            (target / f"r.{time.perf_counter_ns()}.mca").write_bytes(b"x" * 4096)
+            inventory.invalidate(str(target))
+            inventory.refresh()
+        print(f"sweep after one new file:    {median_ms(one_change, args.runs):8.2f} ms")
+        snapshot = inventory.snapshot()
+        actual = sum(p.stat().st_size for p in (servers_dir / "srv007").rglob("*") if p.is_file())
+        assert snapshot["srv007"]["disk_bytes"] == actual, (snapshot["srv007"]["disk_bytes"], actual)
+        print(f"loader/version of srv005:    {snapshot['srv005']['loader']} {snapshot['srv005']['version']}")
+
+        model = ServerTableModel(inventory)
+        view = QTableView()
+        view.setModel(model)
+        app.processEvents()
+        states = iter(["running", "stopped"] * args.runs)
+        def process_event():
+            inventory.set_processes([{"name": "srv123", "pid": 4242, "state": next(states)}], replace=True)
+            app.processEvents()
+        print(f"\nmodel update, one state change:  {median_ms(process_event, args.runs):6.2f} ms (one row repainted)")
+        assert model.rowCount() == args.servers
+        model.unsubscribe()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# Builds a fleet of servers with rotated .log.gz archives and a latest.log
+# each, then times the first full ingest, an incremental update after new
+# lines arrive, and fleet-wide queries against the index versus scanning
+# every file for the text (what searching without the index costs).
+#   python benchmarks/bench_log_index.py --servers 40 --archives 20 --lines 1500
+
+import sys
+import gzip
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+PLAYERS = ["Steve", "Alex", "Notch", "jeb_", "Dinnerbone", "Grumm", "Herobrine", "xX_Miner_Xx"]
+MESSAGES = [
+    ("INFO", "{p} joined the game"),
+    ("INFO", "{p} left the game"),
+    ("INFO", "<{p}> anyone got spare iron? need {n} for a beacon"),
+    ("INFO", "{p} has made the advancement [Stone Age]"),
+    ("INFO", "Saving the game (this may take a moment!)"),
+    ("INFO", "Saved the game"),
+    ("WARN", "Can't keep up! Is the server overloaded? Running {n}ms or {t} ticks behind"),
+    ("WARN", "{p} moved too quickly! -{n}.5,0.0,{t}.25"),
+    ("ERROR", "Encountered an unexpected exception"),
+]
+
+def log_text(rng, lines, start_seconds=8 * 3600):
+    # Timestamps advance a few seconds per line and wrap past midnight
+    out = []
+    seconds = start_seconds
+    for _ in range(lines):
+        seconds = (seconds + rng.randint(1, 20)) % 86400
+        level, message = rng.choice(MESSAGES)
+        stamp = f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+        out.append(f"[{stamp}] [Server thread/{level}]: " + message.format(p=rng.choice(PLAYERS), n=rng.randint(1, 9999), t=rng.randint(1, 200)))
+        if level == "ERROR":
+            out.append("java.lang.NullPointerException: null")
+            out.append("\tat net.minecraft.server.MinecraftServer.tick(MinecraftServer.java:1043)")
+    return "\n".join(out) + "\n"
+
+def build_fleet(servers_dir, servers, archives, lines, seed=1):
+    rng = random.Random(seed)
+    size = 0
+    for i in range(servers):
+        logs = servers_dir / f"srv{i:03d}" / "logs"
+        logs.mkdir(parents=True)
+        for day in range(archives):
+            name = (date(2024, 1, 1) + timedelta(days=day)).isoformat()
+            data = log_text(rng, lines).encode()
+            size += len(data)
+            with gzip.open(logs / f"{name}-1.log.gz", "wb", compresslevel=6) as f:
+                f.write(data)
+        data = log_text(rng, lines).encode()
+        size += len(data)
+        (logs / "latest.log").write_bytes(data)
+    return size
+
+def scan(servers_dir, needle):
+    # The no-index baseline: decompress and read every log looking for the text
+    hits = 0
+    for path in servers_dir.glob("*/logs/*"):
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+            hits += sum(needle in line for line in f)
+    return hits
+
+def timed(function, runs):
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = function()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times), result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--servers", type=int, default=40)
+    parser.add_argument("--archives", type=int, default=20, help="rotated .log.gz files per server")
+    parser.add_argument("--lines", type=int, default=1500, help="lines per log file")
+    parser.add_argument("--append", type=int, default=200, help="new latest.log lines per server before the update")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    from core.log_index import LogIndex
+
+    with tempfile.TemporaryDirectory() as tmp:
+        servers_dir = Path(tmp) / "servers"
+        started = time.perf_counter()
+        raw = build_fleet(servers_dir, args.servers, args.archives, args.lines)
+        files = args.servers * (args.archives + 1)
+        print(f"built {args.servers} servers, {files} log files, {raw / 2**20:.0f} MB of log text "
+              f"in {time.perf_counter() - started:.1f}s")
+
+        index = LogIndex(Path(tmp) / "log_index.db")
+        report = index.update(servers_dir)
+        stats = index.stats()
+        print(f"initial ingest: {report['lines']} lines in {report['seconds']:.1f}s "
+              f"({report['lines'] / report['seconds']:.0f} lines/s), index {stats['bytes'] / 2**20:.0f} MB")
+
+        report = index.update(servers_dir)
+        print(f"no-op update:   {report['seconds'] * 1000:.1f} ms (nothing new, {files} files checked)")
+        rng = random.Random(2)
+        for i in range(args.servers):
+            with open(servers_dir / f"srv{i:03d}" / "logs" / "latest.log", "a") as f:
+                f.write(log_text(rng, args.append, 20 * 3600))
+        report = index.update(servers_dir)
+        print(f"incremental:    {report['lines']} new lines in {report['seconds'] * 1000:.0f} ms")
+        assert index.stats()["lines"] == stats["lines"] + report["lines"]
+
+        newest = index.search(limit=1)[0]["time"]
+        queries = {
+            "phrase, fleet-wide": dict(text="Can't keep up"),
+            "rare word, fleet-wide": dict(text="NullPointerException"),
+            "phrase + server + 3 days": dict(text="joined the game", servers=["srv007"], since=newest - 3 * 86400),
+            "level + 1 day": dict(levels=["ERROR"], since=newest - 86400),
+            "latest 100 lines, any text": dict(),
+            "FTS: beacon AND iron NOT Steve": dict(match="beacon AND iron NOT Steve"),
+        }
+        print(f"\nqueries (median of {args.runs}, newest 100 results):")
+        for label, query in queries.items():
+            ms, rows = timed(lambda: index.search(**query), args.runs)
+            print(f"  {label:<32} {ms:7.2f} ms  {len(rows):3d} rows")
+
+        ms, hits = timed(lambda: scan(servers_dir, "Can't keep up"), 1)
+        count = len(index.search(text="Can't keep up", limit=10 ** 9))
+        print(f"\nwithout the index (decompress and scan every file): {ms:.0f} ms for 'Can't keep up' ({hits} lines)")
+        assert hits == count, (hits, count)
+        index.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# Latency of logging calls while several "servers" stream console-rate
+# records, with the handlers attached directly (writes, rotation and gzip on
+# the caller's thread) versus behind the QueueHandler from core.logs.
+#   python benchmarks/bench_logging.py --servers 8 --lines 20000
+
+import sys
+import gzip
+import time
+import logging
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+LINE = "[12:00:00] [Server thread/INFO]: <Player{n}> building a fairly long line of chat so it looks like a console line"
+
+def stream(name, lines, rate, latencies, start):
+    from core.logs import log_event
+    start.wait()
+    local = []
+    first = time.perf_counter()
+    for n in range(lines):
+        if rate and n % 50 == 0:
+            time.sleep(max(0, first + n / rate - time.perf_counter()))
+        began = time.perf_counter_ns()
+        log_event("console", LINE.format(n=n), server=name, pid=1000)
+        local.append(time.perf_counter_ns() - began)
+    latencies.extend(local)
+
+def run(mode, directory, args):
+    from core.config import DEFAULT_CONFIG
+    from core.logs import build_handlers, setup_logging, stop_logging, LOG_NAME
+    config = {**DEFAULT_CONFIG, "log_level": "INFO", "log_max_mb": args.max_mb, "log_backups": 500,
+              "log_json": True, "log_per_server": True}
+    root = logging.getLogger()
+    if mode == "direct":
+        handlers = build_handlers(config, directory)
+        root.setLevel(logging.INFO)
+        for handler in handlers:
+            root.addHandler(handler)
+    else:
+        setup_logging(config, console=False, log_dir=directory)
+
+    latencies = []
+    start = threading.Event()
+    threads = [threading.Thread(target=stream, args=(f"srv{i}", args.lines, args.rate, latencies, start)) for i in range(args.servers)]
+    for thread in threads:
+        thread.start()
+    began = time.perf_counter()
+    start.set()
+    for thread in threads:
+        thread.join()
+    calls_s = time.perf_counter() - began
+    if mode == "direct":
+        for handler in handlers:
+            root.removeHandler(handler)
+            handler.close()
+    else:
+        stop_logging()
+    total_s = time.perf_counter() - began
+
+    # Every record must have reached manager.log (rotated parts included)
+    written = 0
+    for path in Path(directory).glob(LOG_NAME + "*"):
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt") as f:
+            written += sum(1 for _ in f)
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] / 1000
+    count = len(latencies)
+    print(f"{mode:<7} p50 {pick(0.5):7.1f} us  p99 {pick(0.99):8.1f} us  p99.9 {pick(0.999):8.1f} us  "
+          f"max {latencies[-1] / 1e6:7.1f} ms | {count / calls_s:8.0f} calls/s, all written after {total_s:.2f}s, "
+          f"{len(list(Path(directory).rglob('*.gz')))} rotated files")
+    assert written == count, (written, count)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--servers", type=int, default=8)
+    parser.add_argument("--lines", type=int, default=20000, help="log calls per server")
+    parser.add_argument("--rate", type=float, default=1000, help="lines/s per server, 0 = as fast as possible")
+    parser.add_argument("--max-mb", type=float, default=2, help="rotation size, small to force rotations")
+    args = parser.parse_args()
+    rate = f"{args.rate:.0f} lines/s each" if args.rate else "flat out"
+    print(f"{args.servers} threads x {args.lines} records ({rate}), JSON + per-server files, rotate at {args.max_mb} MB")
+    for mode in ("direct", "queued"):
+        with tempfile.TemporaryDirectory() as tmp:
+            run(mode, tmp, args)
+
+if __name__ == "__main__":
+    main()
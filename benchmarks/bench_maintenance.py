@@ -0,0 +1,124 @@
+# What a backup does to a live server's chunk saves: a stand-in server
+# process writes and fsyncs a region-sized block every tick while a copy
+# backup of a large world runs, first at full speed on a plain thread (the
+# old behaviour), then as a maintenance job with a bandwidth limit and low
+# priority. Reports save latency percentiles and how long each backup took.
+#   python benchmarks/bench_maintenance.py --world-mb 400 --limit-mb 40
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import statistics
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+TICK = 0.05
+# Separate process, like the JVM, so it doesn't share our GIL
+SERVER = """
+import os, sys, time
+data = os.urandom(int(sys.argv[2]) * 1024)
+with open(sys.argv[1], "wb") as f:
+    while True:
+        started = time.perf_counter()
+        f.seek(0)
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+        elapsed = time.perf_counter() - started
+        print(elapsed * 1000, flush=True)
+        time.sleep(max(0.0, float(sys.argv[3]) - elapsed))
+"""
+
+def build_world(world_dir, megabytes):
+    region = world_dir / "world" / "region"
+    region.mkdir(parents=True)
+    block = os.urandom(1024 * 1024)
+    for i in range(megabytes // 8):
+        with open(region / f"r.{i}.0.mca", "wb") as f:
+            for _ in range(8):
+                f.write(block)
+
+def saves_during(function, save_path, save_kb):
+    # Runs `function` while the stand-in server saves every tick; returns
+    # (seconds, save latencies in ms while it ran)
+    proc = subprocess.Popen([sys.executable, "-c", SERVER, str(save_path), str(save_kb), str(TICK)],
+                            stdout=subprocess.PIPE, text=True)
+    latencies = []
+    recording = threading.Event()
+
+    def read():
+        for line in proc.stdout:
+            if recording.is_set():
+                latencies.append(float(line))
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    time.sleep(1.0)  # let it settle
+    recording.set()
+    started = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - started
+    recording.clear()
+    proc.terminate()
+    proc.wait()
+    reader.join()
+    return seconds, latencies
+
+def report(label, seconds, latencies):
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"{label:<34} backup {seconds:6.1f}s   saves p50 {statistics.median(ordered):6.2f} ms  "
+          f"p99 {p99:7.2f} ms  max {ordered[-1]:7.2f} ms  ({len(ordered)} saves)")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--world-mb", type=int, default=400)
+    parser.add_argument("--limit-mb", type=float, default=40, help="read/write limit for the throttled run, MB/s")
+    parser.add_argument("--save-kb", type=int, default=256, help="bytes fsynced per tick by the stand-in server")
+    parser.add_argument("--dir", help="where to build the world (default: a temp dir; use the disk servers live on)")
+    args = parser.parse_args()
+
+    from core.backup_manager import backup_server
+    from core.maintenance import MaintenanceScheduler, TokenBucket
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        tmp = Path(tmp)
+        server_dir = tmp / "survival"
+        build_world(server_dir, args.world_mb)
+        save_path = tmp / "live.mca"
+        print(f"{args.world_mb} MB world, {args.save_kb} KB fsynced every {TICK * 1000:.0f} ms\n")
+
+        def full_speed():
+            backup_server(str(server_dir), "copy")
+        report("full speed, caller's thread", *saves_during(full_speed, save_path, args.save_kb))
+
+        limit = int(args.limit_mb * 2**20)
+        scheduler = MaintenanceScheduler(workers=1, read_rate=limit, write_rate=limit)
+        scheduler.start()
+
+        def throttled():
+            job = scheduler.submit("Backup survival", lambda job: backup_server(str(server_dir), "copy"))
+            job.total = args.world_mb * 2**20
+            job.future.result()
+        report(f"maintenance job, {args.limit_mb:.0f} MB/s, low", *saves_during(throttled, save_path, args.save_kb))
+        scheduler.stop()
+
+        # The limiter itself: how close the achieved rate gets to the target
+        bucket = TokenBucket(limit)
+        bucket.take(limit)  # spend the initial burst
+        started = time.perf_counter()
+        moved = 0
+        while moved < 3 * limit:
+            time.sleep(bucket.take(256 * 1024))
+            moved += 256 * 1024
+        rate = moved / (time.perf_counter() - started) / 2**20
+        print(f"\ntoken bucket: {rate:.1f} MB/s achieved for a {args.limit_mb:.0f} MB/s limit")
+
+if __name__ == "__main__":
+    main()
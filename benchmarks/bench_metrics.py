@@ -0,0 +1,46 @@
+# Measures MetricsSampler overhead against N idle child processes.
+#   python benchmarks/bench_metrics.py --servers 50 --seconds 30
+
+import sys
+import time
+import argparse
+import subprocess
+from pathlib import Path
+import psutil
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.metrics import MetricsSampler
+
+BUDGET = 0.01  # fraction of one core
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--servers", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--interval", type=float, default=1.0)
+    args = parser.parse_args()
+
+    # Each fake server has one child, like a wrapper script launching java.
+    script = "import subprocess, sys; subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(3600)']).wait()"
+    procs = [subprocess.Popen([sys.executable, "-c", script]) for _ in range(args.servers)]
+    try:
+        sampler = MetricsSampler(lambda: {f"server{i}": p.pid for i, p in enumerate(procs)}, interval=args.interval)
+        sampler.start()
+        time.sleep(args.seconds)
+        sampler.stop()
+        overhead = sampler.overhead()
+        p = sampler.percentiles("server0", "rss")
+        print(f"servers: {args.servers}  samples/server: {sampler.servers['server0'].samples}")
+        print(f"sampler CPU: {sampler.cpu_time:.3f}s over {sampler.wall_time:.1f}s = {overhead * 100:.3f}% of a core")
+        print(f"server0 RSS p50/p95: {p.get(50, 0) / 2**20:.1f} / {p.get(95, 0) / 2**20:.1f} MB")
+        print("PASS" if overhead < BUDGET else f"FAIL: over the {BUDGET * 100:.0f}% budget")
+        return 0 if overhead < BUDGET else 1
+    finally:
+        for proc in procs:
+            for child in psutil.Process(proc.pid).children(recursive=True):
+                child.kill()
+            proc.kill()
+
+if __name__ == "__main__":
+    sys.exit(main())
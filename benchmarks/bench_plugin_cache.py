@@ -0,0 +1,146 @@
+# Plugin download cache against a local HTTP server that speaks ETag, Range
+# and If-Range: a cold batch install across servers, the same batch again
+# (revalidation only) and pinned by hash (no requests). Then two checks on
+# interrupted downloads: a resume fetches only the missing bytes, and a file
+# that changed upstream in between is downloaded afresh instead of spliced.
+# Exits non-zero when a check fails.
+#   python benchmarks/bench_plugin_cache.py --plugins 20 --servers 10
+
+import os
+import sys
+import time
+import hashlib
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like a real mirror
+    files = {}  # name -> bytes
+    cut = {}  # name -> body bytes to send before dropping the connection (once)
+    requests = 0
+    body_bytes = 0
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        data = self.files.get(self.path.lstrip("/"))
+        with self.lock:
+            Handler.requests += 1
+        if data is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        etag = f'"{hashlib.sha256(data).hexdigest()[:16]}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        start = 0
+        if self.headers.get("Range") and self.headers.get("If-Range", etag) == etag:
+            start = int(self.headers["Range"].split("=")[1].split("-")[0])
+        body = data[start:]
+        self.send_response(206 if start else 200)
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        self.send_header("ETag", etag)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        cut = self.cut.pop(self.path.lstrip("/"), None)
+        if cut is not None:
+            body = body[:cut]
+            self.close_connection = True
+        self.wfile.write(body)
+        with self.lock:
+            Handler.body_bytes += len(body)
+
+def served(function):
+    # (seconds, requests, body bytes) for one call
+    requests, body_bytes = Handler.requests, Handler.body_bytes
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started, Handler.requests - requests, Handler.body_bytes - body_bytes
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--plugins", type=int, default=20)
+    parser.add_argument("--servers", type=int, default=10)
+    parser.add_argument("--kb", type=int, default=512, help="size of each plugin jar")
+    args = parser.parse_args()
+
+    from core.plugin_manager import PluginCache, install_plugins
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        cache = PluginCache(str(tmp / "cache"))
+        for i in range(args.plugins):
+            Handler.files[f"plugin{i}.jar"] = os.urandom(args.kb * 1024)
+        servers = [str(tmp / "servers" / f"srv{i}") for i in range(args.servers)]
+        urls = [f"{base}/plugin{i}.jar" for i in range(args.plugins)]
+        print(f"{args.plugins} plugins of {args.kb} KB on {args.servers} servers")
+
+        for label, jobs in (("cold", [(s, u) for s in servers for u in urls]),
+                            ("again (revalidate)", [(s, u) for s in servers for u in urls]),
+                            ("pinned by sha256", [(s, u, hashlib.sha256(Handler.files[u.rsplit("/", 1)[1]]).hexdigest())
+                                                  for s in servers for u in urls])):
+            results = []
+            seconds, requests, body_bytes = served(lambda: results.extend(install_plugins(jobs, cache=cache)))
+            errors = [r["error"] for r in results if "error" in r]
+            if errors:
+                failures.append(f"{label}: {errors[0]}")
+            print(f"  {label:<20} {seconds * 1000:8.1f} ms  {requests:4d} requests  {body_bytes / 2**20:7.1f} MB")
+
+        # Interrupted halfway, then resumed: only the rest is sent
+        data = Handler.files["big.jar"] = os.urandom(4 * 2**20)
+        Handler.cut["big.jar"] = len(data) // 2
+        try:
+            cache.fetch(f"{base}/big.jar")
+            failures.append("the interrupted download did not fail")
+        except Exception:
+            pass
+        partial = sum(os.path.getsize(p) for p in Path(cache.partial_dir).iterdir() if p.suffix != ".json")
+        _, _, body_bytes = served(lambda: cache.fetch(f"{base}/big.jar"))
+        blob = cache.blob_path(hashlib.sha256(data).hexdigest())
+        ok = os.path.exists(blob) and body_bytes == len(data) - partial
+        print(f"\nresume after {partial / 2**20:.1f} MB: {body_bytes / 2**20:.1f} MB re-sent, "
+              f"{'hash ok' if os.path.exists(blob) else 'HASH MISMATCH'}")
+        if not ok:
+            failures.append("resume did not continue where it stopped")
+
+        # Interrupted, then the file changes upstream: If-Range must make the
+        # server send the whole new file rather than its tail
+        Handler.files["changing.jar"] = os.urandom(4 * 2**20)
+        Handler.cut["changing.jar"] = 2**20
+        try:
+            cache.fetch(f"{base}/changing.jar")
+        except Exception:
+            pass
+        data = Handler.files["changing.jar"] = os.urandom(4 * 2**20)
+        path = cache.fetch(f"{base}/changing.jar")
+        ok = Path(path).read_bytes() == data
+        print(f"changed upstream mid-download: {'restarted from zero' if ok else 'CORRUPT (old head + new tail)'}")
+        if not ok:
+            failures.append("a resumed download spliced two versions of the file")
+    server.shutdown()
+
+    if failures:
+        print("\nFAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nOK")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+# Scale suite for the manager's own operations. For each fleet size it lays
+# out synthetic servers (server.properties, config.json, a few plugin jars),
+# runs stub servers (benchmarks/stub_server.py) under the daemon and times
+# ServerManager.list_servers/create_server/update_settings, a fleet-wide
+# properties edit, start and stop latency and peak RSS of the GUI-side
+# process and the daemon. Once per run: backups of a fake world with
+# thousands of region files, list_plugins and install_plugin against a
+# local HTTP server.
+#
+# Every run is appended to a JSON-lines history (metric -> value, lower is
+# better). --compare checks the run against the previous record, or the last
+# record of --baseline, and exits 1 on a regression; --check compares the
+# last two records of the history without running anything.
+#   python benchmarks/bench_scale.py --scales 1,50,500
+#   python benchmarks/bench_scale.py --scales 1,50 --compare --threshold 0.25
+#   python benchmarks/bench_scale.py --check
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import zipfile
+import argparse
+import platform
+import tempfile
+import threading
+import statistics
+import subprocess
+from pathlib import Path
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+STUB = ROOT / "benchmarks" / "stub_server.py"
+RESULTS = ROOT / "benchmarks" / "results" / "scale.jsonl"
+STARTER = "stub.jar"
+PLUGINS_PER_SERVER = 5
+# Differences below these are noise whatever the ratio says
+FLOORS = {"ms": 5.0, "s": 0.1, "mb": 10.0}
+
+# --- Fixtures ---
+def make_plugin(path, name, depends=()):
+    with zipfile.ZipFile(path, "w") as jar:
+        jar.writestr("plugin.yml", f"name: {name}\nversion: 1.{len(name)}.0\nmain: bench.{name}.Main\n"
+                                   + (f"depend: [{', '.join(depends)}]\n" if depends else ""))
+        jar.writestr(f"bench/{name}/Main.class", os.urandom(4096))
+
+def build_server(server_dir, index):
+    from core.provisioning import DEFAULT_PROPERTIES
+    (server_dir / "plugins").mkdir(parents=True)
+    # A port of its own per server, as a real fleet would have
+    (server_dir / "server.properties").write_text(DEFAULT_PROPERTIES + f"server-port={30000 + index}\n")
+    with open(server_dir / "config.json", "w") as f:
+        json.dump({"starter": STARTER}, f)
+    for i in range(PLUGINS_PER_SERVER):
+        make_plugin(server_dir / "plugins" / f"Plugin{i}.jar", f"Plugin{i}", [f"Plugin{i - 1}"] if i else [])
+
+def build_world(server_dir, regions, region_kb):
+    # Small random region files: incompressible, like real chunk data
+    region = server_dir / "world" / "region"
+    region.mkdir(parents=True, exist_ok=True)
+    block = os.urandom(region_kb * 1024)
+    for i in range(regions):
+        (region / f"r.{i % 64}.{i // 64}.mca").write_bytes(block[i % 512:] + block[:i % 512])
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+def serve(directory):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), lambda *a: QuietHandler(*a, directory=str(directory)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+# --- Measurement ---
+class PeakRSS:
+    # Samples resident memory of this process and the daemon (not its
+    # servers) until stopped; reset() starts a new window.
+    def __init__(self, daemon_pid, interval=0.05):
+        import psutil
+        self.processes = {"rss_peak_mb": psutil.Process(), "daemon_rss_peak_mb": psutil.Process(daemon_pid)}
+        self.interval = interval
+        self.peaks = dict.fromkeys(self.processes, 0.0)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            for key, process in self.processes.items():
+                try:
+                    self.peaks[key] = max(self.peaks[key], process.memory_info().rss / 2**20)
+                except Exception:
+                    pass
+
+    def reset(self):
+        peaks, self.peaks = self.peaks, dict.fromkeys(self.processes, 0.0)
+        return peaks
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+def timed_ms(function):
+    started = time.perf_counter()
+    function()
+    return (time.perf_counter() - started) * 1000
+
+def median_ms(function, runs):
+    return statistics.median(timed_ms(function) for _ in range(runs))
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def wait_for_daemon(timeout=10):
+    from core.supervisor_client import SupervisorClient
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return SupervisorClient.connect(spawn=False)
+        except (ConnectionError, OSError):
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+def measure_scale(manager, names, runs, metrics, scale):
+    from core.properties import apply_changes
+
+    def put(key, value):
+        metrics[f"{key}@{scale}"] = round(value, 3)
+        print(f"  {key:<28} {value:10.2f}")
+
+    manager.inventory.refresh(measure=False)
+    put("list_servers_ms", median_ms(manager.list_servers, runs))
+    put("inventory_sweep_ms", median_ms(lambda: manager.inventory.refresh(), runs))
+    assert len(manager.list_servers()) == len(names)
+
+    created = [f"new{i}" for i in range(runs)]
+    times = [timed_ms(lambda: manager.create_server(name, STARTER).future.result()) for name in created]
+    put("create_server_ms", statistics.median(times))
+    for name in created:
+        shutil.rmtree(manager.server_path / name)
+
+    motd = iter(["Bench A", "Bench B"] * runs)
+    put("update_settings_ms", median_ms(lambda: manager.update_settings(names[0], next(motd), 20), runs))
+    distance = iter([6, 10] * runs)
+    dirs = [manager.server_path / name for name in names]
+    put("props_fleet_ms", median_ms(lambda: apply_changes(dirs, {"view-distance": next(distance)}), runs))
+
+    # Start every server, then stop every server, one call at a time
+    client = manager.client
+    started = time.perf_counter()
+    calls = [timed_ms(lambda: client.start(name, xms=64, xmx=64)) for name in names]
+    while any(s["state"] == "starting" for s in client.list()):
+        time.sleep(0.05)
+    put("start_all_ready_s", time.perf_counter() - started)
+    put("start_call_p50_ms", statistics.median(calls))
+    put("start_call_p95_ms", percentile(calls, 0.95))
+    started = time.perf_counter()
+    calls = [timed_ms(lambda: client.stop(name)) for name in names]
+    put("stop_all_s", time.perf_counter() - started)
+    put("stop_p50_ms", statistics.median(calls))
+    put("stop_p95_ms", percentile(calls, 0.95))
+
+def measure_once(tmp, args, metrics):
+    from core.backup_manager import backup_server
+    from core.plugin_manager import PluginManager
+
+    def put(key, value):
+        metrics[key] = round(value, 3)
+        print(f"  {key:<28} {value:10.2f}")
+
+    world = Path("servers", "srv0")
+    build_world(world, args.regions, args.region_kb)
+    print(f"\nworld: {args.regions} region files of {args.region_kb} KB")
+    put("backup_copy_s", timed_ms(lambda: backup_server(str(world), "copy")) / 1000)
+    put("backup_archive_s", timed_ms(lambda: backup_server(str(world), "archive")) / 1000)
+    put("backup_incremental_first_s", timed_ms(lambda: backup_server(str(world), "incremental")) / 1000)
+    put("backup_incremental_again_s", timed_ms(lambda: backup_server(str(world), "incremental")) / 1000)
+
+    plugins = PluginManager(world)
+    plugins.list_plugins(detailed=True)
+    os.remove(world / "plugin_index.json")
+    put("list_plugins_cold_ms", timed_ms(lambda: plugins.list_plugins(detailed=True)))
+    put("list_plugins_ms", median_ms(lambda: plugins.list_plugins(detailed=True), args.runs))
+
+    web = tmp / "web"
+    web.mkdir()
+    for i in range(args.runs):
+        make_plugin(web / f"Remote{i}.jar", f"Remote{i}")
+    server, base = serve(web)
+    try:
+        # A new URL every time is a download; the same URLs again on another
+        # server only revalidate against the cache
+        urls = iter(f"{base}/Remote{i}.jar" for i in range(args.runs))
+        put("install_plugin_ms", median_ms(lambda: plugins.install_plugin(next(urls)), args.runs))
+        other = PluginManager(Path("servers", "srv1") if Path("servers", "srv1").exists() else tmp / "other")
+        urls = iter(f"{base}/Remote{i}.jar" for i in range(args.runs))
+        put("install_plugin_cached_ms", median_ms(lambda: other.install_plugin(next(urls)), args.runs))
+    finally:
+        server.shutdown()
+
+def run(args):
+    scales = sorted(int(n) for n in args.scales.split(","))
+    metrics = {}
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        tmp = Path(tmp)
+        os.chdir(tmp)
+        Path("moonlight").mkdir()
+        with open("moonlight/config.json", "w") as f:
+            json.dump({"memory_budget_mb": 10 ** 7}, f)  # don't let the budget cap a stub fleet
+        Path("assets", "Server Starters").mkdir(parents=True)
+        Path("assets", "Server Starters", STARTER).write_bytes(random.randbytes(8 * 2**20))
+
+        daemon = subprocess.Popen([sys.executable, "-m", "core.supervisor", "--java", str(STUB)],
+                                  env={**os.environ, "PYTHONPATH": str(ROOT)},
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_daemon().close()
+            os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+            import main as gui
+
+            rss = PeakRSS(daemon.pid)
+            names = []
+            for scale in scales:
+                # The fleet grows from one scale to the next
+                while len(names) < scale:
+                    names.append(f"srv{len(names)}")
+                    build_server(Path("servers", names[-1]), len(names))
+                print(f"\n{scale} server(s)")
+                rss.reset()
+                manager = gui.ServerManager()
+                try:
+                    measure_scale(manager, names, args.runs, metrics, scale)
+                finally:
+                    manager.scheduler.stop()
+                    manager.client.close()
+                for key, value in rss.reset().items():
+                    metrics[f"{key}@{scale}"] = round(value, 1)
+                    print(f"  {key:<28} {value:10.2f}")
+            measure_once(tmp, args, metrics)
+            rss.stop()
+
+            client = wait_for_daemon()
+            client.shutdown()
+            daemon.wait(timeout=120)
+        finally:
+            if daemon.poll() is None:
+                daemon.kill()
+            os.chdir(ROOT)
+    return metrics
+
+# --- History ---
+def git_commit():
+    try:
+        result = subprocess.run(["git", "-C", str(ROOT), "rev-parse", "--short", "HEAD"],
+                                capture_output=True, text=True, timeout=10)
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+def load_history(path):
+    if not Path(path).exists():
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def save_record(path, record):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(record, sort_keys=True) + "\n")
+
+def compare(old, new, threshold):
+    # Returns regression messages; prints every metric both runs have
+    regressions = []
+    if old.get("config") != new.get("config"):
+        print(f"\nnote: runs used different settings ({old.get('config')} vs {new.get('config')})")
+    print(f"\n{'metric':<36} {'before':>10} {'after':>10} {'change':>8}   ({old.get('commit')} -> {new.get('commit')})")
+    for key in sorted(set(old["metrics"]) & set(new["metrics"])):
+        before, after = old["metrics"][key], new["metrics"][key]
+        change = (after - before) / before if before else 0.0
+        floor = FLOORS[key.split("@")[0].rsplit("_", 1)[-1]]
+        regressed = after > before * (1 + threshold) and after - before > floor
+        print(f"{key:<36} {before:10.2f} {after:10.2f} {change:+8.0%}" + ("   REGRESSED" if regressed else ""))
+        if regressed:
+            regressions.append(f"{key}: {before:.2f} -> {after:.2f} ({change:+.0%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", default="1,50,500", help="fleet sizes, comma-separated")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--regions", type=int, default=3000, help="region files in the fake world")
+    parser.add_argument("--region-kb", type=int, default=16)
+    parser.add_argument("--dir", help="where to build the fleet (default: a temp dir)")
+    parser.add_argument("--results", default=str(RESULTS), help="JSON-lines history to append to")
+    parser.add_argument("--label", help="free-form note stored with the record")
+    parser.add_argument("--no-save", action="store_true", help="don't append this run to the history")
+    parser.add_argument("--compare", action="store_true", help="compare with the previous record")
+    parser.add_argument("--baseline", help="history file whose last record to compare with (implies --compare)")
+    parser.add_argument("--check", action="store_true", help="only compare the last two records of --results")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    args = parser.parse_args()
+
+    history = load_history(args.results)
+    if args.check:
+        if len(history) < 2:
+            sys.exit(f"{args.results}: need two records to compare, have {len(history)}")
+        old, new = history[-2:]
+    else:
+        new = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": git_commit(), "label": args.label,
+               "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+               "config": {"scales": args.scales, "runs": args.runs, "regions": args.regions,
+                          "region_kb": args.region_kb},
+               "metrics": run(args)}
+        if not args.no_save:
+            save_record(args.results, new)
+            print(f"\nappended to {args.results}")
+        if not (args.compare or args.baseline):
+            return
+        baseline = load_history(args.baseline) if args.baseline else history
+        if not baseline:
+            print("\nno earlier record to compare with")
+            return
+        old = baseline[-1]
+
+    regressions = compare(old, new, args.threshold)
+    if regressions:
+        print("\nREGRESSION:\n  " + "\n  ".join(regressions))
+        sys.exit(1)
+    print(f"\nOK: nothing slower than {args.threshold:.0%} over the previous run")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# Cold-start cost of the CLI: wall time per command and what it imports
+# (python -X importtime). Exits non-zero when `status` goes over budget or a
+# light command pulls in a heavy module, so it can gate changes.
+#   python benchmarks/bench_startup.py --budget-ms 100
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+STUB = ROOT / "benchmarks" / "stub_server.py"
+CLI = str(ROOT / "cli.py")
+# Must never be imported by the commands below
+HEAVY = ("PyQt5", "psutil", "requests", "asyncio")
+COMMANDS = (["status"], ["list"], ["--help"])
+
+def wall_ms(argv, runs, env):
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, *argv], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append((time.perf_counter() - started) * 1000)
+    times.sort()
+    return times[len(times) // 2]
+
+def import_profile(argv, env):
+    # Top-level imports and their cumulative microseconds, minus the
+    # interpreter's own start-up (site and whatever .pth files it runs).
+    result = subprocess.run([sys.executable, "-X", "importtime", *argv], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    top, modules = {}, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules.add(name.strip().split(".")[0])
+        if not name.startswith("  "):
+            top[name.strip()] = int(cumulative)
+    top.pop("site", None)
+    return top, modules
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--servers", type=int, default=20)
+    parser.add_argument("--running", type=int, default=3, help="stub servers running under a daemon")
+    parser.add_argument("--budget-ms", type=float, default=100)
+    args = parser.parse_args()
+
+    from core.supervisor_client import SupervisorClient
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        Path("moonlight").mkdir()
+        with open("moonlight/config.json", "w") as f:
+            json.dump({"memory_budget_mb": 10 ** 7}, f)
+        for i in range(args.servers):
+            Path("servers", f"srv{i}").mkdir(parents=True)
+        env = {**os.environ, "PYTHONPATH": str(ROOT)}
+
+        baseline = wall_ms(["-c", "pass"], args.runs, env)
+        print(f"interpreter start-up (python -c pass): {baseline:.1f} ms")
+
+        daemon = None
+        for phase in ("no daemon", "daemon"):
+            if phase == "daemon":
+                if not args.running:
+                    break
+                daemon = subprocess.Popen([sys.executable, "-m", "core.supervisor", "--java", str(STUB)],
+                                          env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                deadline = time.monotonic() + 10
+                while True:
+                    try:
+                        client = SupervisorClient.connect(spawn=False)
+                        break
+                    except (ConnectionError, OSError):
+                        if time.monotonic() > deadline:
+                            raise
+                        time.sleep(0.05)
+                for i in range(args.running):
+                    client.start(f"srv{i}", xms=64, xmx=64)
+            try:
+                print(f"\n{phase} ({args.servers} servers, {args.running if daemon else 0} running)")
+                for command in COMMANDS:
+                    ms = wall_ms([CLI, *command], args.runs, env)
+                    top, modules = import_profile([CLI, *command], env)
+                    heavy = sorted(modules.intersection(HEAVY))
+                    slowest = sorted(top.items(), key=lambda item: -item[1])[:4]
+                    print(f"  {' '.join(command):<8} {ms:6.1f} ms wall, {sum(top.values()) / 1000:5.1f} ms importing: "
+                          + ", ".join(f"{name} {us / 1000:.1f}" for name, us in slowest))
+                    if heavy:
+                        failures.append(f"'{' '.join(command)}' imports {', '.join(heavy)}")
+                    if command == ["status"] and ms > args.budget_ms:
+                        failures.append(f"'status' took {ms:.1f} ms with {phase}, budget {args.budget_ms:.0f} ms")
+            finally:
+                if daemon is not None:
+                    client.shutdown()
+                    daemon.wait(timeout=60)
+
+        gui_ms = wall_ms(["-c", "import main"], 3, {**env, "QT_QPA_PLATFORM": "offscreen"})
+        print(f"\nfor reference, importing the GUI (main.py): {gui_ms:.1f} ms")
+
+    if failures:
+        print("\nREGRESSION:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print(f"\nOK: status under {args.budget_ms:.0f} ms, no heavy imports")
+
+if __name__ == "__main__":
+    main()
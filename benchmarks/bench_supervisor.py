@@ -0,0 +1,93 @@
+# Starts N stub servers under the supervisor daemon and reports start
+# latency, console round-trip latency, daemon thread count and shutdown time.
+#   python benchmarks/bench_supervisor.py --servers 100
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+STUB = ROOT / "benchmarks" / "stub_server.py"
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--servers", type=int, default=100)
+    parser.add_argument("--pings", type=int, default=50)
+    args = parser.parse_args()
+
+    import psutil
+    from core.supervisor_client import SupervisorClient
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        Path("moonlight").mkdir()
+        with open("moonlight/config.json", "w") as f:
+            json.dump({"memory_budget_mb": 10 ** 7}, f)  # don't let the budget cap a stub fleet
+        names = [f"bench{i}" for i in range(args.servers)]
+        for name in names:
+            Path("servers", name).mkdir(parents=True)
+
+        env = {**os.environ, "PYTHONPATH": str(ROOT)}
+        daemon = subprocess.Popen(
+            [sys.executable, "-m", "core.supervisor", "--java", str(STUB)],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            deadline = time.monotonic() + 10
+            while True:
+                try:
+                    client = SupervisorClient.connect(spawn=False)
+                    break
+                except (ConnectionError, OSError):
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.05)
+
+            started = time.perf_counter()
+            for name in names:
+                client.start(name, xms=64, xmx=64)
+            start_s = time.perf_counter() - started
+            while any(s["state"] == "starting" for s in client.list()):
+                time.sleep(0.1)
+            ready_s = time.perf_counter() - started
+            print(f"start   {args.servers} servers: {start_s:.2f}s to spawn, {ready_s:.2f}s until all ready")
+            print(f"daemon  {psutil.Process(daemon.pid).num_threads()} threads for {args.servers} servers")
+
+            # Console round trip: send "list", wait for the reply on the follow stream
+            events = client.follow(names[0])
+            for event in events:
+                if event["event"] == "ready":
+                    break
+            latencies = []
+            for _ in range(args.pings):
+                sent = time.perf_counter()
+                client.send(names[0], "list")
+                for event in events:
+                    if event["event"] == "line" and "players online" in event["text"]:
+                        break
+                latencies.append((time.perf_counter() - sent) * 1000)
+            events.close()
+            latencies.sort()
+            print(f"console round trip: median {latencies[len(latencies) // 2]:.2f} ms, max {latencies[-1]:.2f} ms")
+
+            started = time.perf_counter()
+            client.metrics(seconds=120)
+            print(f"metrics query: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+            started = time.perf_counter()
+            client.shutdown()
+            daemon.wait(timeout=120)
+            print(f"shutdown (stops all servers): {time.perf_counter() - started:.2f}s")
+        finally:
+            if daemon.poll() is None:
+                daemon.kill()
+
+if __name__ == "__main__":
+    main()
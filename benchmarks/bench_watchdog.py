@@ -0,0 +1,110 @@
+# Injects faults into stub servers under the supervisor and reports how long
+# the watchdog takes to notice each one, plus the crash-loop restart backoff.
+#   python benchmarks/bench_watchdog.py
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+STUB = ROOT / "benchmarks" / "stub_server.py"
+FAULT_AT = 1.0  # seconds after "Done"
+
+# scenario -> (STUB_SCRIPT, watchdog overrides, alert that ends it)
+SCENARIOS = {
+    "lag": (f"{FAULT_AT}:lag 20000", {}, "lagging"),
+    "low tps": (f"{FAULT_AT}:tps 8", {"probe_command": "tps"}, "lagging"),
+    "watchdog line": (f"{FAULT_AT}:watchdog", {}, "hung"),
+    "silent hang": (f"{FAULT_AT}:hang", {}, "hung"),
+    "crash": (f"{FAULT_AT}:crash", {}, "crashed"),
+}
+
+def start_daemon(script):
+    env = {**os.environ, "PYTHONPATH": str(ROOT), "STUB_SCRIPT": script}
+    return subprocess.Popen(
+        [sys.executable, "-m", "core.supervisor", "--java", str(STUB)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+def connect():
+    from core.supervisor_client import SupervisorClient
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            return SupervisorClient.connect(spawn=False)
+        except (ConnectionError, OSError):
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+def run(name, script, settings, expect=None):
+    # Seconds from the fault to the expected alert; without `expect`, waits
+    # for the watchdog to give up and returns the restart alerts instead.
+    with open(Path("servers", name, "config.json"), "w") as f:
+        json.dump({"watchdog": settings}, f)
+    daemon = start_daemon(script)
+    client = None
+    try:
+        client = connect()
+        client.start(name, xms=64, xmx=64)
+        if expect is None:
+            while True:
+                alerts = client.health(name)["alerts"]
+                if any(a["kind"] == "gave_up" for a in alerts):
+                    return [a["detail"] for a in alerts if a["kind"] == "restart"]
+                time.sleep(0.1)
+        events = client.follow(name)
+        fault = None
+        for event in events:
+            if event["event"] == "ready" and fault is None:
+                fault = time.monotonic() + FAULT_AT
+            elif event["event"] == "alert" and event["kind"] == expect:
+                events.close()
+                return time.monotonic() - fault
+        raise RuntimeError(f"'{name}' exited without a '{expect}' alert")
+    finally:
+        if client is not None:
+            for server in client.list():
+                if server["state"] != "exited":
+                    client.stop(server["name"], 0.5)
+            client.shutdown()
+        daemon.wait(timeout=60)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--probe-interval", type=float, default=1.0)
+    parser.add_argument("--hung-timeout", type=float, default=2.0)
+    args = parser.parse_args()
+
+    settings = {
+        "probe_interval_s": args.probe_interval,
+        "hung_timeout_s": args.hung_timeout,
+        "stop_deadline_s": 1,
+        "on_hung": ["alert"],
+        "on_crash": ["alert"],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        Path("moonlight").mkdir()
+        print(f"probe every {args.probe_interval}s, hung after {args.hung_timeout}s without an answer")
+        for i, (scenario, (script, overrides, expect)) in enumerate(SCENARIOS.items()):
+            name = f"wd{i}"
+            Path("servers", name).mkdir(parents=True)
+            latency = run(name, script, {**settings, **overrides}, expect)
+            print(f"{scenario:<14} -> {expect:<8} detected after {latency:.2f}s")
+
+        Path("servers", "loop").mkdir(parents=True)
+        loop = {**settings, "on_crash": ["alert", "restart"], "backoff_base_s": 0.25, "max_restarts": 4}
+        started = time.monotonic()
+        restarts = run("loop", f"{FAULT_AT}:crash", loop)
+        print(f"crash loop: {', '.join(restarts)}; gave up after {time.monotonic() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
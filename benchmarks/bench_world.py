@@ -0,0 +1,137 @@
+# Builds a synthetic Anvil world (1.18+ chunk layout, InhabitedTime written
+# after the block data so the reader has to skip past it), then times the
+# analyzer with one and several processes and a trim of rarely-visited chunks.
+#   python benchmarks/bench_world.py --regions 8
+
+import os
+import sys
+import time
+import zlib
+import random
+import struct
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+def _name(name):
+    data = name.encode()
+    return struct.pack(">H", len(data)) + data
+
+def tag(kind, name, payload):
+    return bytes([kind]) + _name(name) + payload
+
+def compound(*entries):
+    return b"".join(entries) + b"\0"
+
+def chunk_nbt(rng, x, z, inhabited, sections):
+    parts = []
+    for y in range(sections):
+        # Half-random block data compresses roughly like real terrain
+        longs = rng.randbytes(1024) + bytes(1024)
+        palette = b"".join(compound(tag(8, "Name", _name(block))) for block in ("minecraft:stone", "minecraft:dirt", "minecraft:air"))
+        parts.append(compound(
+            tag(1, "Y", struct.pack(">b", y - 4)),
+            tag(10, "block_states", compound(
+                tag(9, "palette", b"\x0a" + struct.pack(">i", 3) + palette),
+                tag(12, "data", struct.pack(">i", 256) + longs),
+            )),
+            tag(10, "biomes", compound(tag(9, "palette", b"\x08" + struct.pack(">i", 1) + _name("minecraft:plains")))),
+        ))
+    root = compound(
+        tag(3, "DataVersion", struct.pack(">i", 3465)),
+        tag(3, "xPos", struct.pack(">i", x)),
+        tag(3, "zPos", struct.pack(">i", z)),
+        tag(8, "Status", _name("minecraft:full")),
+        tag(9, "sections", b"\x0a" + struct.pack(">i", len(parts)) + b"".join(parts)),
+        tag(10, "Heightmaps", compound(tag(12, "WORLD_SURFACE", struct.pack(">i", 37) + bytes(296)))),
+        tag(4, "InhabitedTime", struct.pack(">q", inhabited)),
+        tag(4, "LastUpdate", struct.pack(">q", 1000)),
+    )
+    return b"\x0a" + _name("") + root
+
+def write_region(path, chunks):
+    # chunks: {index: nbt bytes}
+    locations = [0] * 1024
+    timestamps = [0] * 1024
+    body = bytearray()
+    for index, nbt in chunks.items():
+        data = zlib.compress(nbt, 6)
+        record = struct.pack(">IB", len(data) + 1, 2) + data
+        sectors = -(-len(record) // 4096)
+        locations[index] = (2 + len(body) // 4096) << 8 | sectors
+        timestamps[index] = 1700000000
+        body += record.ljust(sectors * 4096, b"\0")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(struct.pack(">1024I", *locations) + struct.pack(">1024I", *timestamps) + body)
+
+def inhabited_for(rng, cx, cz):
+    # Spawn is lived in; elsewhere most chunks were only flown over
+    if max(abs(cx), abs(cz)) < 12:
+        return rng.randint(72000, 720000)
+    roll = rng.random()
+    if roll < 0.7:
+        return rng.randint(0, 200)
+    if roll < 0.9:
+        return rng.randint(200, 1200)
+    return rng.randint(1200, 72000)
+
+def build_world(world, regions, sections, seed=1):
+    rng = random.Random(seed)
+    side = max(1, int(regions ** 0.5))
+    coords = [(rx - side // 2, rz - side // 2) for rx in range(side) for rz in range(-(-regions // side))][:regions]
+    for rx, rz in coords:
+        chunks = {}
+        entities = {}
+        for index in range(1024):
+            cx, cz = rx * 32 + index % 32, rz * 32 + index // 32
+            chunks[index] = chunk_nbt(rng, cx, cz, inhabited_for(rng, cx, cz), sections)
+            if index % 8 == 0:
+                entities[index] = b"\x0a" + _name("") + compound(tag(3, "DataVersion", struct.pack(">i", 3465)))
+        write_region(world / "region" / f"r.{rx}.{rz}.mca", chunks)
+        write_region(world / "entities" / f"r.{rx}.{rz}.mca", entities)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--regions", type=int, default=8)
+    parser.add_argument("--sections", type=int, default=8, help="chunk sections per chunk (size)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--min-inhabited", type=int, default=1200, help="trim threshold in ticks")
+    args = parser.parse_args()
+
+    from core.world import analyze_world, trim_world
+
+    with tempfile.TemporaryDirectory() as tmp:
+        world = Path(tmp) / "world"
+        started = time.perf_counter()
+        build_world(world, args.regions, args.sections)
+        size = sum(p.stat().st_size for p in world.rglob("*.mca"))
+        print(f"built {args.regions} regions ({args.regions * 1024} chunks, {size / 2**20:.0f} MB) "
+              f"in {time.perf_counter() - started:.1f}s")
+
+        for workers in sorted({1, args.workers}):
+            report = analyze_world(world, args.min_inhabited, workers=workers)
+            print(f"analyze  {workers} process(es): {report['seconds']:.2f}s "
+                  f"({report['chunks'] / report['seconds']:.0f} chunks/s)")
+        print(f"histogram {report['histogram']}")
+        print(f"below {args.min_inhabited} ticks: {report['below']} chunks, {report['below_bytes'] / 2**20:.0f} MB")
+
+        trimmed = Path(tmp) / "trimmed"
+        shutil.copytree(world, trimmed)
+        dry = trim_world(trimmed, args.min_inhabited, dry_run=True, workers=args.workers)
+        report = trim_world(trimmed, args.min_inhabited, workers=args.workers)
+        print(f"trim     {report['seconds']:.2f}s: kept {report['kept']}, dropped {report['dropped']}, "
+              f"{report['bytes_before'] / 2**20:.0f} MB -> {report['bytes_after'] / 2**20:.0f} MB "
+              f"(dry run predicted {dry['bytes_after'] / 2**20:.0f} MB)")
+        after = analyze_world(trimmed, args.min_inhabited, workers=args.workers)
+        actual = sum(p.stat().st_size for p in trimmed.rglob("*.mca"))
+        assert after["chunks"] == report["kept"] and after["below"] == 0, after
+        assert actual == report["bytes_after"], (actual, report["bytes_after"])
+        print(f"verified: {after['chunks']} chunks readable after trim, none below the threshold")
+
+if __name__ == "__main__":
+    main()
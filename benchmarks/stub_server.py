@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# Stand-in for "java -jar server.jar nogui" that speaks enough of the vanilla
+# console protocol for Moonlight to manage it. Any command-line arguments are
+# ignored so it can be used directly as ServerManager.JAVA_PATH.
+#
+# Environment knobs:
+#   STUB_START_DELAY  seconds before the "Done" line (default 0.2)
+#   STUB_SAVE_DELAY   seconds "save-all flush" takes (default 0.05)
+#   STUB_CHATTY       log lines per second of background noise (default 0)
+#   STUB_STOP_DELAY   seconds "stop" takes to save and exit (default 0)
+#   STUB_IGNORE_STOP  1 = ignore the "stop" command
+#   STUB_IGNORE_TERM  1 = ignore SIGTERM
+#   STUB_HOLD         1 = bind server-port and lock world/session.lock like
+#                     a real server while running
+#   STUB_SCRIPT       timed faults after "Done", e.g. "1:lag 3000;3:hang;5:crash"
+#                     (lag <ms>, tps <value>, hang, watchdog, crash)
+
+import os
+import sys
+import time
+import signal
+import socket
+import threading
+from datetime import datetime
+from pathlib import Path
+
+START_DELAY = float(os.environ.get("STUB_START_DELAY", "0.2"))
+SAVE_DELAY = float(os.environ.get("STUB_SAVE_DELAY", "0.05"))
+CHATTY = float(os.environ.get("STUB_CHATTY", "0"))
+STOP_DELAY = float(os.environ.get("STUB_STOP_DELAY", "0"))
+IGNORE_STOP = os.environ.get("STUB_IGNORE_STOP") == "1"
+IGNORE_TERM = os.environ.get("STUB_IGNORE_TERM") == "1"
+HOLD = os.environ.get("STUB_HOLD") == "1"
+SCRIPT = os.environ.get("STUB_SCRIPT", "")
+
+Path("logs").mkdir(exist_ok=True)
+log_file = open("logs/latest.log", "a")
+lock = threading.Lock()
+started = time.perf_counter()
+hung = threading.Event()  # the main thread stops answering commands
+tps = 20.0
+
+def log(message, level="INFO", thread="Server thread"):
+    line = f"[{datetime.now().strftime('%H:%M:%S')}] [{thread}/{level}]: {message}"
+    with lock:
+        print(line, flush=True)
+        log_file.write(line + "\n")
+        log_file.flush()
+
+def save_world():
+    region = Path("world/region")
+    region.mkdir(parents=True, exist_ok=True)
+    with open(region / "r.0.0.mca", "ab") as f:
+        f.write(os.urandom(4096))
+    time.sleep(SAVE_DELAY)
+
+def chatter():
+    n = 0
+    while True:
+        time.sleep(1 / CHATTY)
+        n += 1
+        log(f"Stub background message {n}")
+
+def run_script():
+    # Faults a watchdog should notice, at seconds after "Done"
+    global tps
+    begun = time.monotonic()
+    for step in filter(None, SCRIPT.split(";")):
+        at, _, action = step.partition(":")
+        time.sleep(max(0, float(at) - (time.monotonic() - begun)))
+        kind, _, value = action.partition(" ")
+        if kind == "lag":
+            ms = int(value or 3000)
+            log(f"Can't keep up! Is the server overloaded? Running {ms}ms or {ms // 50} ticks behind", "WARN")
+        elif kind == "tps":
+            tps = float(value)
+        elif kind == "hang":
+            hung.set()
+        elif kind == "watchdog":
+            hung.set()
+            log("A single server tick took 60.00 seconds (should be max 0.05)", "ERROR", "Server Watchdog")
+        elif kind == "crash":
+            log("---- Minecraft Crash Report ----", "ERROR")
+            log("This crash report has been saved to: ./crash-reports/crash-stub.txt", "ERROR")
+            os._exit(1)
+
+def hold_resources():
+    port = 25565
+    if os.path.exists("server.properties"):
+        for line in open("server.properties"):
+            if line.startswith("server-port="):
+                port = int(line.split("=", 1)[1])
+    listener = socket.socket()
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(("0.0.0.0", port))
+    listener.listen()
+    Path("world").mkdir(exist_ok=True)
+    session_lock = open("world/session.lock", "a+b")
+    import fcntl
+    fcntl.lockf(session_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    return listener, session_lock
+
+def main():
+    if IGNORE_TERM:
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    held = hold_resources() if HOLD else None
+    log("Starting minecraft server version stub")
+    log("Loading properties")
+    log("Preparing level \"world\"")
+    time.sleep(START_DELAY)
+    log(f"Done ({time.perf_counter() - started:.3f}s)! For help, type \"help\"")
+    if CHATTY:
+        threading.Thread(target=chatter, daemon=True).start()
+    if SCRIPT:
+        threading.Thread(target=run_script, daemon=True).start()
+
+    autosave = True
+    for line in sys.stdin:
+        command = line.strip()
+        if hung.is_set():
+            continue
+        if command == "save-off":
+            autosave = False
+            log("Automatic saving is now disabled")
+        elif command == "save-on":
+            autosave = True
+            log("Automatic saving is now enabled")
+        elif command.startswith("save-all"):
+            log("Saving the game (this may take a moment!)")
+            save_world()
+            log("Saved the game")
+        elif command == "list":
+            log("There are 0 of a max of 20 players online: ")
+        elif command == "tps":
+            log(f"TPS from last 1m, 5m, 15m: {tps:.1f}, {tps:.1f}, {tps:.1f}")
+        elif command == "stop":
+            if IGNORE_STOP:
+                continue
+            break
+        elif command:
+            log("Unknown or incomplete command, see below for error")
+
+    log("Stopping the server")
+    time.sleep(STOP_DELAY)
+    if autosave:
+        log("Saving chunks for level 'ServerLevel[world]'/minecraft:overworld")
+        save_world()
+    log("ThreadedAnvilChunkStorage: All dimensions are saved")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+# Moonlight command line client. Running servers are owned by the supervisor
+# daemon, which is started on demand; file-level commands (create, world,
+# backup of a stopped server) run locally. Each command imports only what it
+# needs so scripted use starts fast; PyQt is only loaded by "gui".
+#   python cli.py start Survival
+#   python cli.py tail Survival --follow
+#   python cli.py gui
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+SERVERS_DIR = Path("servers")
+STARTERS_DIR = Path("assets/Server Starters")
+# Commands that never talk to the daemon
+LOCAL_COMMANDS = ("daemon", "world", "create", "gui", "search", "props")
+# Commands that work without a daemon and shouldn't start one just to answer
+OPTIONAL_COMMANDS = ("list", "status", "backup")
+NO_SPAWN_COMMANDS = ("shutdown", "metrics", "health", "jobs")
+
+def local_servers():
+    if not SERVERS_DIR.is_dir():
+        return []
+    return [entry.name for entry in os.scandir(SERVERS_DIR) if entry.is_dir()]
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    return f"{days}d{hours:02d}h" if days else f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+
+def cmd_daemon(client, args):
+    from core.supervisor import main as supervisor_main
+    return supervisor_main([] if args.port is None else ["--port", str(args.port)])
+
+def cmd_gui(client, args):
+    from main import main as gui_main
+    return gui_main()
+
+def cmd_list(client, args):
+    running = {server["name"]: server for server in client.list()} if client else {}
+    names = sorted(set(local_servers()) | set(running))
+    if not names:
+        print(f"No servers in {SERVERS_DIR}.")
+    for name in names:
+        server = running.get(name)
+        if server and server["state"] != "exited":
+            print(f"{name:<24} {server['state']:<9} PID {server['pid']}")
+        else:
+            print(f"{name:<24} stopped")
+
+def cmd_status(client, args):
+    servers, metrics = {}, {}
+    if client is None:
+        print("Supervisor: not running")
+    else:
+        from core.supervisor_client import read_state
+        servers = {server["name"]: server for server in client.list()}
+        metrics = client.metrics()
+        print(f"Supervisor: running (PID {(read_state() or {}).get('pid')}, port {client.port})")
+    names = [args.name] if args.name else sorted(set(local_servers()) | set(servers))
+    for name in names:
+        server = servers.get(name)
+        if server is None or server["state"] == "exited":
+            print(f"{name:<24} stopped")
+            continue
+        entry = metrics.get(name, {})
+        health = entry.get("health") or {}
+        line = (f"{name:<24} {server['state']:<9} PID {server['pid']:<8} "
+                f"up {format_duration(time.time() - server['started']):<7} {health.get('state', '-'):<9}")
+        latest = entry.get("latest")
+        if latest:
+            line += f" CPU {latest['cpu']:4.0f}%  RAM {latest['rss'] / 2**20:6.0f} MB"
+        print(line)
+
+def cmd_create(client, args):
+    from core.provisioning import Provisioner
+    starters = sorted(path.name for path in STARTERS_DIR.glob("*.jar"))
+    starter = args.starter or (starters[0] if len(starters) == 1 else None)
+    if starter is None:
+        raise ValueError("Choose a starter with --starter: " + (", ".join(starters) or f"none in {STARTERS_DIR}"))
+    existing = [name for name in args.names if (SERVERS_DIR / name).exists()]
+    if existing:
+        raise ValueError(f"Already exists: {', '.join(existing)}")
+    provisioner = Provisioner(SERVERS_DIR, STARTERS_DIR)
+    if len(args.names) == 1:
+        reports = [provisioner.provision(args.names[0], starter)]
+    else:
+        reports = provisioner.create_servers(starter, args.names)
+    for report in reports:
+        if "error" in report:
+            print(f"Failed to create '{report['name']}': {report['error']}", file=sys.stderr)
+        else:
+            print(f"Created '{report['name']}' from {starter} ({report['bytes_written'] / 1024:.0f} KiB written)")
+    return 1 if any("error" in report for report in reports) else 0
+
+def cmd_backup(client, args):
+    # With the daemon up, backups are maintenance jobs there: throttled,
+    # held while servers lag, and hot for running servers (autosave paused
+    # only for the snapshot). Without it the server is copied directly.
+    if not (SERVERS_DIR / args.name).is_dir():
+        raise ValueError(f"No server named '{args.name}'")
+    if client is not None:
+        if args.no_wait:
+            job = client.backup(args.name, args.mode, wait=False)
+            print(f"Queued backup of '{args.name}' as job {job['id']} (see: jobs)")
+            return
+        report = client.backup(args.name, args.mode)
+        paused = f" (autosave paused {report['pause_ms']:.0f} ms)" if report["snapshot"] else ""
+        print(f"Backed up '{args.name}' to {report['backup']}{paused}")
+        return
+    from core.backup_manager import backup_server
+    print(f"Backed up '{args.name}' to {backup_server(str(SERVERS_DIR / args.name), args.mode)}")
+
+def format_job(job):
+    if job["state"] in ("running", "deferred"):
+        progress = f"{job['progress'] * 100:3.0f}%" if job["progress"] is not None else f"{job['done'] / 2**20:.0f} MB"
+        rate = f"{job['rate'] / 2**20:5.1f} MB/s" if job["rate"] else ""
+        eta = f"ETA {format_duration(job['eta'])}" if job["eta"] is not None else ""
+        detail = " ".join(filter(None, [progress, rate, eta]))
+    elif job["state"] == "failed":
+        detail = job["error"]
+    elif job["finished"]:
+        detail = f"{job['done'] / 2**20:.0f} MB in {format_duration(job['finished'] - job['started'])}" if job["started"] else ""
+    else:
+        detail = ""
+    return f"{job['id']:>4}  {job['name']:<28} {job['state']:<9} {detail}"
+
+def cmd_jobs(client, args):
+    if args.cancel is not None:
+        client.cancel_job(args.cancel)
+        print(f"Cancelled job {args.cancel}")
+        return
+    result = client.jobs()
+    jobs = [job for job in result["jobs"] if args.all or not job["finished"]]
+    for job in jobs:
+        print(format_job(job))
+    if not jobs:
+        print("No maintenance jobs running." if not args.all else "No maintenance jobs yet.")
+    for key, due in sorted(result["schedules"].items(), key=lambda item: item[1]):
+        print(f"      next {key:<28} {time.strftime('%Y-%m-%d %H:%M', time.localtime(due))}")
+
+def cmd_start(client, args):
+    info = client.start(args.name)
+    print(f"Started '{info['name']}' (PID {info['pid']})")
+
+def cmd_stop(client, args):
+    info = client.stop(args.name, args.timeout)
+    print(f"Stopped '{info['name']}' in {info['stop_seconds']:.1f}s (exit code {info['returncode']})")
+
+def cmd_restart(client, args):
+    info = client.restart(args.name, args.timeout)
+    print(f"Restarted '{info['name']}' (PID {info['pid']}) in {info['restart_seconds']:.1f}s")
+
+def cmd_history(client, args):
+    for entry in client.history(args.name):
+        line = f"{entry['action']:<8} {entry['phase']:<12} stop {entry['stop_seconds']:6.2f}s"
+        if entry["action"] == "restart":
+            line += f"  relaunch {entry['restart_seconds']:6.2f}s"
+            if "ready_seconds" in entry:
+                line += f"  ready {entry['ready_seconds']:6.2f}s"
+        print(line)
+
+def cmd_send(client, args):
+    client.send(args.name, " ".join(args.command))
+
+def cmd_tail(client, args):
+    if args.follow:
+        for event in client.follow(args.name):
+            if event["event"] == "line":
+                print(event["text"], flush=True)
+            elif event["event"] == "alert":
+                print(f"[watchdog] {event['kind']}: {event['detail']}", flush=True)
+            elif event["event"] == "exit":
+                print(f"[exited with code {event['returncode']}]")
+        return
+    for _, _, _, text in client.tail(args.name, args.lines):
+        print(text)
+
+def cmd_log(client, args):
+    for line in client.log(args.name, args.lines):
+        print(line)
+
+def cmd_metrics(client, args):
+    for name, entry in sorted(client.metrics().items()):
+        latest = entry["latest"]
+        if latest:
+            print(f"{name:<24} CPU {latest['cpu']:5.0f}%  RAM {latest['rss'] / 2**20:7.0f} MB  {latest['threads']:.0f} threads")
+
+def cmd_health(client, args):
+    result = client.health(args.name)
+    for name, status in sorted(result["servers"].items()):
+        if status:
+            tps = f"TPS {status['tps']:.1f}" if status["tps"] is not None else "TPS -"
+            print(f"{name:<24} {status['state']:<9} {status['ticks_behind']:6d} ticks behind  {tps}  "
+                  f"{status['restarts']} restarts")
+    for alert in result["alerts"]:
+        print(f"{time.strftime('%H:%M:%S', time.localtime(alert['time']))} {alert['name']}: {alert['kind']}: {alert['detail']}")
+
+def cmd_world(client, args):
+    # Runs locally on the world files; trimming needs the server stopped.
+    from core.world import analyze_world, trim_world, world_dir, TICKS_PER_MINUTE
+    world = world_dir(os.path.join("servers", args.name))
+    threshold = None if args.min_minutes is None else int(args.min_minutes * TICKS_PER_MINUTE)
+    if args.action == "analyze":
+        report = analyze_world(world, threshold, workers=args.workers)
+        print(f"{report['regions']} regions, {report['chunks']} chunks, {report['file_bytes'] / 2**20:.0f} MB "
+              f"({report['seconds']:.2f}s)")
+        for dimension, entry in sorted(report["dimensions"].items()):
+            print(f"  {dimension:<32} {entry['regions']:5d} regions {entry['chunks']:8d} chunks "
+                  f"{entry['file_bytes'] / 2**20:8.0f} MB")
+        print("  inhabited: " + ", ".join(f"{label} {count}" for label, count in report["histogram"].items()))
+        if threshold is not None:
+            print(f"  {report['below']} chunks ({report['below_bytes'] / 2**20:.0f} MB) below {args.min_minutes} min")
+        return
+    report = trim_world(world, threshold, args.radius, (args.center_x, args.center_z), args.dry_run, args.workers)
+    verb = "Would drop" if args.dry_run else "Dropped"
+    print(f"{verb} {report['dropped']} of {report['kept'] + report['dropped']} chunks "
+          f"({report['regions_removed']} region files emptied): "
+          f"{report['bytes_before'] / 2**20:.0f} MB -> {report['bytes_after'] / 2**20:.0f} MB")
+
+def cmd_search(client, args):
+    # Brings the index up to date (only new log lines are read), then queries it.
+    from core.log_index import LogIndex, parse_when
+    since, until = parse_when(args.since), parse_when(args.until)
+    with LogIndex() as index:
+        if not args.no_update:
+            report = index.update(SERVERS_DIR)
+            if report["lines"] or report["removed"]:
+                print(f"Indexed {report['lines']} new lines from {report['archives']} archives and "
+                      f"{report['live']} live logs in {report['seconds']:.2f}s", file=sys.stderr)
+        started = time.perf_counter()
+        text = " ".join(args.text) or None
+        results = index.search(None if args.fts else text, text if args.fts else None, args.server,
+                               since, until, args.level, args.limit)
+        elapsed = time.perf_counter() - started
+    for result in reversed(results):
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(result["time"]))
+        print(f"{stamp} {result['server']:<16} {result['text']}")
+    print(f"{len(results)} results in {elapsed * 1000:.1f} ms", file=sys.stderr)
+
+def cmd_props(client, args):
+    # Edits server.properties files directly; servers pick changes up on restart.
+    from core.properties import PRESETS, SCHEMA, apply_changes, load_properties, preset_changes
+    if args.action == "presets":
+        for name, (description, changes) in PRESETS.items():
+            print(f"{name:<14} {description}")
+            print("               " + ", ".join(f"{key}={value}" for key, value in changes.items()))
+        return
+    if args.action == "show":
+        if not args.items:
+            raise ValueError("Usage: props show NAME [KEY...]")
+        name, keys = args.items[0], args.items[1:]
+        if not (SERVERS_DIR / name).is_dir():
+            raise ValueError(f"No server named '{name}'")
+        props = load_properties(SERVERS_DIR / name).as_dict()
+        for key in keys or props:
+            marker = "" if key in SCHEMA else "  (not a vanilla key)"
+            print(f"{key}={props.get(key, '<unset>')}{marker}")
+        return
+    changes = preset_changes(args.preset) if args.preset else {}
+    for item in args.items:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"Expected key=value, got '{item}'")
+        changes[key.strip()] = value
+    if not changes:
+        raise ValueError("Nothing to change: give key=value pairs or --preset")
+    names = sorted(local_servers()) if args.all else args.server
+    if not names:
+        raise ValueError("Choose servers with --server NAME (repeatable) or --all")
+    missing = [name for name in names if not (SERVERS_DIR / name).is_dir()]
+    if missing:
+        raise ValueError(f"No server named {', '.join(missing)}")
+    reports = apply_changes([SERVERS_DIR / name for name in names], changes, args.dry_run, args.allow_unknown)
+    for report in reports:
+        if "error" in report:
+            print(f"{report['server']:<24} failed: {report['error']}", file=sys.stderr)
+        elif report["diff"]:
+            print(f"{report['server']:<24} " + ", ".join(f"{key} {old if old is not None else '<unset>'} -> {new}"
+                                                      for key, old, new in report["diff"]))
+        else:
+            print(f"{report['server']:<24} unchanged")
+    changed = sum(1 for report in reports if report["diff"] and "error" not in report)
+    if args.dry_run:
+        print(f"Dry run: {changed} of {len(reports)} servers would change, nothing written")
+    else:
+        print(f"Updated {changed} of {len(reports)} servers; running servers apply it on restart")
+    return 1 if any("error" in report for report in reports) else 0
+
+def cmd_shutdown(client, args):
+    client.shutdown(stop_servers=not args.keep_servers)
+    print("Supervisor shutting down.")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="moonlight")
+    commands = parser.add_subparsers(dest="command", required=True)
+    daemon = commands.add_parser("daemon", help="run the supervisor in the foreground")
+    daemon.add_argument("--port", type=int)
+    commands.add_parser("gui", help="open the Moonlight window")
+    commands.add_parser("list", help="list servers and whether they are running")
+    status = commands.add_parser("status", help="state, uptime, health and usage per server")
+    status.add_argument("name", nargs="?")
+    create = commands.add_parser("create", help="create servers from a starter jar")
+    create.add_argument("names", nargs="+")
+    create.add_argument("--starter", help=f"jar in {STARTERS_DIR} (default: the only one)")
+    backup = commands.add_parser("backup", help="back up a server (hot if it is running)")
+    backup.add_argument("name")
+    backup.add_argument("--mode", choices=("archive", "copy", "incremental"), default="archive")
+    backup.add_argument("--no-wait", action="store_true", help="queue it on the daemon and return")
+    for name in ("start", "stop", "restart"):
+        command = commands.add_parser(name, help=f"{name} a server")
+        command.add_argument("name")
+        if name != "start":
+            command.add_argument("--timeout", type=float, help="seconds to wait for a clean stop")
+    history = commands.add_parser("history", help="stop/restart latency history")
+    history.add_argument("name")
+    send = commands.add_parser("send", help="send a console command")
+    send.add_argument("name")
+    send.add_argument("command", nargs="+")
+    tail = commands.add_parser("tail", help="show console output")
+    tail.add_argument("name")
+    tail.add_argument("-n", "--lines", type=int, default=50)
+    tail.add_argument("-f", "--follow", action="store_true")
+    log = commands.add_parser("log", help="show logs/latest.log")
+    log.add_argument("name")
+    log.add_argument("-n", "--lines", type=int, default=50)
+    commands.add_parser("metrics", help="latest CPU/RAM per server")
+    health = commands.add_parser("health", help="watchdog state and recent alerts")
+    health.add_argument("name", nargs="?")
+    jobs = commands.add_parser("jobs", help="maintenance jobs (backups) with progress, and upcoming schedules")
+    jobs.add_argument("--all", action="store_true", help="include recently finished jobs")
+    jobs.add_argument("--cancel", type=int, metavar="ID", help="cancel a queued or running job")
+    world = commands.add_parser("world", help="analyze or trim a server's world files")
+    world.add_argument("action", choices=("analyze", "trim"))
+    world.add_argument("name")
+    world.add_argument("--min-minutes", type=float, help="drop chunks inhabited for less than this")
+    world.add_argument("--radius", type=int, help="drop chunks farther than this many chunks from the center")
+    world.add_argument("--center-x", type=int, default=0, help="center chunk x")
+    world.add_argument("--center-z", type=int, default=0, help="center chunk z")
+    world.add_argument("--dry-run", action="store_true")
+    world.add_argument("--workers", type=int)
+    search = commands.add_parser("search", help="search the logs of every server")
+    search.add_argument("text", nargs="*", help="phrase to find (omit to list by time only)")
+    search.add_argument("--server", action="append", help="limit to this server (repeatable)")
+    search.add_argument("--since", help="YYYY-MM-DD[ HH:MM] or an age like 6h, 3d")
+    search.add_argument("--until", help="same formats as --since")
+    search.add_argument("--level", action="append", help="INFO, WARN, ERROR... (repeatable)")
+    search.add_argument("-n", "--limit", type=int, default=50)
+    search.add_argument("--fts", action="store_true", help="treat the text as an FTS5 query (AND, OR, NOT, prefix*)")
+    search.add_argument("--no-update", action="store_true", help="query the index without reading new log lines")
+    props = commands.add_parser("props", help="show or change server.properties across servers")
+    props.add_argument("action", choices=("show", "set", "presets"))
+    props.add_argument("items", nargs="*", help="show: NAME [KEY...]; set: KEY=VALUE...")
+    props.add_argument("-s", "--server", action="append", help="server to change (repeatable)")
+    props.add_argument("--all", action="store_true", help="change every server")
+    props.add_argument("--preset", help="apply a performance preset (see: props presets)")
+    props.add_argument("--dry-run", action="store_true", help="show what would change without writing")
+    props.add_argument("--allow-unknown", action="store_true", help="allow keys that vanilla doesn't define")
+    shutdown = commands.add_parser("shutdown", help="stop the supervisor")
+    shutdown.add_argument("--keep-servers", action="store_true", help="leave servers running")
+    args = parser.parse_args(argv)
+
+    handler = globals()[f"cmd_{args.command}"]
+    if args.command in LOCAL_COMMANDS:
+        try:
+            return handler(None, args)
+        except (ValueError, RuntimeError, OSError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        except KeyboardInterrupt:
+            return 130
+    from core.supervisor_client import SupervisorClient, SupervisorError
+    try:
+        try:
+            client = SupervisorClient.connect(spawn=args.command not in OPTIONAL_COMMANDS + NO_SPAWN_COMMANDS)
+        except (ConnectionError, OSError):
+            if args.command not in OPTIONAL_COMMANDS:
+                raise
+            client = None
+        return handler(client, args)
+    except (SupervisorError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except (ConnectionError, OSError) as e:
+        print(f"Supervisor unavailable: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 130
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,487 @@
 import os
+import gzip
+import json
+import time
 import shutil
+import hashlib
+import tarfile
+import threading
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
+from .config import load_config
+from .maintenance import account, current_job
 
-def backup_server(server_dir):
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Region files are rewritten a few sectors at a time, so splitting every file
+# into fixed-size chunks lets unchanged parts of a changed file dedupe too.
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_STORE_DIR = "backups"
+
+# Archives are written as a tar stream cut into blocks that are gzipped in
+# parallel; the gzip members are simply concatenated, which any gzip reader
+# (including tarfile "r:gz") treats as one stream.
+ARCHIVE_BLOCK_SIZE = 1024 * 1024
+ARCHIVE_READ_SIZE = 256 * 1024
+COPY_BLOCK = 1024 * 1024
+PRECOMPRESSED_SUFFIXES = {".mca", ".mcc", ".gz", ".zip", ".jar", ".png", ".ogg"}
+
+# Linux FICLONE ioctl: a copy-on-write clone on btrfs/XFS/bcachefs.
+FICLONE = 0x40049409
+# Files Minecraft never rewrites in place can be hardlinked into a snapshot
+# when reflinks are unavailable. Everything else (region files, logs, stats)
+# is written in place and must be copied to stay consistent.
+HARDLINK_SAFE_SUFFIXES = {".jar"}
+# Backups hold this (shared) while their blobs aren't in a manifest yet;
+# gc holds it exclusively. Without fcntl a process-wide lock stands in.
+STORE_LOCK_NAME = "lock"
+_store_lock = threading.Lock()
+
+def backup_server(server_dir, mode="copy", store_dir=DEFAULT_STORE_DIR, level=None, threads=None, source=None):
+    # `source` names the server being backed up when `server_dir` is a
+    # temporary snapshot of it (see ServerManager.hot_backup).
     if not os.path.exists(server_dir):
         raise FileNotFoundError("Server directory not found")
-    backup_dir = f"{server_dir}_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    shutil.copytree(server_dir, backup_dir)
+    source = os.path.normpath(source or server_dir)
+    if mode == "incremental":
+        report = BackupStore(store_dir).backup(server_dir, server=os.path.basename(source))
+        return report["manifest"]
+    if mode == "archive":
+        archive_path = _reserve_name(source, ".tar.gz", lambda path: open(path, "x").close())
+        try:
+            report = archive_server(server_dir, archive_path, level, threads, arcname=os.path.basename(source))
+        except BaseException:
+            os.remove(archive_path)
+            raise
+        return report["archive"]
+    backup_dir = _reserve_name(source, "", os.mkdir)
+    try:
+        shutil.copytree(server_dir, backup_dir, copy_function=copy_file, dirs_exist_ok=True)
+    except BaseException:
+        shutil.rmtree(backup_dir, ignore_errors=True)
+        raise
     return backup_dir
+
+def _reserve_name(source, suffix, create):
+    # Backups are named to the second; `create` must fail with
+    # FileExistsError so two backups in the same second (two workers, cron
+    # and the GUI button) get _2, _3... instead of sharing a path.
+    stamp = f"{source}_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    n = 1
+    while True:
+        path = stamp + (f"_{n}" if n > 1 else "") + suffix
+        try:
+            create(path)
+            return path
+        except FileExistsError:
+            n += 1
+
+def _tmp_name(path):
+    # Unique per writer so concurrent jobs never share a temp file
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+def copy_file(src, dst, metadata=True):
+    # shutil.copy2 (copyfile without `metadata`), except inside a maintenance
+    # job: there the copy goes block by block so it is throttled, reports
+    # progress and can be cancelled (see core.maintenance). The copy goes to
+    # a temp file first, so a cancelled job never leaves a truncated `dst`.
+    if current_job() is None:
+        return shutil.copy2(src, dst) if metadata else shutil.copyfile(src, dst)
+    tmp = _tmp_name(dst)
+    try:
+        with open(src, "rb") as fsrc, open(tmp, "wb") as fdst:
+            for block in iter(lambda: fsrc.read(COPY_BLOCK), b""):
+                fdst.write(block)
+                account(len(block), len(block))
+        if metadata:
+            shutil.copystat(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return dst
+
+def _reflink(src, dst):
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+
+def snapshot_tree(src, dst):
+    src = Path(src)
+    dst = Path(dst)
+    counts = {"reflink": 0, "hardlink": 0, "copy": 0}
+    use_reflink = fcntl is not None
+    for root, dirs, names in os.walk(src):
+        root = Path(root)
+        target_root = dst / root.relative_to(src)
+        target_root.mkdir(parents=True, exist_ok=True)
+        for name in names:
+            path = root / name
+            target = target_root / name
+            if use_reflink:
+                try:
+                    _reflink(path, target)
+                    shutil.copystat(path, target)
+                    counts["reflink"] += 1
+                    continue
+                except OSError:
+                    # Not supported on this filesystem; don't retry per file.
+                    use_reflink = False
+                    target.unlink(missing_ok=True)
+            if path.suffix in HARDLINK_SAFE_SUFFIXES:
+                try:
+                    os.link(path, target)
+                    counts["hardlink"] += 1
+                    continue
+                except OSError:
+                    pass
+            copy_file(path, target)
+            counts["copy"] += 1
+    return counts
+
+def _write_atomic(path, data):
+    # Two servers share chunks (same server.jar), so their backups can write
+    # the same blob at once; each writer needs its own temp file.
+    tmp = _tmp_name(path)
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+# --- Compressed archives ---
+class _ParallelGzipWriter:
+    def __init__(self, fileobj, level, threads, block_size=ARCHIVE_BLOCK_SIZE):
+        self.fileobj = fileobj
+        self.level = level
+        self.block_size = block_size
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+        self.max_pending = threads * 2
+        self.pending = deque()
+        self.block = bytearray()
+        self.block_level = level
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def set_level(self, level):
+        if level != self.block_level and self.block:
+            self._submit()
+        self.block_level = level
+
+    def write(self, data):
+        self.block += data
+        self.bytes_in += len(data)
+        if len(self.block) >= self.block_size:
+            self._submit()
+        return len(data)
+
+    def tell(self):
+        return self.bytes_in
+
+    def _submit(self):
+        self.pending.append(self.pool.submit(gzip.compress, bytes(self.block), self.block_level, mtime=0))
+        self.block = bytearray()
+        # Only a bounded number of blocks may be in flight, so memory stays
+        # flat regardless of how large the tree is.
+        while len(self.pending) >= self.max_pending:
+            self._drain_one()
+
+    def _drain_one(self):
+        data = self.pending.popleft().result()
+        self.fileobj.write(data)
+        self.bytes_out += len(data)
+        account(written=len(data), done=0)
+
+    def close(self):
+        try:
+            if self.block:
+                self._submit()
+            while self.pending:
+                self._drain_one()
+        finally:
+            self.pool.shutdown()
+
+class _AccountedReader:
+    # File wrapper for tarfile: reports each block read to the current
+    # maintenance job, if any
+    def __init__(self, f):
+        self.f = f
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        account(len(data))
+        return data
+
+def archive_server(server_dir, archive_path, level=None, threads=None, arcname=None):
+    server_dir = Path(server_dir)
+    arcname = Path(arcname or server_dir.name)
+    if not server_dir.is_dir():
+        raise FileNotFoundError("Server directory not found")
+    config = load_config()
+    if level is None:
+        level = config["backup_compression_level"]
+    if not threads:
+        threads = config["backup_threads"] or os.cpu_count() or 1
+    started = time.perf_counter()
+    files = 0
+    tmp_path = _tmp_name(archive_path)
+    try:
+        with open(tmp_path, "xb") as out:
+            writer = _ParallelGzipWriter(out, level, threads)
+            tar = tarfile.TarFile(fileobj=writer, mode="w", format=tarfile.PAX_FORMAT)
+            tar.copybufsize = ARCHIVE_READ_SIZE
+            try:
+                for root, dirs, names in os.walk(server_dir):
+                    dirs.sort()
+                    root = Path(root)
+                    writer.set_level(level)
+                    tar.addfile(tar.gettarinfo(root, (arcname / root.relative_to(server_dir)).as_posix()))
+                    for name in sorted(names):
+                        path = root / name
+                        info = tar.gettarinfo(path, (arcname / path.relative_to(server_dir)).as_posix())
+                        if info.isreg():
+                            writer.set_level(0 if path.suffix in PRECOMPRESSED_SUFFIXES else level)
+                            with open(path, "rb") as f:
+                                tar.addfile(info, _AccountedReader(f))
+                            files += 1
+                        else:
+                            tar.addfile(info)
+                        # TarFile remembers every member it wrote; drop them so
+                        # huge worlds don't grow memory.
+                        tar.members.clear()
+                writer.set_level(level)
+                tar.close()
+            finally:
+                writer.close()
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, archive_path)
+    duration = time.perf_counter() - started
+    return {
+        "archive": str(archive_path),
+        "files": files,
+        "bytes_in": writer.bytes_in,
+        "bytes_out": writer.bytes_out,
+        "ratio": writer.bytes_in / writer.bytes_out if writer.bytes_out else 0.0,
+        "duration": duration,
+        "mb_per_s": writer.bytes_in / (1024 * 1024) / duration if duration else 0.0,
+        "level": level,
+        "threads": threads,
+    }
+
+def restore_archive(archive_path, target_dir):
+    with tarfile.open(archive_path, "r:gz") as tar:
+        tar.extractall(target_dir, filter="data")
+    return str(target_dir)
+
+# --- Deduplicated snapshot store ---
+class BackupStore:
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = Path(root)
+        self.blobs_dir = self.root / "blobs"
+        self.snapshots_dir = self.root / "snapshots"
+        self.cache_dir = self.root / "cache"
+        for d in (self.blobs_dir, self.snapshots_dir, self.cache_dir):
+            d.mkdir(parents=True, exist_ok=True)
+
+    # --- Blobs ---
+    def _blob_path(self, digest):
+        return self.blobs_dir / digest[:2] / digest
+
+    def _has_blob(self, digest):
+        return self._blob_path(digest).exists()
+
+    def _put_blob(self, digest, data):
+        path = self._blob_path(digest)
+        if path.exists():
+            return False
+        path.parent.mkdir(exist_ok=True)
+        _write_atomic(path, data)
+        return True
+
+    def _store_file(self, path, report):
+        chunks = []
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(CHUNK_SIZE)
+                if not data:
+                    break
+                digest = hashlib.sha256(data).hexdigest()
+                if self._put_blob(digest, data):
+                    report["bytes_written"] += len(data)
+                    report["blobs_written"] += 1
+                    account(len(data), len(data))
+                else:
+                    report["bytes_skipped"] += len(data)
+                    account(len(data))
+                chunks.append(digest)
+        return chunks
+
+    # --- Per-server size+mtime cache ---
+    def _cache_path(self, server):
+        return self.cache_dir / f"{server}.json"
+
+    def _load_cache(self, server):
+        path = self._cache_path(server)
+        if path.exists():
+            with open(path) as f:
+                return json.load(f)
+        return {}
+
+    def _save_cache(self, server, cache):
+        _write_atomic(self._cache_path(server), json.dumps(cache).encode())
+
+    @contextmanager
+    def _locked(self, exclusive):
+        if fcntl is None:
+            with _store_lock:
+                yield
+        else:
+            with open(self.root / STORE_LOCK_NAME, "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                yield
+
+    # --- Snapshots ---
+    def backup(self, server_dir, server=None):
+        with self._locked(exclusive=False):
+            return self._backup(server_dir, server)
+
+    def _backup(self, server_dir, server):
+        server_dir = Path(server_dir)
+        if not server_dir.is_dir():
+            raise FileNotFoundError("Server directory not found")
+        server = server or server_dir.name
+        started = time.perf_counter()
+        report = {
+            "files": 0,
+            "files_hashed": 0,
+            "bytes_total": 0,
+            "bytes_written": 0,
+            "bytes_skipped": 0,
+            "blobs_written": 0,
+        }
+        old_cache = self._load_cache(server)
+        cache = {}
+        files = []
+        for root, dirs, names in os.walk(server_dir):
+            dirs.sort()
+            for name in sorted(names):
+                path = Path(root) / name
+                rel = path.relative_to(server_dir).as_posix()
+                st = path.stat()
+                cached = old_cache.get(rel)
+                if (cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns
+                        and all(self._has_blob(d) for d in cached[2])):
+                    chunks = cached[2]
+                    report["bytes_skipped"] += st.st_size
+                    account(done=st.st_size)
+                else:
+                    chunks = self._store_file(path, report)
+                    report["files_hashed"] += 1
+                cache[rel] = [st.st_size, st.st_mtime_ns, chunks]
+                files.append({
+                    "path": rel,
+                    "size": st.st_size,
+                    "mtime_ns": st.st_mtime_ns,
+                    "mode": st.st_mode & 0o777,
+                    "chunks": chunks,
+                })
+                report["files"] += 1
+                report["bytes_total"] += st.st_size
+
+        snapshot_id = f"{server}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+        report["snapshot"] = snapshot_id
+        report["duration"] = time.perf_counter() - started
+        manifest = {
+            "id": snapshot_id,
+            "server": server,
+            "created": time.time(),
+            "source": str(server_dir),
+            "files": files,
+            "report": report,
+        }
+        manifest_path = self.snapshots_dir / f"{snapshot_id}.json"
+        _write_atomic(manifest_path, json.dumps(manifest).encode())
+        self._save_cache(server, cache)
+        report["manifest"] = str(manifest_path)
+        return report
+
+    def load_manifest(self, snapshot_id):
+        path = self.snapshots_dir / f"{snapshot_id}.json"
+        if not path.exists():
+            raise FileNotFoundError(f"Snapshot {snapshot_id} not found")
+        with open(path) as f:
+            return json.load(f)
+
+    def list_snapshots(self, server=None):
+        snapshots = []
+        for path in self.snapshots_dir.glob("*.json"):
+            with open(path) as f:
+                manifest = json.load(f)
+            if server is not None and manifest["server"] != server:
+                continue
+            snapshots.append({
+                "id": manifest["id"],
+                "server": manifest["server"],
+                "created": manifest["created"],
+                "files": len(manifest["files"]),
+                "size": sum(entry["size"] for entry in manifest["files"]),
+                "report": manifest.get("report", {}),
+            })
+        snapshots.sort(key=lambda s: s["created"])
+        return snapshots
+
+    def restore(self, snapshot_id, target_dir, overwrite=False):
+        manifest = self.load_manifest(snapshot_id)
+        target_dir = Path(target_dir)
+        if target_dir.exists() and any(target_dir.iterdir()) and not overwrite:
+            raise FileExistsError(f"Restore target {target_dir} is not empty")
+        for entry in manifest["files"]:
+            path = target_dir / entry["path"]
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "wb") as out:
+                for digest in entry["chunks"]:
+                    blob = self._blob_path(digest)
+                    if not blob.exists():
+                        raise FileNotFoundError(f"Missing blob {digest} for {entry['path']}")
+                    with open(blob, "rb") as f:
+                        shutil.copyfileobj(f, out)
+            os.chmod(path, entry["mode"])
+            os.utime(path, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+        return str(target_dir)
+
+    def delete_snapshot(self, snapshot_id):
+        (self.snapshots_dir / f"{snapshot_id}.json").unlink()
+
+    def prune(self, server, keep_last=7):
+        snapshots = self.list_snapshots(server)
+        removed = []
+        for snapshot in snapshots[:max(0, len(snapshots) - keep_last)]:
+            self.delete_snapshot(snapshot["id"])
+            removed.append(snapshot["id"])
+        freed = self.gc() if removed else {"blobs_removed": 0, "bytes_freed": 0}
+        return {"removed": removed, **freed}
+
+    def gc(self):
+        # Waits for running backups: their blobs are only referenced once
+        # their manifest is written
+        with self._locked(exclusive=True):
+            referenced = set()
+            for path in self.snapshots_dir.glob("*.json"):
+                with open(path) as f:
+                    for entry in json.load(f)["files"]:
+                        referenced.update(entry["chunks"])
+            blobs_removed = 0
+            bytes_freed = 0
+            for blob in self.blobs_dir.glob("*/*"):
+                if blob.name not in referenced and not blob.name.endswith(".tmp"):
+                    bytes_freed += blob.stat().st_size
+                    blob.unlink()
+                    blobs_removed += 1
+            return {"blobs_removed": blobs_removed, "bytes_freed": bytes_freed}
@@ -4,18 +4,53 @@ from pathlib import Path
 CONFIG_PATH = Path("moonlight/config.json")
 
 DEFAULT_CONFIG = {
-    "java_path": "C:/Program Files/Java/jdk-21/bin/java.exe"
+    "java_path": "C:/Program Files/Java/jdk-21/bin/java.exe",
+    "backup_compression_level": 6,
+    "backup_threads": 0,  # 0 = one worker per CPU
+    "backup_jitter_minutes": 30,  # scheduled backups start up to this much after their time
+    "maintenance_workers": 2,  # backups, provisioning and downloads run on this many threads
+    "maintenance_read_mb_s": 50,  # shared by all maintenance jobs; 0 = unlimited
+    "maintenance_write_mb_s": 50,
+    "maintenance_defer_on_lag": True,  # hold backups while any server is behind on ticks...
+    "maintenance_max_defer_minutes": 60,  # ...for at most this long
+    "memory_budget_mb": 0,  # 0 = total RAM minus memory_reserve_mb
+    "memory_reserve_mb": 2048,
+    "pin_cpus": False,
+    "large_pages": False,
+    "gc_logging": False,  # per-server "gc_logging" in config.json overrides
+    "supervisor_port": 0,  # 0 = any free port; clients read moonlight/supervisor.json
+    "log_level": "INFO",
+    "log_max_mb": 10,  # rotate moonlight/logs/*.log at this size...
+    "log_rotate_hours": 24,  # ...or this age (0 = size only); rotated files are gzipped
+    "log_backups": 5,
+    "log_json": False,  # also write structured records to manager.jsonl
+    "log_per_server": True  # copy each server's records to logs/servers/<name>.log
 }
 
 def load_config():
     if CONFIG_PATH.exists():
         with open(CONFIG_PATH) as f:
-            return json.load(f)
+            return {**DEFAULT_CONFIG, **json.load(f)}
     else:
         save_config(DEFAULT_CONFIG)
-        return DEFAULT_CONFIG
+        return dict(DEFAULT_CONFIG)
 
 def save_config(config):
     CONFIG_PATH.parent.mkdir(parents=True, exist_ok=True)
     with open(CONFIG_PATH, "w") as f:
         json.dump(config, f, indent=4)
+
+# Per-server settings live in <server_dir>/config.json
+def load_server_config(server_dir):
+    path = Path(server_dir) / "config.json"
+    if path.exists():
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+def save_server_config(server_dir, data):
+    path = Path(server_dir) / "config.json"
+    tmp = path.with_name("config.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=4)
+    tmp.replace(path)
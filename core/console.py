@@ -0,0 +1,151 @@
+import re
+import time
+import logging
+import threading
+from collections import deque
+
+DONE_PATTERN = re.compile(r"Done \((\d+(?:\.\d+)?)s\)!")
+DEFAULT_BUFFER_LINES = 5000
+
+class ServerConsole:
+    # Owns a running server's pipes: one reader thread per stream keeps them
+    # drained into a bounded ring buffer so the server can never block on a
+    # full pipe, and fans each line out to subscribers.
+    def __init__(self, name, proc, max_lines=DEFAULT_BUFFER_LINES):
+        self.name = name
+        self.proc = proc
+        self.lines = deque(maxlen=max_lines)  # (seq, timestamp, stream, text)
+        self.seq = 0
+        self.startup_time = None
+        self.ready = threading.Event()
+        self.exited = threading.Event()
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._ready_callbacks = []
+        self._exit_callbacks = []
+        self._waiters = []
+        self._exit_fired = False
+        self._open_streams = 0
+        self._threads = []
+        for stream_name, stream in (("stdout", proc.stdout), ("stderr", proc.stderr)):
+            if stream is None:
+                continue
+            self._open_streams += 1
+            thread = threading.Thread(
+                target=self._pump,
+                args=(stream_name, stream),
+                name=f"console-{name}-{stream_name}",
+                daemon=True
+            )
+            self._threads.append(thread)
+        for thread in self._threads:
+            thread.start()
+
+    # --- Subscriptions ---
+    def subscribe(self, callback):
+        # callback(seq, stream, text) runs on a reader thread; GUI code must hand
+        # the line over to its own thread.
+        with self._lock:
+            self._subscribers.append(callback)
+        return lambda: self._remove(self._subscribers, callback)
+
+    def on_ready(self, callback):
+        with self._lock:
+            if not self.ready.is_set():
+                self._ready_callbacks.append(callback)
+                return
+        callback(self.startup_time)
+
+    def on_exit(self, callback):
+        with self._lock:
+            if not self._exit_fired:
+                self._exit_callbacks.append(callback)
+                return
+        callback(self.proc.returncode)
+
+    def _remove(self, callbacks, callback):
+        with self._lock:
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    # --- Reading ---
+    def tail(self, n=100):
+        with self._lock:
+            return list(self.lines)[-n:]
+
+    def since(self, seq):
+        with self._lock:
+            return [line for line in self.lines if line[0] > seq]
+
+    def expect(self, text):
+        # Register interest before sending the command that produces `text`,
+        # then wait on the returned event.
+        event = threading.Event()
+        with self._lock:
+            self._waiters.append((text, event))
+        return event
+
+    def wait_for(self, text, timeout=None):
+        return self.expect(text).wait(timeout)
+
+    # --- Writing ---
+    def send(self, command):
+        if self.proc.poll() is not None or self.proc.stdin is None:
+            raise RuntimeError(f"Server '{self.name}' is not running.")
+        self.proc.stdin.write(command + "\n")
+        self.proc.stdin.flush()
+
+    # --- Reader threads ---
+    def _pump(self, stream_name, stream):
+        try:
+            for raw in iter(stream.readline, ""):
+                self._dispatch(stream_name, raw.rstrip("\r\n"))
+        except (OSError, ValueError) as e:
+            logging.warning(f"Console reader for '{self.name}' {stream_name} stopped: {e}")
+        finally:
+            stream.close()
+            with self._lock:
+                self._open_streams -= 1
+                last = self._open_streams == 0
+            if last:
+                self._finish()
+
+    def _dispatch(self, stream_name, text):
+        ready_callbacks = ()
+        with self._lock:
+            self.seq += 1
+            seq = self.seq
+            self.lines.append((seq, time.time(), stream_name, text))
+            subscribers = list(self._subscribers)
+            if self._waiters:
+                matched = [w for w in self._waiters if w[0] in text]
+                for waiter in matched:
+                    self._waiters.remove(waiter)
+                    waiter[1].set()
+            if not self.ready.is_set():
+                match = DONE_PATTERN.search(text)
+                if match:
+                    self.startup_time = float(match.group(1))
+                    self.ready.set()
+                    ready_callbacks, self._ready_callbacks = self._ready_callbacks, []
+        for callback in ready_callbacks:
+            self._call(callback, self.startup_time)
+        for callback in subscribers:
+            self._call(callback, seq, stream_name, text)
+
+    def _finish(self):
+        self.proc.wait()
+        with self._lock:
+            self._exit_fired = True
+            exit_callbacks, self._exit_callbacks = self._exit_callbacks, []
+        logging.info(f"Server '{self.name}' exited with code {self.proc.returncode}")
+        for callback in exit_callbacks:
+            self._call(callback, self.proc.returncode)
+        # Set last so whoever waits on `exited` sees the exit handlers' cleanup.
+        self.exited.set()
+
+    def _call(self, callback, *args):
+        try:
+            callback(*args)
+        except Exception as e:
+            logging.error(f"Console callback for '{self.name}' failed: {e}")
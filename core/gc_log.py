@@ -0,0 +1,249 @@
+import os
+import re
+import json
+import logging
+from bisect import bisect_left
+from collections import deque
+from pathlib import Path
+
+GC_LOG_NAME = "gc.log"
+STATE_NAME = "gc.state.json"
+# Upper bounds (ms) of the pause histogram buckets; the last one is open.
+PAUSE_BUCKETS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+HEAP_TREND_POINTS = 1000
+ALLOC_RATE_POINTS = 200
+
+UPTIME = re.compile(r"\[(\d+(?:\.\d+)?)s\]")
+# G1/Parallel/Serial: "GC(12) Pause Young (Normal) (G1 Evacuation Pause) 1024M->256M(4096M) 12.345ms"
+# ZGC/Shenandoah phases: "GC(3) Pause Mark Start 0.012ms", "GC(3) Y: Pause Mark Start (Major) 0.012ms"
+PAUSE = re.compile(
+    r"GC\((\d+)\) (?:[YO]: )?(Pause [A-Za-z ]+?)((?: \((?:[^()]|\([^()]*\))*\))*)"
+    r"(?: (\d+)([KMG])->(\d+)([KMG])\((\d+)([KMG])\))? (\d+(?:\.\d+)?)ms\s*$"
+)
+# ZGC cycle summary: "GC(3) Garbage Collection (Warmup) 1000M(10%)->200M(2%)"
+ZGC_CYCLE = re.compile(r"GC\((\d+)\) (?:Major |Minor )?(?:Collection|Garbage Collection) \(([^)]*)\) (\d+)([KMG])\(\d+%\)->(\d+)([KMG])\(\d+%\)")
+HUMONGOUS_REGIONS = re.compile(r"GC\((\d+)\) Humongous regions: (\d+)->(\d+)")
+UNITS_MB = {"K": 1 / 1024, "M": 1, "G": 1024}
+
+def gc_logging_flags(log_dir="logs", filecount=5, filesize="20M"):
+    path = (Path(log_dir) / GC_LOG_NAME).as_posix()
+    return [f"-Xlog:gc*,safepoint:file={path}:time,uptime,level,tags:filecount={filecount},filesize={filesize}"]
+
+def _mb(value, unit):
+    return int(value) * UNITS_MB[unit]
+
+class GCStats:
+    # Everything here is fixed-size, so stats over a multi-GB log cost the
+    # same memory as over a small one.
+    def __init__(self):
+        self.lines = 0
+        self.pause_count = 0
+        self.pause_total_ms = 0.0
+        self.pause_max_ms = 0.0
+        self.histogram = [0] * (len(PAUSE_BUCKETS) + 1)
+        self.by_kind = {}  # "Pause Young" -> [count, total_ms, max_ms]
+        self.humongous_gcs = 0
+        self.humongous_regions = 0
+        self.humongous_regions_max = 0
+        self.heap_after = deque(maxlen=HEAP_TREND_POINTS)  # (uptime s, MB)
+        self.alloc_rates = deque(maxlen=ALLOC_RATE_POINTS)  # MB/s
+        self._last_after = None  # (uptime s, MB)
+
+    def add_pause(self, kind, ms):
+        self.pause_count += 1
+        self.pause_total_ms += ms
+        self.pause_max_ms = max(self.pause_max_ms, ms)
+        self.histogram[bisect_left(PAUSE_BUCKETS, ms)] += 1
+        entry = self.by_kind.setdefault(kind, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += ms
+        entry[2] = max(entry[2], ms)
+
+    def add_collection(self, uptime, before_mb, after_mb):
+        if uptime is None:
+            return
+        if self._last_after is not None and uptime < self._last_after[0]:
+            # Uptime went backwards: the JVM restarted, start a new trend.
+            self.heap_after.clear()
+            self._last_after = None
+        if self._last_after is not None and uptime > self._last_after[0]:
+            allocated = before_mb - self._last_after[1]
+            if allocated >= 0:
+                self.alloc_rates.append(allocated / (uptime - self._last_after[0]))
+        self._last_after = (uptime, after_mb)
+        self.heap_after.append((uptime, after_mb))
+
+    def percentile(self, p):
+        # Upper bound of the bucket holding the p-th percentile pause.
+        if not self.pause_count:
+            return 0.0
+        target = self.pause_count * p / 100
+        seen = 0
+        for i, count in enumerate(self.histogram):
+            seen += count
+            if seen >= target:
+                return PAUSE_BUCKETS[i] if i < len(PAUSE_BUCKETS) else self.pause_max_ms
+        return self.pause_max_ms
+
+    def heap_trend(self):
+        # Least-squares slope of heap-after-GC in MB/min; a steady climb
+        # points at a leak or an undersized heap.
+        points = self.heap_after
+        n = len(points)
+        if n < 2:
+            return 0.0
+        mean_t = sum(t for t, _ in points) / n
+        mean_h = sum(h for _, h in points) / n
+        var = sum((t - mean_t) ** 2 for t, _ in points)
+        if not var:
+            return 0.0
+        return sum((t - mean_t) * (h - mean_h) for t, h in points) / var * 60
+
+    def summary(self):
+        return {
+            "lines": self.lines,
+            "pauses": self.pause_count,
+            "pause_total_ms": self.pause_total_ms,
+            "pause_max_ms": self.pause_max_ms,
+            "pause_p50_ms": self.percentile(50),
+            "pause_p99_ms": self.percentile(99),
+            "histogram": dict(zip([*map(str, PAUSE_BUCKETS), "inf"], self.histogram)),
+            "by_kind": {k: {"count": c, "total_ms": t, "max_ms": m} for k, (c, t, m) in self.by_kind.items()},
+            "alloc_rate_mb_s": sum(self.alloc_rates) / len(self.alloc_rates) if self.alloc_rates else 0.0,
+            "heap_after_mb": self.heap_after[-1][1] if self.heap_after else 0.0,
+            "heap_trend_mb_min": self.heap_trend(),
+            "humongous_gcs": self.humongous_gcs,
+            "humongous_regions": self.humongous_regions,
+            "humongous_regions_max": self.humongous_regions_max,
+        }
+
+    def feed(self, line):
+        self.lines += 1
+        if "GC(" not in line:
+            return
+        match = UPTIME.search(line)
+        uptime = float(match.group(1)) if match else None
+        match = PAUSE.search(line)
+        if match:
+            kind = match.group(2).strip()
+            causes = match.group(3)
+            self.add_pause(kind, float(match.group(10)))
+            if "Humongous" in causes:
+                self.humongous_gcs += 1
+            if match.group(4):
+                self.add_collection(uptime, _mb(match.group(4), match.group(5)), _mb(match.group(6), match.group(7)))
+            return
+        match = ZGC_CYCLE.search(line)
+        if match:
+            self.add_collection(uptime, _mb(match.group(3), match.group(4)), _mb(match.group(5), match.group(6)))
+            return
+        match = HUMONGOUS_REGIONS.search(line)
+        if match:
+            self.humongous_regions = int(match.group(2))
+            self.humongous_regions_max = max(self.humongous_regions_max, self.humongous_regions)
+
+class GCLogTailer:
+    # Follows <server>/logs/gc.log and its rotated siblings (gc.log.0, ...),
+    # remembering a byte offset per file (by inode) in gc.state.json so no
+    # line is ever read twice, even across Moonlight restarts.
+    def __init__(self, log_dir):
+        self.log_dir = Path(log_dir)
+        self.state_path = self.log_dir / STATE_NAME
+        self.stats = GCStats()
+        self.offsets = {}  # "inode" -> offset
+        self._load_state()
+
+    def _load_state(self):
+        if self.state_path.exists():
+            try:
+                with open(self.state_path) as f:
+                    state = json.load(f)
+                self.offsets = state.get("offsets", {})
+                stats = state.get("stats")
+                if stats:
+                    self._restore_stats(stats)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable GC log state {self.state_path}: {e}")
+
+    def _restore_stats(self, saved):
+        stats = self.stats
+        for key in ("lines", "pause_count", "pause_total_ms", "pause_max_ms", "humongous_gcs",
+                    "humongous_regions", "humongous_regions_max"):
+            setattr(stats, key, saved[key])
+        stats.histogram = saved["histogram"]
+        stats.by_kind = saved["by_kind"]
+        stats.heap_after.extend(tuple(p) for p in saved["heap_after"])
+        stats.alloc_rates.extend(saved["alloc_rates"])
+        stats._last_after = tuple(saved["last_after"]) if saved["last_after"] else None
+
+    def _save_state(self):
+        stats = self.stats
+        state = {
+            "offsets": self.offsets,
+            "stats": {
+                "lines": stats.lines,
+                "pause_count": stats.pause_count,
+                "pause_total_ms": stats.pause_total_ms,
+                "pause_max_ms": stats.pause_max_ms,
+                "humongous_gcs": stats.humongous_gcs,
+                "humongous_regions": stats.humongous_regions,
+                "humongous_regions_max": stats.humongous_regions_max,
+                "histogram": stats.histogram,
+                "by_kind": stats.by_kind,
+                "heap_after": list(stats.heap_after),
+                "alloc_rates": list(stats.alloc_rates),
+                "last_after": stats._last_after,
+            },
+        }
+        tmp = self.state_path.with_name(STATE_NAME + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_path)
+
+    def _files(self):
+        if not self.log_dir.exists():
+            return []
+        files = [p for p in self.log_dir.glob(GC_LOG_NAME + "*") if p.name != STATE_NAME and not p.name.endswith(".tmp")]
+        # Oldest first so events are fed in order across rotations.
+        return sorted(files, key=lambda p: p.stat().st_mtime)
+
+    def poll(self, max_bytes=None):
+        # Reads whatever was appended since the last call. `max_bytes` bounds
+        # the work per call (e.g. from a GUI timer); the rest is picked up on
+        # the next poll.
+        budget = max_bytes
+        before = dict(self.offsets)
+        seen = set()
+        for path in self._files():
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            key = str(st.st_ino)
+            seen.add(key)
+            offset = self.offsets.get(key, 0)
+            if offset > st.st_size:  # truncated and reused
+                offset = 0
+            if offset == st.st_size:
+                continue
+            with open(path, "rb") as f:
+                f.seek(offset)
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break  # partial line still being written
+                    offset += len(raw)
+                    self.stats.feed(raw.decode("utf-8", "replace"))
+                    if budget is not None:
+                        budget -= len(raw)
+                        if budget <= 0:
+                            break
+            self.offsets[key] = offset
+            if budget is not None and budget <= 0:
+                break
+        else:
+            # Forget files that rotated away entirely.
+            self.offsets = {k: v for k, v in self.offsets.items() if k in seen}
+        # Stats only move with the offsets; most polls find nothing new
+        if self.offsets != before:
+            self._save_state()
+        return self.stats.summary()
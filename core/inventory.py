@@ -0,0 +1,255 @@
+import os
+import re
+import math
+import time
+import logging
+import threading
+from pathlib import Path
+from .config import load_server_config
+from .supervisor_client import SupervisorError
+
+POLL_INTERVAL = 5.0  # seconds between sweeps when nothing wakes the poller
+USAGE_INTERVAL = 60  # every server's size is re-checked at least this often, a slice per sweep
+USAGE_MAX_AGE = 300  # files can grow without touching their directory's mtime; re-stat them this often
+RECONNECT_DELAY = 2.0
+# "Fabric 1.21.5.jar", "paper-1.20.4-496.jar"
+VERSION_PATTERN = re.compile(r"\d+\.\d+(?:\.\d+)?")
+
+def starter_version(config):
+    # (loader, version) from a server's config.json; explicit "loader" and
+    # "version" keys win over what the starter jar's name says.
+    starter = Path(config.get("starter") or "").stem
+    match = VERSION_PATTERN.search(starter)
+    loader = starter[:match.start()] if match else starter
+    loader = loader.strip(" -_") or None
+    return config.get("loader", loader), config.get("version", match.group(0) if match else None)
+
+class DiskUsage:
+    # Directory sizes computed with scandir and cached per directory: a
+    # subtree whose mtime hasn't changed costs one stat per directory, not
+    # one per file.
+    def __init__(self, max_age=USAGE_MAX_AGE):
+        self.max_age = max_age
+        self.dirs = {}  # path -> (mtime_ns, measured_at, bytes of files directly inside, subdirectories)
+
+    def measure(self, path, now=None):
+        now = time.monotonic() if now is None else now
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            self.forget(path)
+            return 0
+        cached = self.dirs.get(path)
+        if cached is not None and cached[0] == mtime and now - cached[1] < self.max_age:
+            own, subdirs = cached[2], cached[3]
+        else:
+            own, subdirs = 0, []
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                subdirs.append(entry.path)
+                            elif entry.is_file(follow_symlinks=False):
+                                own += entry.stat(follow_symlinks=False).st_size
+                        except OSError:
+                            pass  # deleted while we looked
+            except OSError:
+                return 0
+            if cached is not None:
+                for gone in set(cached[3]) - set(subdirs):
+                    self.forget(gone)
+            self.dirs[path] = (mtime, now, own, subdirs)
+        return own + sum(self.measure(subdir, now) for subdir in subdirs)
+
+    def invalidate(self, path):
+        # Re-read this directory on the next measure (a watcher saw it change)
+        self.dirs.pop(str(path), None)
+
+    def forget(self, path):
+        path = str(path)
+        prefix = path + os.sep
+        for key in [key for key in self.dirs if key == path or key.startswith(prefix)]:
+            del self.dirs[key]
+
+class Inventory:
+    # One in-memory model of every server directory: name, process state and
+    # PID, loader/version from config.json and disk usage. Kept current by a
+    # polling thread (woken early by invalidate() when a file watcher reports
+    # a change) and by the supervisor's "events" stream. Subscribers get
+    # diffs: callback(added, changed, removed) with dicts of entries by name
+    # and a list of removed names.
+    def __init__(self, servers_dir, usage=None):
+        self.servers_dir = Path(servers_dir)
+        self.usage = usage or DiskUsage()
+        self.servers = {}  # name -> entry
+        self.processes = {}  # name -> supervisor info of servers not exited
+        self.configs = {}  # name -> (config.json mtime_ns, loader, version)
+        self.measured = {}  # name -> time.monotonic() of its last disk usage pass
+        self.dirty = set()  # names a watcher saw change since their last pass
+        self.interval = POLL_INTERVAL
+        self.listeners = []
+        self.lock = threading.RLock()  # guards servers/processes; held while notifying so diffs arrive in order
+        self.refresh_lock = threading.Lock()  # one sweep at a time
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+        self.threads = []
+
+    def subscribe(self, callback):
+        self.listeners.append(callback)
+        return lambda: self.listeners.remove(callback)
+
+    def names(self):
+        with self.lock:
+            return sorted(self.servers)
+
+    def snapshot(self):
+        with self.lock:
+            return {name: dict(entry) for name, entry in self.servers.items()}
+
+    def _process_fields(self, name):
+        process = self.processes.get(name)
+        return {"state": process["state"] if process else "stopped", "pid": process["pid"] if process else None}
+
+    def _commit(self, updates, removed=(), create=True):
+        # updates: name -> fields to set (a new name gets a full entry unless
+        # `create` is off, e.g. a size measured just before a rename).
+        # Merging under the lock keeps the sweep and the process stream from
+        # overwriting each other; subscribers only hear about real changes
+        # and should just hand the diff off (e.g. emit a Qt signal).
+        added, changed = {}, {}
+        with self.lock:
+            for name, fields in updates.items():
+                old = self.servers.get(name)
+                if old is None:
+                    if not create:
+                        continue
+                    entry = {"name": name, "loader": None, "version": None, "disk_bytes": None,
+                             **self._process_fields(name), **fields}
+                    added[name] = self.servers[name] = entry
+                elif any(old.get(key) != value for key, value in fields.items()):
+                    changed[name] = self.servers[name] = {**old, **fields}
+            removed = [name for name in removed if self.servers.pop(name, None) is not None]
+            if added or changed or removed:
+                for callback in list(self.listeners):
+                    try:
+                        callback(added, changed, removed)
+                    except Exception:
+                        logging.exception("Inventory subscriber failed")
+        return added, changed, removed
+
+    # --- Sweeps ---
+    def refresh(self, measure=True):
+        # Picks up new and removed directories and changed config.json files,
+        # then (if `measure`) disk usage of new and invalidated servers plus
+        # the slice that has gone longest unmeasured. The listing is published
+        # before the slower size pass so a large fleet shows up straight away.
+        with self.refresh_lock:
+            try:
+                names = {entry.name for entry in os.scandir(self.servers_dir) if entry.is_dir()}
+            except OSError:
+                names = set()
+            removed = set(self.names()) - names
+            for name in removed:
+                self.usage.forget(self.servers_dir / name)
+                self.configs.pop(name, None)
+                self.measured.pop(name, None)
+            updates = {}
+            for name in names:
+                loader, version = self._config(name)
+                updates[name] = {"loader": loader, "version": version}
+            self._commit(updates, removed)
+            if measure:
+                now = time.monotonic()
+                dirty, self.dirty = self.dirty, set()
+                due = {name for name in names if name in dirty or name not in self.measured}
+                oldest = sorted(names - due, key=self.measured.get)
+                due.update(oldest[:math.ceil(len(names) * self.interval / USAGE_INTERVAL)])
+                updates = {}
+                for name in due:
+                    updates[name] = {"disk_bytes": self.usage.measure(str(self.servers_dir / name), now)}
+                    self.measured[name] = now
+                self._commit(updates, create=False)
+
+    def _config(self, name):
+        path = self.servers_dir / name / "config.json"
+        try:
+            mtime = path.stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        cached = self.configs.get(name)
+        if cached is not None and cached[0] == mtime:
+            return cached[1], cached[2]
+        try:
+            loader, version = starter_version(load_server_config(path.parent)) if mtime else (None, None)
+        except ValueError:  # half-written or hand-edited JSON; keep what we had
+            return cached[1:] if cached else (None, None)
+        self.configs[name] = (mtime, loader, version)
+        return loader, version
+
+    def invalidate(self, path=None):
+        # For file watchers: forget the cached listing of `path` and sweep soon.
+        if path is not None:
+            path = os.path.normpath(path)
+            self.usage.invalidate(path)
+            name = os.path.relpath(path, self.servers_dir).split(os.sep)[0]
+            if name not in (os.curdir, os.pardir):
+                self.dirty.add(name)
+        self.wake.set()
+
+    # --- Process state ---
+    def set_processes(self, infos, replace=False):
+        # Supervisor info dicts (name, pid, state); exited servers count as
+        # stopped. `replace` means this is the full list.
+        with self.lock:
+            if replace:
+                self.processes.clear()
+            for info in infos:
+                if info["state"] == "exited":
+                    self.processes.pop(info["name"], None)
+                else:
+                    self.processes[info["name"]] = info
+            updates = {name: self._process_fields(name) for name in self.servers}
+        self._commit(updates, create=False)
+
+    def _follow_processes(self, connect):
+        while not self.stopped.is_set():
+            try:
+                client = connect()
+                for event in client.events():
+                    if event["event"] == "servers":
+                        self.set_processes(event["servers"], replace=True)
+                    elif event["event"] == "state":
+                        self.set_processes([event])
+                    if self.stopped.is_set():
+                        return
+            except (OSError, SupervisorError) as e:
+                logging.debug(f"Inventory lost the supervisor event stream: {e}")
+            # Daemon gone (or shutting down): nothing it reported is known to
+            # be running any more; a reconnect sends the full list again.
+            self.set_processes([], replace=True)
+            self.stopped.wait(RECONNECT_DELAY)
+
+    def _poll(self, interval):
+        while not self.stopped.is_set():
+            try:
+                self.refresh()
+            except Exception:
+                logging.exception("Inventory refresh failed")
+            self.wake.wait(interval)
+            self.wake.clear()
+
+    def start(self, connect=None, interval=POLL_INTERVAL):
+        # `connect` returns a SupervisorClient; its event stream keeps the
+        # running state current between sweeps.
+        self.interval = interval
+        self.threads = [threading.Thread(target=self._poll, args=(interval,), name="inventory", daemon=True)]
+        if connect is not None:
+            self.threads.append(threading.Thread(target=self._follow_processes, args=(connect,),
+                                                 name="inventory-events", daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.wake.set()
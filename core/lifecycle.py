@@ -0,0 +1,146 @@
+import os
+import time
+import socket
+import logging
+from pathlib import Path
+import psutil
+from .properties import load_properties
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+PID_NAME = "server.pid"
+STOP_DEADLINE = 60  # seconds to wait for "stop" before SIGTERM
+TERM_DEADLINE = 10  # seconds between SIGTERM and SIGKILL
+RELEASE_TIMEOUT = 30  # seconds to wait for the port and world lock after exit
+POLL_INTERVAL = 0.05
+HISTORY_LENGTH = 50
+DEFAULT_PORT = 25565
+
+# --- PID files ---
+def write_pid_file(server_dir, pid):
+    # The process start time goes on the second line so a recycled PID is
+    # never mistaken for the server.
+    try:
+        created = psutil.Process(pid).create_time()
+    except psutil.Error:
+        created = 0
+    path = Path(server_dir) / PID_NAME
+    with open(path, "w") as f:
+        f.write(f"{pid}\n{created}\n")
+    return path
+
+def read_pid_file(server_dir):
+    path = Path(server_dir) / PID_NAME
+    try:
+        fields = path.read_text().split()
+        return int(fields[0]), float(fields[1]) if len(fields) > 1 else None
+    except (OSError, ValueError, IndexError):
+        return None
+
+def find_server_process(server_dir):
+    # The process named in server.pid, but only if it is still the server
+    # we launched: same start time, running server.jar from server_dir.
+    entry = read_pid_file(server_dir)
+    if entry is None:
+        return None
+    pid, created = entry
+    try:
+        proc = psutil.Process(pid)
+        if created and abs(proc.create_time() - created) > 1:
+            logging.warning(f"PID {pid} in {server_dir} was reused by another process")
+            return None
+        if "server.jar" not in proc.cmdline():
+            logging.warning(f"PID {pid} is not running server.jar; not signalling it")
+            return None
+        if Path(proc.cwd()).resolve() != Path(server_dir).resolve():
+            logging.warning(f"PID {pid} runs from {proc.cwd()}, not {server_dir}; not signalling it")
+            return None
+        return proc
+    except (psutil.NoSuchProcess, psutil.ZombieProcess):
+        return None
+    except psutil.AccessDenied:
+        logging.warning(f"Cannot inspect PID {pid}; not signalling it")
+        return None
+
+# --- Stop state machine ---
+def graceful_stop(name, send_stop, wait_exit, terminate, kill, deadline=STOP_DEADLINE, term_deadline=TERM_DEADLINE):
+    # stopping -> (console "stop" ignored) terminating -> (SIGTERM ignored)
+    # killing. `wait_exit(timeout)` returns True once the process is gone.
+    # Returns the phase that ended it and how long each took.
+    started = time.monotonic()
+    report = {"name": name, "phase": "stopping", "started": time.time()}
+    try:
+        send_stop()
+        stopped = wait_exit(deadline)
+    except (OSError, RuntimeError, ValueError) as e:
+        logging.warning(f"Could not send stop to '{name}': {e}")
+        stopped = False
+    if not stopped:
+        report["phase"] = "terminating"
+        logging.warning(f"'{name}' did not stop within {deadline}s; sending SIGTERM")
+        terminate()
+        if not wait_exit(term_deadline):
+            report["phase"] = "killing"
+            logging.warning(f"'{name}' ignored SIGTERM; sending SIGKILL")
+            kill()
+            if not wait_exit(term_deadline):
+                raise RuntimeError(f"'{name}' survived SIGKILL")
+    report["stop_seconds"] = time.monotonic() - started
+    return report
+
+# --- Resource release ---
+def read_properties(server_dir):
+    # Plain {key: value} view; cached by mtime in core.properties
+    return load_properties(server_dir).as_dict()
+
+def port_released(port):
+    # Bind with SO_REUSEADDR like the JVM does, so TIME_WAIT leftovers from
+    # the old process don't count as "in use".
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind(("0.0.0.0", port))
+            return True
+        except OSError:
+            return False
+
+def world_lock_released(lock_path):
+    # Minecraft holds a lock on <world>/session.lock while the world is open.
+    if not os.path.exists(lock_path):
+        return True
+    try:
+        with open(lock_path, "r+b") as f:
+            if fcntl is not None:
+                fcntl.lockf(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                fcntl.lockf(f, fcntl.LOCK_UN)
+            else:
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        return True
+    except OSError:
+        return False
+
+def wait_released(server_dir, timeout=RELEASE_TIMEOUT):
+    # Blocks until the server's port and world lock are free again; returns
+    # the seconds waited. A restart can start the new process right after.
+    props = read_properties(server_dir)
+    try:
+        port = int(props.get("server-port") or DEFAULT_PORT)
+    except ValueError:
+        port = DEFAULT_PORT
+    lock_path = Path(server_dir) / (props.get("level-name") or "world") / "session.lock"
+    started = time.monotonic()
+    while not (port_released(port) and world_lock_released(lock_path)):
+        if time.monotonic() - started > timeout:
+            raise TimeoutError(f"Port {port} or {lock_path} still held after {timeout}s")
+        time.sleep(POLL_INTERVAL)
+    return time.monotonic() - started
+
+def record(history, name, report):
+    entries = history.setdefault(name, [])
+    entries.append(report)
+    del entries[:-HISTORY_LENGTH]
@@ -0,0 +1,376 @@
+import os
+import re
+import gzip
+import time
+import sqlite3
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+INDEX_PATH = Path("moonlight/log_index.db")
+DAY = 86400
+# "[12:34:56] [Server thread/INFO]: ..." (vanilla, Fabric, Paper's file log)
+VANILLA = re.compile(r"\[(\d\d):(\d\d):(\d\d)\] \[[^\]]*/(\w+)\]:? ?")
+# "[12:34:56 INFO]: ..." (Bukkit/Spigot console format)
+BUKKIT = re.compile(r"\[(\d\d):(\d\d):(\d\d) (\w+)\]:? ?")
+# Rotated by log4j as logs/YYYY-MM-DD-N.log.gz
+ARCHIVE_NAME = re.compile(r"(\d{4})-(\d\d)-(\d\d)-\d+\.log\.gz$")
+LIVE_NAME = "latest.log"
+FILE_COLUMNS = "id, server, path, inode, offset, day_start, last_tod"
+# A line this much earlier than the previous one means the log crossed
+# midnight (threads may log a little out of order).
+ROLLOVER_SLACK = 60
+# Line ids are (epoch seconds << ID_SHIFT) + n, so id order is time order:
+# FTS5 can walk matches newest first and stop at the limit, and time bounds
+# become rowid ranges.
+ID_SHIFT = 20
+# Logs are read and parsed this many bytes (of whole lines) at a time
+READ_CHUNK = 4 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    server TEXT NOT NULL,
+    path TEXT NOT NULL,
+    inode INTEGER,
+    offset INTEGER NOT NULL DEFAULT 0,  -- bytes ingested so far (latest.log)
+    day_start INTEGER,  -- local midnight of the day the last line fell on
+    last_tod INTEGER,  -- seconds into that day of the last line
+    first_time INTEGER,
+    last_time INTEGER,
+    lines INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (server, path)
+);
+CREATE TABLE IF NOT EXISTS lines (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL,
+    level TEXT,
+    prefix TEXT NOT NULL,  -- "[12:34:56] [Server thread/INFO]: ", not indexed
+    message TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS lines_fts USING fts5 (message, content='lines', content_rowid='id', columnsize=0);
+"""
+
+def _midnight(timestamp):
+    day = datetime.fromtimestamp(timestamp)
+    return int(datetime(day.year, day.month, day.day).timestamp())
+
+def parse_lines(text):
+    # (seconds into the day or None, level or None, prefix, message). Lines
+    # without a timestamp (stack traces, wrapped output) inherit the
+    # previous one's.
+    entries = []
+    for line in text.splitlines():
+        if not line:
+            continue
+        match = VANILLA.match(line) or BUKKIT.match(line)
+        if match:
+            h, m, s, level = match.groups()
+            end = match.end()
+            entries.append((int(h) * 3600 + int(m) * 60 + int(s), level.upper(), line[:end], line[end:]))
+        else:
+            entries.append((None, None, "", line))
+    return entries
+
+def _rollovers(entries, last_tod=None):
+    count = 0
+    for tod, *_ in entries:
+        if tod is not None:
+            if last_tod is not None and tod < last_tod - ROLLOVER_SLACK:
+                count += 1
+            last_tod = tod
+    return count, last_tod
+
+def _count_rollovers(blocks):
+    count, last_tod = 0, None
+    for text in blocks:
+        n, last_tod = _rollovers(parse_lines(text), last_tod)
+        count += n
+    return count
+
+def _read_lines(f, limit=None):
+    # Text of whole lines, about READ_CHUNK bytes at a time, from binary
+    # file `f` (up to `limit` bytes). Whatever follows the last newline comes
+    # last; callers pass a `limit` ending on a newline to leave it out.
+    carry = b""
+    while limit is None or limit > 0:
+        block = f.read(READ_CHUNK if limit is None else min(READ_CHUNK, limit))
+        if not block:
+            break
+        if limit is not None:
+            limit -= len(block)
+        block = carry + block
+        end = block.rfind(b"\n") + 1
+        carry = block[end:]
+        if end:
+            yield block[:end].decode("utf-8", "replace")
+    if carry:
+        yield carry.decode("utf-8", "replace")
+
+def _line_end(f, start, stop):
+    # Offset just past the last newline in [start, stop), or `start`
+    pos = stop
+    while pos > start:
+        size = min(READ_CHUNK, pos - start)
+        f.seek(pos - size)
+        newline = f.read(size).rfind(b"\n")
+        if newline >= 0:
+            return pos - size + newline + 1
+        pos -= size
+    return start
+
+def _stamp(entries, day_start, last_tod, level=None):
+    # Turns time-of-day into epoch seconds, moving to the next day whenever
+    # the clock goes backwards. Returns the rows and the state to resume from.
+    rows = []
+    for tod, line_level, prefix, message in entries:
+        if tod is not None:
+            if last_tod is not None and tod < last_tod - ROLLOVER_SLACK:
+                day_start += DAY
+            last_tod = tod
+            level = line_level
+        rows.append((day_start + (last_tod or 0), level, prefix, message))
+    return rows, day_start, last_tod, level
+
+def parse_when(text, now=None):
+    # "2024-01-15", "2024-01-15 12:30", or relative "90m", "6h", "3d" (ago)
+    if text is None:
+        return None
+    now = time.time() if now is None else now
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smhdw])", text.strip())
+    if match:
+        unit = {"s": 1, "m": 60, "h": 3600, "d": DAY, "w": 7 * DAY}[match.group(2)]
+        return int(now - float(match.group(1)) * unit)
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return int(datetime.strptime(text.strip(), fmt).timestamp())
+        except ValueError:
+            pass
+    raise ValueError(f"Unrecognised time '{text}' (use YYYY-MM-DD[ HH:MM] or e.g. 6h, 3d)")
+
+class LogIndex:
+    # Fleet-wide full-text index of every server's logs/latest.log and
+    # rotated YYYY-MM-DD-N.log.gz archives. Archives are read once;
+    # latest.log is read from where the last update stopped.
+    def __init__(self, path=INDEX_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Ingest ---
+    def update(self, servers_dir="servers"):
+        started = time.perf_counter()
+        report = {"servers": 0, "archives": 0, "live": 0, "lines": 0, "bytes": 0, "removed": 0}
+        known = {}
+        for row in self.db.execute(f"SELECT {FILE_COLUMNS} FROM files"):
+            known[(row[1], row[2])] = row
+        seen = set()
+        servers_dir = Path(servers_dir)
+        for server_dir in sorted(p for p in servers_dir.iterdir() if p.is_dir()) if servers_dir.is_dir() else []:
+            logs_dir = server_dir / "logs"
+            if not logs_dir.is_dir():
+                continue
+            report["servers"] += 1
+            server = server_dir.name
+            for entry in os.scandir(logs_dir):
+                key = (server, entry.name)
+                if entry.name == LIVE_NAME:
+                    seen.add(key)
+                    lines, size = self._ingest_live(server, Path(entry.path))
+                    report["live"] += 1 if lines else 0
+                elif ARCHIVE_NAME.search(entry.name):
+                    seen.add(key)
+                    if key in known:
+                        continue  # archives never change
+                    lines, size = self._ingest_archive(server, Path(entry.path))
+                    report["archives"] += 1
+                else:
+                    continue
+                report["lines"] += lines
+                report["bytes"] += size
+        # Deleted archives and renamed or removed servers
+        for key, row in known.items():
+            if key not in seen:
+                with self._write():
+                    current = self._file_row(*key)
+                    if current is not None:  # not dropped by a concurrent update
+                        self._drop_file(current[0])
+                        report["removed"] += 1
+        if report["lines"] or report["removed"]:
+            self.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        report["seconds"] = time.perf_counter() - started
+        return report
+
+    @contextmanager
+    def _write(self):
+        # One write transaction. `known` in update() may be stale by the
+        # time the lock is taken (another update, the CLI and the GUI
+        # at once), so anything decided from it is re-checked inside.
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        self.db.execute("COMMIT")
+
+    def _file_row(self, server, name):
+        return self.db.execute(f"SELECT {FILE_COLUMNS} FROM files WHERE server = ? AND path = ?",
+                               (server, name)).fetchone()
+
+    def _insert(self, file_id, rows):
+        # Caller holds the write lock. Other servers may already have lines
+        # in the same second, so continue after the highest id used there.
+        next_id = {}
+        records = []
+        for t, level, prefix, message in rows:
+            line_id = next_id.get(t)
+            if line_id is None:
+                base = t << ID_SHIFT
+                line_id = self.db.execute("SELECT COALESCE(MAX(id) + 1, ?) FROM lines WHERE id BETWEEN ? AND ?",
+                                          (base, base, base + (1 << ID_SHIFT) - 1)).fetchone()[0]
+            next_id[t] = line_id + 1
+            records.append((line_id, file_id, level, prefix, message))
+        self.db.executemany("INSERT INTO lines (id, file_id, level, prefix, message) VALUES (?, ?, ?, ?, ?)", records)
+        self.db.executemany("INSERT INTO lines_fts (rowid, message) VALUES (?, ?)",
+                            ((record[0], record[4]) for record in records))
+
+    def _drop_file(self, file_id):
+        # A file's lines lie within its time range, so this is a rowid range
+        # scan rather than needing an index on file_id.
+        first, last = self.db.execute("SELECT first_time, last_time FROM files WHERE id = ?", (file_id,)).fetchone()
+        if first is not None:
+            span = (first << ID_SHIFT, (last + 1) << ID_SHIFT, file_id)
+            self.db.execute("INSERT INTO lines_fts (lines_fts, rowid, message) SELECT 'delete', id, message "
+                            "FROM lines WHERE id >= ? AND id < ? AND file_id = ?", span)
+            self.db.execute("DELETE FROM lines WHERE id >= ? AND id < ? AND file_id = ?", span)
+        self.db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def _add_file(self, server, path, inode, offset):
+        cursor = self.db.execute("INSERT INTO files (server, path, inode, offset) VALUES (?, ?, ?, ?)",
+                                 (server, path, inode, offset))
+        return cursor.lastrowid
+
+    def _append(self, file_id, blocks, day_start, last_tod):
+        # Caller holds the write lock. Parses and inserts one block of lines
+        # at a time, so a large log never sits in memory whole.
+        lines, first, last, level = 0, None, None, None
+        for text in blocks:
+            rows, day_start, last_tod, level = _stamp(parse_lines(text), day_start, last_tod, level)
+            if rows:
+                self._insert(file_id, rows)
+                first = rows[0][0] if first is None else first
+                last = rows[-1][0]
+                lines += len(rows)
+        self.db.execute(
+            "UPDATE files SET day_start = ?, last_tod = ?, lines = lines + ?, "
+            "first_time = COALESCE(first_time, ?), last_time = COALESCE(?, last_time) WHERE id = ?",
+            (day_start, last_tod, lines, first, last, file_id)
+        )
+        return lines
+
+    def _ingest_archive(self, server, path):
+        # The date in the name is the day the log was rotated, i.e. the day
+        # of its last line; count midnights backwards from there (a first
+        # pass), then stamp and insert (a second).
+        year, month, day = ARCHIVE_NAME.search(path.name).groups()
+        end_day = int(datetime(int(year), int(month), int(day)).timestamp())
+        try:
+            with gzip.open(path, "rb") as f:
+                rollovers = _count_rollovers(_read_lines(f))
+            with self._write():
+                if self._file_row(server, path.name) is not None:
+                    return 0, 0  # indexed meanwhile by another update
+                file_id = self._add_file(server, path.name, None, path.stat().st_size)
+                with gzip.open(path, "rb") as f:
+                    lines = self._append(file_id, _read_lines(f), end_day - rollovers * DAY, None)
+                    size = f.tell()
+        except (OSError, EOFError) as e:
+            logging.warning(f"Skipping unreadable log archive {path}: {e}")
+            return 0, 0
+        return lines, size
+
+    def _ingest_live(self, server, path):
+        # Reads under the write lock, from the offset stored right now
+        with self._write():
+            return self._ingest_live_locked(server, path, self._file_row(server, path.name))
+
+    def _ingest_live_locked(self, server, path, row):
+        st = path.stat()
+        resume = row is not None and row[3] == st.st_ino and st.st_size >= row[4]
+        if resume and st.st_size == row[4]:
+            return 0, 0
+        offset = row[4] if resume else 0
+        with open(path, "rb") as f:
+            end = _line_end(f, offset, st.st_size)  # leave a half-written last line for next time
+            if end == offset and resume:
+                return 0, 0
+            if resume:
+                file_id, day_start, last_tod = row[0], row[5], row[6]
+            else:
+                if row is not None:
+                    # latest.log was rotated; its old lines now live in an archive
+                    self._drop_file(row[0])
+                # First sight of this file: its last line is from the day of
+                # the last write.
+                f.seek(0)
+                day_start, last_tod = _midnight(st.st_mtime) - _count_rollovers(_read_lines(f, end)) * DAY, None
+                file_id = self._add_file(server, path.name, st.st_ino, 0)
+            f.seek(offset)
+            lines = self._append(file_id, _read_lines(f, end - offset), day_start, last_tod)
+        self.db.execute("UPDATE files SET offset = ? WHERE id = ?", (end, file_id))
+        return lines, end - offset
+
+    # --- Queries ---
+    def search(self, text=None, match=None, servers=None, since=None, until=None, levels=None, limit=100):
+        # `text` is matched as a phrase ("Can't keep up"); `match` is a raw
+        # FTS5 expression (e.g. 'joined NOT Steve'). Newest first.
+        if text:
+            match = '"' + text.replace('"', '""') + '"'
+        # Only the message is indexed, so the timestamp/thread prefix never matches
+        low = 0 if since is None else int(since) << ID_SHIFT
+        high = (1 << 62) if until is None else (int(until) + 1) << ID_SHIFT
+        params = []
+        if match:
+            sql = ("SELECT f.server, f.path, l.id, l.level, l.prefix, l.message FROM lines_fts "
+                   "JOIN lines l ON l.id = lines_fts.rowid JOIN files f ON f.id = l.file_id "
+                   "WHERE lines_fts MATCH ? AND lines_fts.rowid >= ? AND lines_fts.rowid < ?")
+            params.extend((match, low, high))
+        else:
+            sql = ("SELECT f.server, f.path, l.id, l.level, l.prefix, l.message FROM lines l "
+                   "JOIN files f ON f.id = l.file_id WHERE l.id >= ? AND l.id < ?")
+            params.extend((low, high))
+        if servers:
+            sql += f" AND f.server IN ({','.join('?' * len(servers))})"
+            params.extend(servers)
+        if levels:
+            sql += f" AND l.level IN ({','.join('?' * len(levels))})"
+            params.extend(level.upper() for level in levels)
+        sql += f" ORDER BY {'lines_fts.rowid' if match else 'l.id'} DESC LIMIT ?"
+        params.append(limit)
+        try:
+            rows = self.db.execute(sql, params).fetchall()
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"Bad search expression: {e}")
+        return [{"server": server, "file": path, "time": line_id >> ID_SHIFT, "level": level, "text": prefix + message}
+                for server, path, line_id, level, prefix, message in rows]
+
+    def stats(self):
+        files, archives, lines = self.db.execute(
+            "SELECT COUNT(*), SUM(path != ?), COALESCE(SUM(lines), 0) FROM files", (LIVE_NAME,)
+        ).fetchone()
+        size = sum(p.stat().st_size for p in self.path.parent.glob(self.path.name + "*"))
+        return {"files": files, "archives": archives or 0, "lines": lines, "bytes": size}
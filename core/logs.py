@@ -0,0 +1,179 @@
+import os
+import sys
+import json
+import gzip
+import time
+import queue
+import atexit
+import shutil
+import logging
+import logging.handlers
+from collections import OrderedDict
+from pathlib import Path
+from .config import load_config
+
+LOG_DIR = Path("moonlight/logs")
+# Every process needs files of its own: each rotates what it writes, and a
+# file rotated by another process is left being written after it's unlinked.
+# The daemon owns manager.* and the per-server files, the GUI writes gui.*.
+LOG_NAME = "manager.log"
+JSON_NAME = "manager.jsonl"
+GUI_LOG_NAME = "gui.log"
+GUI_JSON_NAME = "gui.jsonl"
+FORMAT = "%(asctime)s %(levelname)s: %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+MAX_SERVER_FILES = 64  # per-server log files kept open at once
+# Attributes every LogRecord has; anything else came in through `extra`
+STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+TAIL_LINES = 20  # lines of captured process output worth keeping in the log
+
+_listener = None
+
+def tail_text(text, lines=TAIL_LINES):
+    return "\n".join(text.strip().splitlines()[-lines:])
+
+def log_event(event, message, server=None, level=logging.INFO, **fields):
+    # A structured record: `event`, `server` and the fields (pid, duration,
+    # returncode...) become keys in manager.jsonl, and `server` routes the
+    # line to that server's own log file.
+    logging.log(level, message, extra={"event": event, "server": server, **fields})
+
+def _gzip_rotate(source, dest):
+    with open(source, "rb") as src, gzip.open(dest, "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+class RotatingHandler(logging.handlers.RotatingFileHandler):
+    # Rolls over at max_bytes or every `interval` seconds, whichever comes
+    # first, and gzips the rotated file (on the listener thread, so callers
+    # never wait for it).
+    def __init__(self, filename, max_bytes, backups, interval=None):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+        self.interval = interval
+        self.rollover_at = time.time() + interval if interval else None
+        self.namer = lambda name: name + ".gz"
+        self.rotator = _gzip_rotate
+
+    def shouldRollover(self, record):
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            if self.stream is not None and self.stream.tell() > 0:
+                return True
+            self.rollover_at = time.time() + self.interval  # nothing written; don't rotate an empty file
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        if self.interval:
+            self.rollover_at = time.time() + self.interval
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {"time": round(record.created, 3), "level": record.levelname, "message": record.getMessage()}
+        for key, value in vars(record).items():
+            if key not in STANDARD_ATTRS and value is not None:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class ServerFileHandler(logging.Handler):
+    # Copies records tagged with a server name into <dir>/<server>.log. With
+    # hundreds of servers only the most recently used files stay open.
+    def __init__(self, directory, max_bytes, backups, interval, formatter):
+        super().__init__()
+        self.directory = Path(directory)
+        self.rotation = (max_bytes, backups, interval)
+        self.setFormatter(formatter)
+        self.files = OrderedDict()
+
+    def emit(self, record):
+        name = getattr(record, "server", None)
+        if not name:
+            return
+        handler = self.files.pop(name, None)
+        if handler is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            handler = RotatingHandler(self.directory / f"{Path(name).name}.log", *self.rotation)
+            handler.setFormatter(self.formatter)
+            if len(self.files) >= MAX_SERVER_FILES:
+                self.files.popitem(last=False)[1].close()
+        self.files[name] = handler
+        handler.handle(record)
+
+    def close(self):
+        for handler in self.files.values():
+            handler.close()
+        self.files.clear()
+        super().close()
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    # The stock prepare() runs the full formatter (timestamps included) on
+    # the calling thread; only merge the message arguments here and leave
+    # the formatting to the listener.
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def build_handlers(config, log_dir=LOG_DIR, console=False, log_name=LOG_NAME, json_name=JSON_NAME, per_server=True):
+    log_dir = Path(log_dir)
+    log_dir.mkdir(parents=True, exist_ok=True)
+    max_bytes = int(config["log_max_mb"] * 2**20)
+    backups = config["log_backups"]
+    interval = config["log_rotate_hours"] * 3600 or None
+    formatter = logging.Formatter(FORMAT, DATE_FORMAT)
+
+    handlers = [RotatingHandler(log_dir / log_name, max_bytes, backups, interval)]
+    handlers[0].setFormatter(formatter)
+    if config["log_json"]:
+        handlers.append(RotatingHandler(log_dir / json_name, max_bytes, backups, interval))
+        handlers[-1].setFormatter(JsonFormatter())
+    if config["log_per_server"] and per_server:
+        handlers.append(ServerFileHandler(log_dir / "servers", max_bytes, backups, interval, formatter))
+    if console:
+        handlers.append(logging.StreamHandler())
+        handlers[-1].setLevel(logging.INFO)
+        handlers[-1].setFormatter(logging.Formatter("%(message)s"))
+    return handlers
+
+def setup_logging(config=None, console=None, log_dir=LOG_DIR, **names):
+    # Called once by entry points (GUI, supervisor daemon) rather than at
+    # import time. Logging calls only put the record on a queue; a listener
+    # thread formats, writes and rotates. `console` defaults to echoing
+    # INFO lines when stderr is a terminal. `names` (log_name, json_name,
+    # per_server) go to build_handlers.
+    global _listener
+    if _listener is not None:
+        return _listener
+    config = config or load_config()
+    if console is None:
+        console = sys.stderr.isatty()
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(config["log_level"])
+    root.addHandler(_QueueHandler(records))
+    _listener = logging.handlers.QueueListener(records, *build_handlers(config, log_dir, console, **names),
+                                               respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+def stop_logging():
+    # Writes out whatever is still queued and closes the files.
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, _QueueHandler):
+            root.removeHandler(handler)
+    _listener = None
@@ -0,0 +1,449 @@
+import time
+import random
+import logging
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+import psutil
+
+WORKERS = 2
+HISTORY = 50  # finished jobs kept for job lists
+LAG_CHECK_INTERVAL = 5.0  # seconds a lag check result is reused
+MAX_DEFER = 3600  # a deferrable job runs anyway after waiting this long for lag to clear
+RATE_WINDOW = 10.0  # seconds of progress the rate (and ETA) is averaged over
+SAMPLE_INTERVAL = 0.5
+# Job priority -> (nice, ionice class, ionice level). Applied per worker
+# thread on Linux, where both are per-task; elsewhere jobs run as they are.
+PRIORITIES = {
+    "normal": (0, "IOPRIO_CLASS_BE", 4),
+    "low": (10, "IOPRIO_CLASS_BE", 7),
+    "idle": (19, "IOPRIO_CLASS_IDLE", None),
+}
+# minute hour day-of-month month day-of-week (0 or 7 = Sunday)
+CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+CRON_ALIASES = {"@hourly": "0 * * * *", "@daily": "0 0 * * *", "@weekly": "0 0 * * 0", "@monthly": "0 0 1 * *"}
+
+class JobCancelled(Exception):
+    pass
+
+# --- Schedules ---
+def _cron_field(text, lo, hi):
+    values = set()
+    for part in text.split(","):
+        part, _, step = part.partition("/")
+        if part == "*":
+            start, end = lo, hi
+        elif "-" in part:
+            start, end = (int(value) for value in part.split("-", 1))
+        else:
+            start = int(part)
+            end = hi if step else start  # "5/15" means 5, 20, 35, 50
+        step = int(step) if step else 1
+        if not lo <= start <= end <= hi or step < 1:
+            raise ValueError(f"'{text}' is outside {lo}-{hi}")
+        values.update(range(start, end + 1, step))
+    return values
+
+class Schedule:
+    # A five-field cron expression ("30 4 * * *", "*/15 * * * 1-5") or one of
+    # @hourly, @daily, @weekly, @monthly. As in cron, when both day fields are
+    # restricted a day matching either one fires.
+    def __init__(self, expression):
+        self.expression = expression
+        fields = CRON_ALIASES.get(expression.strip(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Schedule '{expression}' needs five fields: minute hour day month weekday")
+        try:
+            self.minutes, self.hours, self.days, self.months, weekdays = (
+                _cron_field(field, lo, hi) for field, (lo, hi) in zip(fields, CRON_FIELDS))
+        except ValueError as e:
+            raise ValueError(f"Bad schedule '{expression}': {e}")
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def _day_matches(self, moment):
+        day = moment.day in self.days
+        weekday = moment.isoweekday() % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_time(self, after):
+        # First matching minute after `after` (a naive local datetime)
+        moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 8)  # "0 0 29 2 *" can be years away
+        while moment < limit:
+            if moment.month not in self.months or not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+            elif moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f"Schedule '{self.expression}' never fires")
+
+# --- Bandwidth ---
+class TokenBucket:
+    # `rate` bytes per second with bursts of up to one second's worth; 0 is
+    # unlimited. One bucket is shared by every worker, so the limit holds
+    # for all running jobs together.
+    def __init__(self, rate=0):
+        self.lock = threading.Lock()
+        self.set_rate(rate)
+
+    def set_rate(self, rate):
+        with self.lock:
+            self.rate = rate
+            self.tokens = rate
+            self.stamp = time.monotonic()
+
+    def take(self, amount):
+        # Takes `amount` tokens, going into debt if there aren't enough, and
+        # returns how long the caller must wait for the debt to be repaid.
+        with self.lock:
+            if not self.rate:
+                return 0.0
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.stamp) * self.rate) - amount
+            self.stamp = now
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+_local = threading.local()
+
+def current_job():
+    return getattr(_local, "job", None)
+
+def account(read=0, written=0, done=None):
+    # Called by I/O loops (backups, provisioning, plugin downloads) after
+    # each block. Outside a maintenance job this does nothing; inside one it
+    # records progress (`done`, by default the bytes read), waits out the
+    # bandwidth limit, holds the job while servers lag and raises
+    # JobCancelled once the job is cancelled.
+    job = getattr(_local, "job", None)
+    if job is not None:
+        job.scheduler.throttle(job, read, written, read if done is None else done)
+
+def in_job(function):
+    # For handing work to another thread (e.g. a ThreadPoolExecutor inside a
+    # job): the wrapped function accounts its I/O to the calling job. Pool
+    # threads started by a worker inherit its nice and ionice on Linux.
+    job = getattr(_local, "job", None)
+    if job is None:
+        return function
+
+    def run(*args, **kwargs):
+        _local.job = job
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _local.job = None
+    return run
+
+# --- Jobs ---
+class Job:
+    def __init__(self, scheduler, job_id, name, function, kind, server, priority, total, deferrable):
+        self.scheduler = scheduler
+        self.id = job_id
+        self.name = name
+        self.function = function  # function(job) -> result, run on a worker thread
+        self.kind = kind
+        self.server = server
+        self.priority = priority
+        self.total = total  # bytes expected, None when unknown
+        self.deferrable = deferrable  # waits while any server is lagging
+        self.done = 0
+        self.state = "queued"  # queued, deferred, running, done, failed, cancelled
+        self.error = None
+        self.result = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.deferred_seconds = 0.0
+        self.samples = deque([(time.monotonic(), 0)])
+        self.lock = threading.Lock()  # progress may come from several threads (see in_job)
+        self.cancelled = threading.Event()
+        self.future = Future()
+
+    def advance(self, amount):
+        with self.lock:
+            self.done += amount
+            now = time.monotonic()
+            if now - self.samples[-1][0] >= SAMPLE_INTERVAL:
+                self.samples.append((now, self.done))
+                while len(self.samples) > 2 and now - self.samples[0][0] > RATE_WINDOW:
+                    self.samples.popleft()
+
+    def rate(self):
+        with self.lock:
+            if self.state != "running":
+                return 0.0
+            (first, done), now = self.samples[0], time.monotonic()
+            return (self.done - done) / (now - first) if now - first >= SAMPLE_INTERVAL else 0.0
+
+    def info(self):
+        rate = self.rate()
+        progress = min(1.0, self.done / self.total) if self.total else None
+        if self.state == "done":
+            progress = 1.0
+        eta = (self.total - self.done) / rate if self.total and rate and self.done < self.total else None
+        return {
+            "id": self.id,
+            "name": self.name,
+            "kind": self.kind,
+            "server": self.server,
+            "state": self.state,
+            "priority": self.priority,
+            "done": self.done,
+            "total": self.total,
+            "progress": progress,
+            "rate": rate,
+            "eta": eta,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "deferred_seconds": self.deferred_seconds,
+            "error": self.error,
+        }
+
+def _apply_priority(priority):
+    if not hasattr(psutil, "IOPRIO_CLASS_IDLE"):
+        return
+    nice, io_class, io_level = PRIORITIES[priority]
+    try:
+        task = psutil.Process(threading.get_native_id())
+        task.nice(nice)
+        task.ionice(getattr(psutil, io_class), io_level)
+    except (psutil.Error, OSError) as e:
+        # Going back up (idle -> normal) needs CAP_SYS_NICE; keep the lower one
+        logging.debug(f"Maintenance worker priority {priority} not applied: {e}")
+
+class MaintenanceScheduler:
+    # A small pool of worker threads for disk-heavy chores (backups, server
+    # provisioning, plugin downloads) so they never run on a server's or the
+    # GUI's thread. Jobs run at reduced CPU and I/O priority, share one read
+    # and one write bandwidth limit, can be cancelled between blocks, and
+    # deferrable ones wait while `lagging()` names any server. Cron-style
+    # schedules submit jobs with a random delay so a fleet's nightly backups
+    # spread out instead of all starting on the same minute.
+    def __init__(self, workers=WORKERS, read_rate=0, write_rate=0, lagging=None, max_defer=MAX_DEFER):
+        self.workers = workers
+        self.read_bucket = TokenBucket(read_rate)
+        self.write_bucket = TokenBucket(write_rate)
+        self.lagging = lagging  # callable -> names of servers behind on ticks
+        self.max_defer = max_defer
+        self.queue = deque()
+        self.jobs = {}  # id -> Job, queued or running
+        self.history = deque(maxlen=HISTORY)
+        self.condition = threading.Condition()
+        self.ids = itertools.count(1)
+        self.schedules = {}  # key -> [Schedule, jitter seconds, submit callable, due datetime]
+        self.lag_lock = threading.Lock()
+        self.lag_checked = -LAG_CHECK_INTERVAL
+        self.lag_names = []
+        self.threads = []
+        self.stopped = False
+
+    @classmethod
+    def from_config(cls, config, lagging=None):
+        return cls(
+            workers=config["maintenance_workers"],
+            read_rate=int(config["maintenance_read_mb_s"] * 2**20),
+            write_rate=int(config["maintenance_write_mb_s"] * 2**20),
+            lagging=lagging if config["maintenance_defer_on_lag"] else None,
+            max_defer=config["maintenance_max_defer_minutes"] * 60,
+        )
+
+    def start(self):
+        self.threads = [threading.Thread(target=self._work, name=f"maintenance-{i}", daemon=True)
+                        for i in range(self.workers)]
+        self.threads.append(threading.Thread(target=self._cron, name="maintenance-cron", daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self, cancel=True):
+        # Queued jobs are dropped; running ones are cancelled unless `cancel`
+        # is off, in which case they finish on their (daemon) threads.
+        with self.condition:
+            self.stopped = True
+            while self.queue:
+                job = self.queue.popleft()
+                job.cancelled.set()
+                self._finish(job, "cancelled", JobCancelled(f"{job.name} cancelled"))
+            if cancel:
+                for job in self.jobs.values():
+                    job.cancelled.set()
+            self.condition.notify_all()
+
+    # --- Jobs ---
+    def submit(self, name, function, kind="maintenance", server=None, priority="low", total=None,
+               deferrable=False):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}' (use {', '.join(PRIORITIES)})")
+        with self.condition:
+            job = Job(self, next(self.ids), name, function, kind, server, priority, total, deferrable)
+            self.jobs[job.id] = job
+            self.queue.append(job)
+            self.condition.notify_all()  # the cron thread waits on it too
+        return job
+
+    def cancel(self, job_id):
+        # Queued jobs are dropped straight away; running ones stop at their
+        # next block. Returns False for unknown or finished jobs.
+        with self.condition:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return False
+            job.cancelled.set()
+            if job in self.queue:
+                self.queue.remove(job)
+                self._finish(job, "cancelled", JobCancelled(f"{job.name} cancelled"))
+            self.condition.notify_all()
+            return True
+
+    def get(self, job_id):
+        with self.condition:
+            return self.jobs.get(job_id) or next((job for job in self.history if job.id == job_id), None)
+
+    def list(self):
+        with self.condition:
+            jobs = list(self.history) + sorted(self.jobs.values(), key=lambda job: job.id)
+        return [job.info() for job in jobs]
+
+    def _finish(self, job, state, outcome=None):
+        # Called with the condition held
+        job.state = state
+        job.finished = time.time()
+        self.jobs.pop(job.id, None)
+        self.history.append(job)
+        if state == "done":
+            job.future.set_result(job.result)
+        else:
+            job.future.set_exception(outcome)
+
+    def _work(self):
+        while True:
+            with self.condition:
+                while not self.stopped and not self.queue:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                job = self.queue.popleft()
+            _local.job = job
+            _apply_priority(job.priority)
+            job.started = time.time()
+            job.samples = deque([(time.monotonic(), 0)])
+            job.state = "running"
+            try:
+                self._hold(job)
+                job.result = job.function(job)
+                state, outcome = "done", None
+            except JobCancelled as e:
+                state, outcome = "cancelled", e
+            except Exception as e:
+                logging.error(f"Maintenance job '{job.name}' failed: {e}")
+                job.error = str(e)
+                state, outcome = "failed", e
+            finally:
+                _local.job = None
+            with self.condition:
+                self._finish(job, state, outcome)
+            logging.info(f"Maintenance job '{job.name}' {state} after {job.finished - job.started:.1f}s "
+                         f"({job.done / 2**20:.0f} MB)")
+
+    # --- Throttling ---
+    def throttle(self, job, read, written, done):
+        job.advance(done)
+        delay = max(self.read_bucket.take(read) if read else 0.0, self.write_bucket.take(written) if written else 0.0)
+        if delay:
+            job.cancelled.wait(delay)
+        self._hold(job)
+
+    def _hold(self, job):
+        # Waits while servers lag (deferrable jobs only, up to max_defer in
+        # total), then raises if the job was cancelled meanwhile.
+        if job.deferrable and not job.cancelled.is_set():
+            lagging = self._lagging()
+            if lagging and job.deferred_seconds < self.max_defer:
+                logging.info(f"Deferring '{job.name}': {', '.join(lagging)} behind on ticks")
+                job.state = "deferred"
+                began = time.monotonic()
+                while lagging and not job.cancelled.is_set() and \
+                        job.deferred_seconds + time.monotonic() - began < self.max_defer:
+                    job.cancelled.wait(LAG_CHECK_INTERVAL)
+                    lagging = self._lagging()
+                with job.lock:
+                    job.deferred_seconds += time.monotonic() - began
+                    job.samples = deque([(time.monotonic(), job.done)])
+                    job.state = "running"
+        if job.cancelled.is_set():
+            raise JobCancelled(f"{job.name} cancelled")
+
+    def _lagging(self):
+        if self.lagging is None:
+            return []
+        with self.lag_lock:
+            now = time.monotonic()
+            if now - self.lag_checked >= LAG_CHECK_INTERVAL:
+                try:
+                    self.lag_names = list(self.lagging())
+                except Exception as e:  # e.g. the supervisor went away; don't hold jobs on it
+                    logging.debug(f"Lag check failed: {e}")
+                    self.lag_names = []
+                self.lag_checked = now
+            return self.lag_names
+
+    # --- Schedules ---
+    def set_schedules(self, entries):
+        # entries: key -> (cron expression, jitter seconds, submit callable),
+        # replacing the previous set. Unchanged entries keep their next due
+        # time. Returns {key: error} for expressions that didn't parse.
+        planned, errors = {}, {}
+        now = datetime.now()
+        with self.condition:
+            for key, (expression, jitter, submit) in entries.items():
+                old = self.schedules.get(key)
+                if old is not None and old[0].expression == expression and old[1] == jitter:
+                    planned[key] = [old[0], jitter, submit, old[3]]
+                    continue
+                try:
+                    schedule = Schedule(expression)
+                    planned[key] = [schedule, jitter, submit, self._due(schedule, jitter, now)]
+                except ValueError as e:
+                    errors[key] = str(e)
+            self.schedules = planned
+            self.condition.notify_all()
+        return errors
+
+    def next_runs(self):
+        with self.condition:
+            return {key: entry[3] for key, entry in self.schedules.items()}
+
+    def _due(self, schedule, jitter, after):
+        return schedule.next_time(after) + timedelta(seconds=random.uniform(0, jitter))
+
+    def _cron(self):
+        while True:
+            with self.condition:
+                if self.stopped:
+                    return
+                now = datetime.now()
+                fire = []
+                for key, entry in self.schedules.items():
+                    if entry[3] <= now:
+                        fire.append((key, entry[2]))
+                        entry[3] = self._due(entry[0], entry[1], now)
+                upcoming = min((entry[3] for entry in self.schedules.values()), default=None)
+                if not fire:
+                    # Re-check at least once a minute: the clock may jump (suspend, DST)
+                    wait = 60.0 if upcoming is None else min(60.0, (upcoming - now).total_seconds())
+                    self.condition.wait(max(wait, 0.1))
+                    continue
+            for key, submit in fire:
+                try:
+                    submit()
+                except Exception as e:
+                    logging.error(f"Scheduled job {key} could not be submitted: {e}")
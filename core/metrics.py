@@ -0,0 +1,203 @@
+import time
+import logging
+import threading
+from array import array
+import psutil
+
+FIELDS = ("cpu", "rss", "threads", "fds", "io_read", "io_write")
+RAW_CAPACITY = 600  # 10 min of 1s samples
+# Downsampled tiers as (name, seconds per point, points kept): 1 h and 24 h.
+TIERS = (("10s", 10, 360), ("1m", 60, 1440))
+CHILDREN_REFRESH = 10  # re-scan child processes every N samples
+
+class MetricRing:
+    # Fixed-size ring of samples backed by flat arrays, one per field, so
+    # memory stays constant however long the sampler runs.
+    def __init__(self, capacity, fields=FIELDS):
+        self.capacity = capacity
+        self.fields = fields
+        self.times = array("d", bytes(8 * capacity))
+        self.values = {f: array("d", bytes(8 * capacity)) for f in fields}
+        self.head = 0
+        self.count = 0
+
+    def append(self, timestamp, sample):
+        i = self.head
+        self.times[i] = timestamp
+        for field in self.fields:
+            self.values[field][i] = sample[field]
+        self.head = (i + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def _order(self):
+        start = (self.head - self.count) % self.capacity
+        return [(start + k) % self.capacity for k in range(self.count)]
+
+    def window(self, field, seconds=None, now=None):
+        order = self._order()
+        if seconds is not None:
+            cutoff = (now or time.time()) - seconds
+            order = [i for i in order if self.times[i] >= cutoff]
+        values = self.values[field]
+        return [self.times[i] for i in order], [values[i] for i in order]
+
+    def last(self):
+        if not self.count:
+            return None
+        i = (self.head - 1) % self.capacity
+        return {"time": self.times[i], **{f: self.values[f][i] for f in self.fields}}
+
+class _Downsampler:
+    def __init__(self, step, capacity):
+        self.step = step
+        self.ring = MetricRing(capacity)
+        self.bucket = None
+        self.sums = dict.fromkeys(FIELDS, 0.0)
+        self.n = 0
+
+    def add(self, timestamp, sample):
+        bucket = int(timestamp // self.step)
+        if self.bucket is not None and bucket != self.bucket and self.n:
+            self.ring.append((self.bucket + 1) * self.step, {f: s / self.n for f, s in self.sums.items()})
+            self.sums = dict.fromkeys(FIELDS, 0.0)
+            self.n = 0
+        self.bucket = bucket
+        for field in FIELDS:
+            self.sums[field] += sample[field]
+        self.n += 1
+
+class ServerMetrics:
+    def __init__(self, name, pid):
+        self.name = name
+        self.pid = pid
+        self.process = psutil.Process(pid)
+        self.children = {}
+        self.samples = 0
+        self.last_io = None
+        self.lock = threading.Lock()
+        self.raw = MetricRing(RAW_CAPACITY)
+        self.tiers = {tier: _Downsampler(step, capacity) for tier, step, capacity in TIERS}
+
+    def _processes(self):
+        if self.samples % CHILDREN_REFRESH == 0:
+            try:
+                current = {p.pid: p for p in self.process.children(recursive=True)}
+            except psutil.Error:
+                current = {}
+            # Keep existing Process objects so cpu_percent() has a baseline.
+            self.children = {pid: self.children.get(pid, p) for pid, p in current.items()}
+        return [self.process, *self.children.values()]
+
+    def sample(self, now):
+        totals = dict.fromkeys(FIELDS, 0.0)
+        io_read = io_write = 0
+        for proc in self._processes():
+            try:
+                with proc.oneshot():
+                    totals["cpu"] += proc.cpu_percent(None)
+                    totals["rss"] += proc.memory_info().rss
+                    totals["threads"] += proc.num_threads()
+                    totals["fds"] += proc.num_fds() if hasattr(proc, "num_fds") else proc.num_handles()
+                    try:
+                        io = proc.io_counters()
+                        io_read += io.read_bytes
+                        io_write += io.write_bytes
+                    except (AttributeError, psutil.AccessDenied):
+                        pass
+            except psutil.NoSuchProcess:
+                if proc is self.process:
+                    raise
+                self.children.pop(proc.pid, None)
+            except psutil.AccessDenied:
+                pass
+        if self.last_io is not None:
+            elapsed = max(now - self.last_io[0], 1e-6)
+            totals["io_read"] = max(0, io_read - self.last_io[1]) / elapsed
+            totals["io_write"] = max(0, io_write - self.last_io[2]) / elapsed
+        self.last_io = (now, io_read, io_write)
+        self.samples += 1
+        with self.lock:
+            self.raw.append(now, totals)
+            for downsampler in self.tiers.values():
+                downsampler.add(now, totals)
+        return totals
+
+    def ring(self, tier):
+        return self.raw if tier == "1s" else self.tiers[tier].ring
+
+class MetricsSampler:
+    # `targets` returns {server name: pid} for every managed server; it is
+    # called on each tick so servers starting and stopping are picked up.
+    def __init__(self, targets, interval=1.0):
+        self.targets = targets
+        self.interval = interval
+        self.servers = {}
+        self.cpu_time = 0.0
+        self.wall_time = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="metrics-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        started = time.monotonic()
+        next_tick = started
+        while not self._stop.is_set():
+            cpu_before = time.thread_time()
+            self.sample_once()
+            self.cpu_time += time.thread_time() - cpu_before
+            self.wall_time = time.monotonic() - started
+            next_tick += self.interval
+            self._stop.wait(max(0.0, next_tick - time.monotonic()))
+
+    def sample_once(self):
+        now = time.time()
+        targets = self.targets()
+        for name in list(self.servers):
+            if name not in targets or self.servers[name].pid != targets[name]:
+                del self.servers[name]
+        for name, pid in targets.items():
+            metrics = self.servers.get(name)
+            try:
+                if metrics is None:
+                    metrics = self.servers[name] = ServerMetrics(name, pid)
+                metrics.sample(now)
+            except psutil.Error as e:
+                logging.debug(f"Could not sample '{name}' (PID {pid}): {e}")
+                self.servers.pop(name, None)
+
+    def overhead(self):
+        # Fraction of one core spent sampling since start().
+        return self.cpu_time / self.wall_time if self.wall_time else 0.0
+
+    # --- Query API ---
+    def latest(self, name):
+        metrics = self.servers.get(name)
+        if metrics is None:
+            return None
+        with metrics.lock:
+            return metrics.ring("1s").last()
+
+    def window(self, name, field, seconds=None, tier="1s"):
+        metrics = self.servers.get(name)
+        if metrics is None:
+            return [], []
+        with metrics.lock:
+            return metrics.ring(tier).window(field, seconds)
+
+    def percentiles(self, name, field, seconds=None, tier="1s", points=(50, 95, 99)):
+        _, values = self.window(name, field, seconds, tier)
+        if not values:
+            return {}
+        values.sort()
+        last = len(values) - 1
+        return {p: values[min(last, int(round(p / 100 * last)))] for p in points}
@@ -1,14 +1,331 @@
+import re
+import time
+import shutil
+import logging
+import threading
+import subprocess
+from functools import lru_cache
 import psutil
+from .config import load_server_config, save_server_config
+from .gc_log import GCLogTailer, gc_logging_flags
+
+# Off-heap cost of a JVM on top of -Xmx: metaspace, code cache, thread stacks,
+# GC structures and direct buffers. Roughly 256 MB plus 10% of the heap.
+JVM_BASE_OVERHEAD_MB = 256
+JVM_OVERHEAD_RATIO = 0.10
+MIN_HEAP_MB = 1024
+DEFAULT_MAX_HEAP_MB = 8192  # beyond this G1 pauses grow for little gain
 
 def get_optimal_ram():
     total = psutil.virtual_memory().total // (1024 * 1024)
     return max(1024, int(total * 0.5))  # 50% of total RAM
 
-def get_optimized_flags(ram_mb):
+def get_optimized_flags(ram_mb, profile="auto", java_major=None, large_pages=False):
     return [
         f"-Xms{ram_mb}M",
         f"-Xmx{ram_mb}M",
+        *profile_flags(profile, ram_mb, java_major, large_pages)
+    ]
+
+# --- JVM flag profiles ---
+@lru_cache(maxsize=None)
+def detect_java_version(java="java"):
+    # `java -version` prints e.g. 'openjdk version "21.0.2"' or the legacy
+    # 'java version "1.8.0_392"' on stderr. Returns the major version.
+    try:
+        result = subprocess.run(
+            [java, "-version"],
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            text=True,
+            timeout=10
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logging.warning(f"Could not run '{java} -version': {e}")
+        return None
+    match = re.search(r'version "(\d+)(?:\.(\d+))?', result.stderr + result.stdout)
+    if not match:
+        return None
+    major = int(match.group(1))
+    if major == 1 and match.group(2):
+        major = int(match.group(2))
+    return major
+
+# Collectors that not every build ships (Oracle JDKs have no Shenandoah) or
+# that are experimental on older releases (ZGC before 15, Shenandoah before 17)
+OPTIONAL_GCS = {"zgc": "-XX:+UseZGC", "shenandoah": "-XX:+UseShenandoahGC"}
+
+@lru_cache(maxsize=None)
+def gc_unlock_flags(java, profile):
+    # Flags `profile`'s collector needs on this JVM: [] if it works as is,
+    # ["-XX:+UnlockExperimentalVMOptions"] if it is experimental, None if
+    # the JVM refuses it either way.
+    for unlock in ([], ["-XX:+UnlockExperimentalVMOptions"]):
+        try:
+            result = subprocess.run(
+                [java, *unlock, OPTIONAL_GCS[profile], "-version"],
+                stdin=subprocess.DEVNULL,
+                capture_output=True,
+                timeout=30
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logging.warning(f"Could not check {profile} support of '{java}': {e}")
+            return None
+        if result.returncode == 0:
+            return unlock
+    return None
+
+def profile_available(profile, java=None):
+    return profile not in OPTIONAL_GCS or java is None or gc_unlock_flags(java, profile) is not None
+
+def _g1_flags(large_heap):
+    # Aikar's G1 tuning; the large-heap variant shifts more of the heap to
+    # the young generation and uses bigger regions.
+    new_size, max_new, region, reserve, ihop = (40, 50, 16, 15, 20) if large_heap else (30, 40, 8, 20, 15)
+    return [
+        "-XX:+UseG1GC",
+        "-XX:+ParallelRefProcEnabled",
+        "-XX:MaxGCPauseMillis=200",
+        "-XX:+UnlockExperimentalVMOptions",
+        "-XX:+DisableExplicitGC",
+        f"-XX:G1NewSizePercent={new_size}",
+        f"-XX:G1MaxNewSizePercent={max_new}",
+        f"-XX:G1HeapRegionSize={region}M",
+        f"-XX:G1ReservePercent={reserve}",
+        "-XX:G1HeapWastePercent=5",
+        "-XX:G1MixedGCCountTarget=4",
+        f"-XX:InitiatingHeapOccupancyPercent={ihop}",
+        "-XX:G1MixedGCLiveThresholdPercent=90",
+        "-XX:G1RSetUpdatingPauseTimePercent=5",
+        "-XX:SurvivorRatio=32",
+        "-XX:+PerfDisableSharedMem",
+        "-XX:MaxTenuringThreshold=1",
+    ]
+
+def _aikar_profile(heap_mb, java_major):
+    return [*_g1_flags(heap_mb >= 12288), "-XX:+AlwaysPreTouch"]
+
+def _zgc_profile(heap_mb, java_major):
+    if java_major is not None and java_major < 15:
+        return None
+    flags = ["-XX:+UseZGC", "-XX:+DisableExplicitGC", "-XX:+AlwaysPreTouch", "-XX:+PerfDisableSharedMem"]
+    if java_major in (21, 22):
+        flags.append("-XX:+ZGenerational")  # default from JDK 23
+    return flags
+
+def _shenandoah_profile(heap_mb, java_major):
+    if java_major is not None and java_major < 12:
+        return None
+    return [
+        "-XX:+UseShenandoahGC",
+        "-XX:+DisableExplicitGC",
+        "-XX:+AlwaysPreTouch",
+        "-XX:+PerfDisableSharedMem",
+    ]
+
+def _small_profile(heap_mb, java_major):
+    # Small heaps: keep G1 but skip pre-touching (slow startup, little gain)
+    # and let pauses run a bit longer in exchange for less GC work.
+    return [
         "-XX:+UseG1GC",
         "-XX:+ParallelRefProcEnabled",
-        "-XX:MaxGCPauseMillis=200"
+        "-XX:MaxGCPauseMillis=250",
+        "-XX:+UnlockExperimentalVMOptions",
+        "-XX:+DisableExplicitGC",
+        "-XX:G1NewSizePercent=20",
+        "-XX:G1HeapRegionSize=4M",
+        "-XX:+PerfDisableSharedMem",
     ]
+
+def _legacy_profile(heap_mb, java_major):
+    return ["-XX:+UseG1GC", "-XX:+ParallelRefProcEnabled", "-XX:MaxGCPauseMillis=200"]
+
+PROFILES = {
+    "aikar": _aikar_profile,
+    "zgc": _zgc_profile,
+    "shenandoah": _shenandoah_profile,
+    "small": _small_profile,
+    "legacy": _legacy_profile,
+}
+SMALL_HEAP_MB = 2048
+
+def resolve_profile(profile, heap_mb):
+    if profile in (None, "auto"):
+        return "small" if heap_mb < SMALL_HEAP_MB else "aikar"
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown JVM profile '{profile}'. Choose from: auto, {', '.join(PROFILES)}")
+    return profile
+
+def profile_flags(profile, heap_mb, java_major=None, large_pages=False, java=None):
+    # With `java`, collectors outside G1 are checked against that JVM first
+    profile = resolve_profile(profile, heap_mb)
+    flags = PROFILES[profile](heap_mb, java_major)
+    if flags is None:
+        logging.warning(f"JVM profile '{profile}' needs a newer JDK than {java_major}; using aikar.")
+        flags = _aikar_profile(heap_mb, java_major)
+    elif profile in OPTIONAL_GCS and java is not None:
+        unlock = gc_unlock_flags(java, profile)
+        if unlock is None:
+            logging.warning(f"'{java}' does not support the {profile} collector; using aikar.")
+            flags = _aikar_profile(heap_mb, java_major)
+        else:
+            flags = [*unlock, *flags]
+    if large_pages:
+        # Needs huge pages reserved by the OS; the JVM warns and continues
+        # without them otherwise.
+        flags = [*flags, "-XX:+UseLargePages"]
+    return flags
+
+def jvm_footprint(heap_mb):
+    return heap_mb + JVM_BASE_OVERHEAD_MB + int(heap_mb * JVM_OVERHEAD_RATIO)
+
+def heap_for_footprint(footprint_mb):
+    return int((footprint_mb - JVM_BASE_OVERHEAD_MB) / (1 + JVM_OVERHEAD_RATIO))
+
+def server_memory_limits(server_dir):
+    # Optional per-server "memory" block in config.json:
+    #   {"min_mb": 2048, "max_mb": 6144, "weight": 2, "cpus": 4}
+    return load_server_config(server_dir).get("memory", {})
+
+class OvercommitError(RuntimeError):
+    pass
+
+class MemoryAllocator:
+    # Hands out heap sizes so the sum of every running server's JVM footprint
+    # stays within the host budget. Running JVMs can't shrink their -Xmx, so
+    # existing reservations are never touched; new servers get at most their
+    # weighted fair share of the budget and whatever is still free.
+    def __init__(self, budget_mb=0, reserve_mb=2048, pin_cpus=False):
+        total = psutil.virtual_memory().total // (1024 * 1024)
+        self.budget_mb = budget_mb or max(MIN_HEAP_MB, total - reserve_mb)
+        self.pin_cpus = pin_cpus
+        self.reservations = {}  # name -> {"heap_mb", "footprint_mb", "weight", "cpus"}
+        self._cond = threading.Condition()
+
+    def used_mb(self):
+        return sum(r["footprint_mb"] for r in self.reservations.values())
+
+    def free_mb(self):
+        return self.budget_mb - self.used_mb()
+
+    def _plan(self, weight, min_mb, max_mb):
+        total_weight = weight + sum(r["weight"] for r in self.reservations.values())
+        fair_heap = heap_for_footprint(self.budget_mb * weight / total_weight)
+        free_heap = heap_for_footprint(self.free_mb())
+        heap = min(fair_heap, free_heap, max_mb or DEFAULT_MAX_HEAP_MB)
+        # A lone server with a small fair share may still take what is free
+        # up to its minimum.
+        if heap < min_mb <= free_heap:
+            heap = min_mb
+        return heap
+
+    def reserve(self, name, min_mb=MIN_HEAP_MB, max_mb=None, weight=1.0, cpus=0, wait=False, timeout=None):
+        with self._cond:
+            if name in self.reservations:
+                return self.reservations[name]["heap_mb"]
+            heap = self._plan(weight, min_mb, max_mb)
+            if heap < min_mb and wait:
+                self._cond.wait_for(lambda: self._plan(weight, min_mb, max_mb) >= min_mb, timeout)
+                heap = self._plan(weight, min_mb, max_mb)
+            if heap < min_mb:
+                raise OvercommitError(
+                    f"Cannot start '{name}': needs {jvm_footprint(min_mb)} MB, "
+                    f"only {self.free_mb()} MB of the {self.budget_mb} MB budget is free."
+                )
+            self.reservations[name] = {
+                "heap_mb": heap,
+                "footprint_mb": jvm_footprint(heap),
+                "weight": weight,
+                "cpus": self._pick_cpus(cpus) if self.pin_cpus else [],
+            }
+            logging.info(f"Reserved {heap} MB heap for '{name}' ({self.free_mb()} MB left of {self.budget_mb} MB)")
+            return heap
+
+    def release(self, name):
+        with self._cond:
+            if self.reservations.pop(name, None) is not None:
+                logging.info(f"Released memory reservation for '{name}'")
+                self._cond.notify_all()
+
+    # --- CPU pinning ---
+    def _pick_cpus(self, count):
+        taken = {cpu for r in self.reservations.values() for cpu in r["cpus"]}
+        free = [cpu for cpu in range(psutil.cpu_count() or 1) if cpu not in taken]
+        if not count:
+            # Default to an even split of the cores between running servers.
+            count = max(1, (psutil.cpu_count() or 1) // (len(self.reservations) + 1))
+        if len(free) < count:
+            logging.warning(f"Only {len(free)} free CPUs for a {count}-CPU request; not pinning.")
+            return []
+        return free[:count]
+
+    def apply_affinity(self, name, pid):
+        cpus = self.reservations.get(name, {}).get("cpus")
+        if not cpus:
+            return False
+        proc = psutil.Process(pid)
+        if not hasattr(proc, "cpu_affinity"):  # not available on macOS
+            return False
+        proc.cpu_affinity(cpus)
+        logging.info(f"Pinned '{name}' (PID {pid}) to CPUs {cpus}")
+        return True
+
+# --- Profile tuning harness ---
+def tune_jvm_profile(manager, name, profiles=("aikar", "zgc", "shenandoah", "small"), run_seconds=60,
+                     startup_timeout=300, pause_weight=0.05):
+    # Boots `name` once per candidate profile, measures time to "Done" and
+    # GC pauses over `run_seconds`, and stores the winner as the server's
+    # "jvm_profile". Score = startup s + pause_weight * p99 ms + total pause s.
+    server_dir = manager.server_path / name
+    log_dir = server_dir / "logs"
+    log_dir.mkdir(parents=True, exist_ok=True)
+    results = {}
+    for profile in profiles:
+        if not profile_available(profile, manager.JAVA_PATH):
+            results[profile] = {"error": "collector not available in this JDK"}
+            continue
+        gc_dir = log_dir / f"tune-{profile}"
+        shutil.rmtree(gc_dir, ignore_errors=True)
+        gc_dir.mkdir()
+        logging.info(f"Tuning '{name}': trying profile '{profile}'")
+        started = time.perf_counter()
+        console = manager.start_server(
+            name,
+            profile=profile,
+            extra_flags=gc_logging_flags(gc_dir.relative_to(server_dir))
+        )
+        if console is None:
+            results[profile] = {"error": "failed to start"}
+            continue
+        try:
+            if not console.ready.wait(startup_timeout):
+                results[profile] = {"error": f"not ready after {startup_timeout}s"}
+                continue
+            startup = console.startup_time or (time.perf_counter() - started)
+            console.exited.wait(run_seconds)
+            if console.exited.is_set():
+                results[profile] = {"error": f"exited with code {console.proc.returncode}"}
+                continue
+        finally:
+            if not console.exited.is_set():
+                manager.stop_server(name, deadline=120)
+        stats = GCLogTailer(gc_dir).poll()
+        results[profile] = {
+            "startup_s": startup,
+            "pauses": stats["pauses"],
+            "pause_total_ms": stats["pause_total_ms"],
+            "pause_max_ms": stats["pause_max_ms"],
+            "pause_p99_ms": stats["pause_p99_ms"],
+            "score": startup + pause_weight * stats["pause_p99_ms"] + stats["pause_total_ms"] / 1000,
+        }
+        logging.info(f"Tuning '{name}' {profile}: startup {startup:.2f}s, p99 pause {stats['pause_p99_ms']:.1f} ms")
+
+    scored = {p: r for p, r in results.items() if "score" in r}
+    best = min(scored, key=lambda p: scored[p]["score"]) if scored else None
+    config = load_server_config(server_dir)
+    config["jvm_tuning"] = {"tested": time.time(), "results": results, "best": best}
+    if best:
+        config["jvm_profile"] = best
+    save_server_config(server_dir, config)
+    logging.info(f"JVM tuning for '{name}' recommends {best}: {results}")
+    return best, results
@@ -0,0 +1,297 @@
+import os
+import re
+import json
+import logging
+import tomllib
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+INDEX_NAME = "plugin_index.json"
+SCAN_DIRS = ("plugins", "mods")
+# Dependency ids provided by the platform rather than by another jar.
+PLATFORM_IDS = {"minecraft", "java", "fabricloader", "fabric-loader", "quilt_loader", "forge", "neoforge"}
+DESCRIPTORS = (
+    ("paper-plugin.yml", "paper"),
+    ("plugin.yml", "bukkit"),
+    ("fabric.mod.json", "fabric"),
+    ("quilt.mod.json", "quilt"),
+    ("META-INF/neoforge.mods.toml", "neoforge"),
+    ("META-INF/mods.toml", "forge"),
+)
+
+# --- Descriptor parsing ---
+def _yaml_scalar(value):
+    value = value.strip()
+    if value.startswith("[") and value.endswith("]"):
+        return [_yaml_scalar(v) for v in value[1:-1].split(",") if v.strip()]
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+        return value[1:-1]
+    return value
+
+def _strip_comment(line):
+    quote = None
+    for i, ch in enumerate(line):
+        if ch in "'\"":
+            quote = None if quote == ch else (quote or ch)
+        elif ch == "#" and quote is None and (i == 0 or line[i - 1] in " \t"):
+            return line[:i].rstrip()
+    return line
+
+def parse_simple_yaml(text):
+    # Just enough YAML for plugin descriptors: nested maps, block and inline
+    # lists, quoted scalars and skipped block scalars (| and >). Avoids a
+    # PyYAML dependency for reading a handful of keys.
+    root = {}
+    stack = [(root, -1, False)]  # (container, indent, is_list)
+    pending = None  # (indent, parent, key) waiting for a nested block
+    block_indent = None
+    for raw in text.splitlines():
+        line = _strip_comment(raw.rstrip())
+        stripped = line.strip()
+        if not stripped or stripped == "---":
+            continue
+        indent = len(line) - len(line.lstrip())
+        if block_indent is not None:
+            if indent > block_indent:
+                continue
+            block_indent = None
+        is_item = stripped == "-" or stripped.startswith("- ")
+        if pending is not None:
+            key_indent, parent, key = pending
+            pending = None
+            if is_item and indent >= key_indent:
+                parent[key] = []
+                stack.append((parent[key], indent, True))
+            elif indent > key_indent:
+                parent[key] = {}
+                stack.append((parent[key], key_indent, False))
+        while len(stack) > 1:
+            container, level, is_list = stack[-1]
+            if is_list:
+                if indent > level or (indent == level and is_item):
+                    break
+            elif indent > level:
+                break
+            stack.pop()
+        container = stack[-1][0]
+        if is_item:
+            if isinstance(container, list):
+                container.append(_yaml_scalar(stripped[1:]))
+            continue
+        if ":" not in stripped or not isinstance(container, dict):
+            continue
+        key, _, value = stripped.partition(":")
+        key = key.strip().strip("'\"")
+        value = value.strip()
+        if not value:
+            container[key] = None
+            pending = (indent, container, key)
+        elif value[0] in "|>":
+            container[key] = ""
+            block_indent = indent
+        else:
+            container[key] = _yaml_scalar(value)
+    return root
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(v) for v in value]
+    return [str(value)]
+
+def _bukkit_meta(data):
+    return {
+        "id": str(data.get("name", "")),
+        "name": str(data.get("name", "")),
+        "version": str(data.get("version", "")),
+        "depends": _as_list(data.get("depend")),
+        "soft_depends": _as_list(data.get("softdepend")),
+        "conflicts": [],
+    }
+
+def _paper_meta(data):
+    meta = _bukkit_meta(data)
+    deps = data.get("dependencies") or {}
+    server_deps = deps.get("server", deps) if isinstance(deps, dict) else {}
+    for name, spec in (server_deps or {}).items():
+        if name == "bootstrap":
+            continue
+        required = str((spec or {}).get("required", "true")).lower() != "false"
+        (meta["depends"] if required else meta["soft_depends"]).append(name)
+    return meta
+
+def _fabric_meta(data):
+    return {
+        "id": data.get("id", ""),
+        "name": data.get("name", data.get("id", "")),
+        "version": str(data.get("version", "")),
+        "depends": list((data.get("depends") or {}).keys()),
+        "soft_depends": list((data.get("recommends") or {}).keys()) + list((data.get("suggests") or {}).keys()),
+        "conflicts": list((data.get("breaks") or {}).keys()) + list((data.get("conflicts") or {}).keys()),
+    }
+
+def _quilt_meta(data):
+    loader = data.get("quilt_loader", {})
+    depends = []
+    for dep in loader.get("depends", []):
+        dep_id = dep if isinstance(dep, str) else dep.get("id", "")
+        depends.append(dep_id.split(":")[-1])
+    breaks = [b if isinstance(b, str) else b.get("id", "") for b in loader.get("breaks", [])]
+    return {
+        "id": loader.get("id", ""),
+        "name": (loader.get("metadata") or {}).get("name", loader.get("id", "")),
+        "version": str(loader.get("version", "")),
+        "depends": depends,
+        "soft_depends": [],
+        "conflicts": [b.split(":")[-1] for b in breaks],
+    }
+
+def _forge_meta(data, manifest_version):
+    mods = data.get("mods") or [{}]
+    mod = mods[0]
+    mod_id = mod.get("modId", "")
+    version = str(mod.get("version", ""))
+    if "${" in version:  # filled in from the jar manifest at build time
+        version = manifest_version or version
+    depends, soft, conflicts = [], [], []
+    for dep in (data.get("dependencies") or {}).get(mod_id, []):
+        dep_type = str(dep.get("type", "required" if dep.get("mandatory", True) else "optional")).lower()
+        target = {"required": depends, "optional": soft, "incompatible": conflicts}.get(dep_type, soft)
+        target.append(dep.get("modId", ""))
+    return {
+        "id": mod_id,
+        "name": mod.get("displayName", mod_id),
+        "version": version,
+        "depends": depends,
+        "soft_depends": soft,
+        "conflicts": conflicts,
+    }
+
+def _manifest_version(jar):
+    try:
+        text = jar.read("META-INF/MANIFEST.MF").decode("utf-8", "replace")
+    except KeyError:
+        return None
+    match = re.search(r"^Implementation-Version:\s*(.+)$", text, re.MULTILINE)
+    return match.group(1).strip() if match else None
+
+def read_jar_metadata(path):
+    # ZipFile only reads the central directory up front; we then decompress
+    # the one descriptor entry we need. Nothing is extracted to disk.
+    with zipfile.ZipFile(path) as jar:
+        names = set(jar.namelist())
+        for entry, loader in DESCRIPTORS:
+            if entry not in names:
+                continue
+            text = jar.read(entry).decode("utf-8", "replace")
+            if loader == "bukkit":
+                meta = _bukkit_meta(parse_simple_yaml(text))
+            elif loader == "paper":
+                meta = _paper_meta(parse_simple_yaml(text))
+            elif loader == "fabric":
+                meta = _fabric_meta(json.loads(text, strict=False))
+            elif loader == "quilt":
+                meta = _quilt_meta(json.loads(text, strict=False))
+            else:
+                meta = _forge_meta(tomllib.loads(text), _manifest_version(jar))
+            meta["loader"] = loader
+            return meta
+    return {"id": "", "name": "", "version": "", "loader": None, "depends": [], "soft_depends": [], "conflicts": []}
+
+# --- Per-server index ---
+class PluginIndex:
+    # Metadata for every jar in a server's plugins/ and mods/, cached in
+    # <server>/plugin_index.json keyed on size+mtime so an unchanged jar is
+    # never reopened.
+    def __init__(self, server_dir):
+        self.server_dir = Path(server_dir)
+        self.index_path = self.server_dir / INDEX_NAME
+        self.entries = {}  # "plugins/Foo.jar" -> {"size", "mtime_ns", "meta"}
+        self.jar_opens = 0
+        if self.index_path.exists():
+            try:
+                with open(self.index_path) as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Rebuilding unreadable plugin index {self.index_path}: {e}")
+
+    def refresh(self):
+        entries = {}
+        changed = False
+        for dirname in SCAN_DIRS:
+            directory = self.server_dir / dirname
+            if not directory.is_dir():
+                continue
+            with os.scandir(directory) as it:
+                for item in it:
+                    if not item.name.endswith(".jar") or not item.is_file():
+                        continue
+                    st = item.stat()
+                    rel = f"{dirname}/{item.name}"
+                    cached = self.entries.get(rel)
+                    if cached and cached["size"] == st.st_size and cached["mtime_ns"] == st.st_mtime_ns:
+                        entries[rel] = cached
+                        continue
+                    self.jar_opens += 1
+                    try:
+                        meta = read_jar_metadata(item.path)
+                    # AttributeError/TypeError: a descriptor whose fields have
+                    # unexpected types (a string where a table belongs)
+                    except (zipfile.BadZipFile, OSError, ValueError, tomllib.TOMLDecodeError,
+                            AttributeError, TypeError) as e:
+                        meta = {"id": "", "name": "", "version": "", "loader": None,
+                                "depends": [], "soft_depends": [], "conflicts": [], "error": str(e)}
+                    entries[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "meta": meta}
+                    changed = True
+        if changed or entries.keys() != self.entries.keys():
+            self.entries = entries
+            tmp = self.index_path.with_name(INDEX_NAME + ".tmp")
+            with open(tmp, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp, self.index_path)
+        return self.plugins()
+
+    def plugins(self):
+        return [{"file": rel, **entry["meta"]} for rel, entry in sorted(self.entries.items())]
+
+    def check(self):
+        # Missing hard dependencies, declared conflicts that are installed,
+        # and the same plugin/mod id present in more than one jar.
+        plugins = self.plugins()
+        by_id = {}
+        for plugin in plugins:
+            if plugin["id"]:
+                by_id.setdefault(plugin["id"].lower(), []).append(plugin)
+        problems = {"missing": [], "conflicts": [], "duplicates": []}
+        for plugin in plugins:
+            for dep in plugin["depends"]:
+                if dep.lower() not in by_id and dep.lower() not in PLATFORM_IDS:
+                    problems["missing"].append({"file": plugin["file"], "id": plugin["id"], "requires": dep})
+            for other in plugin["conflicts"]:
+                if other.lower() in by_id:
+                    problems["conflicts"].append({"file": plugin["file"], "id": plugin["id"], "conflicts_with": other})
+        for plugin_id, copies in by_id.items():
+            if len(copies) > 1:
+                problems["duplicates"].append({
+                    "id": plugin_id,
+                    "files": [p["file"] for p in copies],
+                    "versions": [p["version"] for p in copies],
+                })
+        return problems
+
+def refresh_fleet(servers_dir, max_workers=8):
+    servers = [p for p in Path(servers_dir).iterdir() if p.is_dir()]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return dict(zip((p.name for p in servers), pool.map(lambda p: PluginIndex(p).refresh(), servers)))
+
+def find_servers_with(servers_dir, plugin_id):
+    # Which servers run plugin/mod `plugin_id`, and which version.
+    plugin_id = plugin_id.lower()
+    matches = []
+    for server, plugins in refresh_fleet(servers_dir).items():
+        for plugin in plugins:
+            if plugin["id"].lower() == plugin_id or plugin["name"].lower() == plugin_id:
+                matches.append({"server": server, "file": plugin["file"], "version": plugin["version"]})
+    return sorted(matches, key=lambda m: m["server"])
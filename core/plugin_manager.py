@@ -1,20 +1,259 @@
 import os
+import json
 import shutil
-import requests
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, unquote
+from .plugin_index import PluginIndex
+from .backup_manager import _tmp_name
+from .maintenance import JobCancelled, account, in_job
+
+DEFAULT_CACHE_DIR = os.path.join("cache", "plugins")
+DOWNLOAD_WORKERS = 8
+TIMEOUT = (10, 60)  # connect, read
+CHUNK_SIZE = 256 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    # One pooled session for every download so connections to the same host
+    # are reused across plugins and servers.
+    global _session
+    with _session_lock:
+        if _session is None:
+            # Imported here: requests is slow to import and only needed once
+            # something is actually downloaded.
+            import requests
+            from requests.adapters import HTTPAdapter
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=DOWNLOAD_WORKERS, pool_maxsize=DOWNLOAD_WORKERS, max_retries=2)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+def plugin_filename(url):
+    return unquote(os.path.basename(urlparse(url).path)) or "plugin.jar"
+
+def _link_or_copy(src, dst):
+    # Hardlink the cached jar into the server, atomically replacing any
+    # existing file; copy when the cache lives on another filesystem.
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return  # already installed (rename() would be a no-op anyway)
+    # Two jobs may install the same plugin into the same server at once
+    tmp = _tmp_name(dst)
+    try:
+        try:
+            os.link(src, tmp)
+        except OSError:
+            shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+# --- Partial downloads ---
+def _write_validator(part, headers):
+    # Weak ETags can't be used with If-Range; Last-Modified can
+    etag = headers.get("ETag")
+    validator = etag if etag and not etag.startswith("W/") else headers.get("Last-Modified")
+    with open(part + ".json", "w") as f:
+        json.dump({"validator": validator}, f)
+
+def _read_validator(part):
+    try:
+        with open(part + ".json") as f:
+            return json.load(f)["validator"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _remove_partial(part):
+    for path in (part, part + ".json"):
+        if os.path.exists(path):
+            os.remove(path)
+
+class PluginCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.blobs_dir = os.path.join(cache_dir, "blobs")
+        self.partial_dir = os.path.join(cache_dir, "partial")
+        self.index_path = os.path.join(cache_dir, "index.json")
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        os.makedirs(self.partial_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._url_locks = {}
+        self.index = {}  # url -> {"sha256", "etag", "last_modified", "size"}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+
+    def _save_index(self):
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.index, f, indent=1)
+        os.replace(tmp, self.index_path)
+
+    def _url_lock(self, url):
+        with self._lock:
+            return self._url_locks.setdefault(url, threading.Lock())
+
+    def blob_path(self, sha256):
+        return os.path.join(self.blobs_dir, f"{sha256}.jar")
+
+    def fetch(self, url, sha256=None):
+        # Returns the path of the verified jar in the cache, downloading only
+        # when the cached copy is missing or the server says it changed.
+        with self._url_lock(url):
+            entry = self.index.get(url)
+            if entry and sha256 and entry["sha256"] != sha256:
+                entry = None
+            if entry and os.path.exists(self.blob_path(entry["sha256"])):
+                if sha256 or not (entry.get("etag") or entry.get("last_modified")):
+                    # Pinned by hash (or nothing to revalidate with): trust it.
+                    return self.blob_path(entry["sha256"])
+            return self._download(url, entry, sha256)
+
+    def _download(self, url, entry, sha256):
+        session = get_session()
+        key = hashlib.sha256(url.encode()).hexdigest()
+        part = os.path.join(self.partial_dir, key)
+        headers = {}
+        if entry and os.path.exists(self.blob_path(entry["sha256"])):
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        # A partial file is only resumed with If-Range and the validator of
+        # the response it came from: if the file changed upstream the server
+        # sends all of it (200) instead of new bytes to append to old ones.
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        validator = _read_validator(part) if offset else None
+        if validator:
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = validator
+
+        with session.get(url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+            if response.status_code == 304:
+                logging.info(f"Plugin cache hit (not modified): {url}")
+                return self.blob_path(entry["sha256"])
+            if response.status_code == 416:  # stale partial file
+                _remove_partial(part)
+                return self._download(url, entry, sha256)
+            response.raise_for_status()
+            digest = hashlib.sha256()
+            if response.status_code == 206 and offset:
+                if not response.headers.get("Content-Range", "").startswith(f"bytes {offset}-"):
+                    _remove_partial(part)  # not the range we asked for
+                    return self._download(url, entry, sha256)
+                with open(part, "rb") as f:
+                    for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+                        digest.update(block)
+                mode = "ab"
+                logging.info(f"Resuming {url} at byte {offset}")
+            else:
+                mode = "wb"
+                _write_validator(part, response.headers)
+            with open(part, mode) as f:
+                for block in response.iter_content(CHUNK_SIZE):
+                    f.write(block)
+                    digest.update(block)
+                    account(written=len(block), done=len(block))
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+
+        actual = digest.hexdigest()
+        if sha256 and actual != sha256:
+            _remove_partial(part)
+            raise ValueError(f"SHA-256 mismatch for {url}: expected {sha256}, got {actual}")
+        blob = self.blob_path(actual)
+        os.replace(part, blob)
+        _remove_partial(part)
+        with self._lock:
+            self.index[url] = {
+                "sha256": actual,
+                "etag": etag,
+                "last_modified": last_modified,
+                "size": os.path.getsize(blob),
+            }
+            self._save_index()
+        logging.info(f"Downloaded {url} ({actual[:12]})")
+        return blob
+
+_default_cache = None
+
+def get_cache(cache_dir=DEFAULT_CACHE_DIR):
+    global _default_cache
+    with _session_lock:
+        if _default_cache is None or _default_cache.cache_dir != cache_dir:
+            _default_cache = PluginCache(cache_dir)
+        return _default_cache
+
+def install_plugins(jobs, max_workers=DOWNLOAD_WORKERS, cache=None):
+    # jobs: iterable of (server_dir, url) or (server_dir, url, sha256).
+    # Each distinct URL is downloaded once, then hardlinked into every
+    # server that asked for it. Returns one result dict per job.
+    cache = cache or get_cache()
+    jobs = [tuple(job) + (None,) * (3 - len(job)) for job in jobs]
+    wanted = {}
+    for _, url, sha256 in jobs:
+        wanted.setdefault(url, sha256)
+
+    blobs = {}
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {url: pool.submit(in_job(cache.fetch), url, sha256) for url, sha256 in wanted.items()}
+        for url, future in futures.items():
+            try:
+                blobs[url] = future.result()
+            except JobCancelled:
+                raise
+            except Exception as e:
+                errors[url] = str(e)
+                logging.error(f"Plugin download failed for {url}: {e}")
+
+    results = []
+    for server_dir, url, _ in jobs:
+        result = {"server": server_dir, "url": url}
+        if url in errors:
+            result["error"] = errors[url]
+        else:
+            plugins_dir = os.path.join(server_dir, "plugins")
+            os.makedirs(plugins_dir, exist_ok=True)
+            target = os.path.join(plugins_dir, plugin_filename(url))
+            _link_or_copy(blobs[url], target)
+            result["path"] = target
+        results.append(result)
+    return results
 
 class PluginManager:
     def __init__(self, server_dir):
+        self.server_dir = server_dir
         self.plugins_dir = os.path.join(server_dir, "plugins")
         os.makedirs(self.plugins_dir, exist_ok=True)
 
-    def install_plugin(self, plugin_url):
-        filename = plugin_url.split("/")[-1]
-        response = requests.get(plugin_url)
-        with open(os.path.join(self.plugins_dir, filename), "wb") as f:
-            f.write(response.content)
+    def install_plugin(self, plugin_url, sha256=None):
+        result = install_plugins([(self.server_dir, plugin_url, sha256)])[0]
+        if "error" in result:
+            raise RuntimeError(f"Failed to install {plugin_url}: {result['error']}")
+        return result["path"]
 
-    def list_plugins(self):
+    def install_plugins(self, plugin_urls):
+        return install_plugins([(self.server_dir, url) for url in plugin_urls])
+
+    def list_plugins(self, detailed=False):
+        # detailed=True returns name/version/loader/dependencies for every
+        # jar in plugins/ and mods/, served from the cached index.
+        if detailed:
+            return PluginIndex(self.server_dir).refresh()
         return os.listdir(self.plugins_dir)
 
+    def check_plugins(self):
+        index = PluginIndex(self.server_dir)
+        index.refresh()
+        return index.check()
+
     def remove_plugin(self, name):
         os.remove(os.path.join(self.plugins_dir, name))
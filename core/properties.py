@@ -0,0 +1,365 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROPERTIES_NAME = "server.properties"
+BATCH_WORKERS = 8
+INT_MAX = 2**31 - 1
+
+# Vanilla keys and what they accept: ("bool",), ("int", low, high),
+# ("enum", choices...) or ("str",). Mods and forks add their own keys;
+# those need allow_unknown.
+SCHEMA = {
+    "accepts-transfers": ("bool",),
+    "allow-flight": ("bool",),
+    "allow-nether": ("bool",),
+    "broadcast-console-to-ops": ("bool",),
+    "broadcast-rcon-to-ops": ("bool",),
+    "bug-report-link": ("str",),
+    "difficulty": ("enum", "peaceful", "easy", "normal", "hard"),
+    "enable-command-block": ("bool",),
+    "enable-jmx-monitoring": ("bool",),
+    "enable-query": ("bool",),
+    "enable-rcon": ("bool",),
+    "enable-status": ("bool",),
+    "enforce-secure-profile": ("bool",),
+    "enforce-whitelist": ("bool",),
+    "entity-broadcast-range-percentage": ("int", 10, 1000),
+    "force-gamemode": ("bool",),
+    "function-permission-level": ("int", 1, 4),
+    "gamemode": ("enum", "survival", "creative", "adventure", "spectator"),
+    "generate-structures": ("bool",),
+    "generator-settings": ("str",),
+    "hardcore": ("bool",),
+    "hide-online-players": ("bool",),
+    "initial-disabled-packs": ("str",),
+    "initial-enabled-packs": ("str",),
+    "level-name": ("str",),
+    "level-seed": ("str",),
+    "level-type": ("str",),
+    "log-ips": ("bool",),
+    "max-chained-neighbor-updates": ("int", -1, INT_MAX),
+    "max-players": ("int", 0, INT_MAX),
+    "max-tick-time": ("int", -1, INT_MAX),
+    "max-world-size": ("int", 1, 29999984),
+    "motd": ("str",),
+    "network-compression-threshold": ("int", -1, INT_MAX),
+    "online-mode": ("bool",),
+    "op-permission-level": ("int", 0, 4),
+    "pause-when-empty-seconds": ("int", -1, INT_MAX),
+    "player-idle-timeout": ("int", 0, INT_MAX),
+    "prevent-proxy-connections": ("bool",),
+    "previews-chat": ("bool",),
+    "pvp": ("bool",),
+    "query.port": ("int", 1, 65535),
+    "rate-limit": ("int", 0, INT_MAX),
+    "rcon.password": ("str",),
+    "rcon.port": ("int", 1, 65535),
+    "region-file-compression": ("enum", "deflate", "lz4", "none"),
+    "require-resource-pack": ("bool",),
+    "resource-pack": ("str",),
+    "resource-pack-id": ("str",),
+    "resource-pack-prompt": ("str",),
+    "resource-pack-sha1": ("str",),
+    "server-ip": ("str",),
+    "server-port": ("int", 1, 65535),
+    "simulation-distance": ("int", 2, 32),
+    "spawn-animals": ("bool",),
+    "spawn-monsters": ("bool",),
+    "spawn-npcs": ("bool",),
+    "spawn-protection": ("int", 0, INT_MAX),
+    "sync-chunk-writes": ("bool",),
+    "text-filtering-config": ("str",),
+    "use-native-transport": ("bool",),
+    "view-distance": ("int", 2, 32),
+    "white-list": ("bool",),
+}
+
+# The keys that decide tick and bandwidth cost, set together. Take effect
+# on the next restart.
+PRESETS = {
+    "vanilla": ("Mojang's defaults", {
+        "view-distance": 10, "simulation-distance": 10, "network-compression-threshold": 256,
+        "sync-chunk-writes": True, "entity-broadcast-range-percentage": 100,
+    }),
+    "balanced": ("Fewer ticking chunks, async chunk writes", {
+        "view-distance": 10, "simulation-distance": 6, "network-compression-threshold": 256,
+        "sync-chunk-writes": False, "entity-broadcast-range-percentage": 100,
+    }),
+    "low-spec": ("Small or shared hosts: minimal ticking area and entity tracking", {
+        "view-distance": 6, "simulation-distance": 4, "network-compression-threshold": 256,
+        "sync-chunk-writes": False, "entity-broadcast-range-percentage": 60,
+    }),
+    "many-players": ("Busy servers: trade render distance for tick time, compress less often", {
+        "view-distance": 8, "simulation-distance": 5, "network-compression-threshold": 512,
+        "sync-chunk-writes": False, "entity-broadcast-range-percentage": 75,
+    }),
+    "lan": ("Local network: bandwidth is free, skip compression CPU", {
+        "network-compression-threshold": -1,
+    }),
+}
+
+# --- Java Properties syntax ---
+ESCAPES = {"t": "\t", "n": "\n", "r": "\r", "f": "\f"}
+KEY_END = re.compile(r"(?<!\\)(?:\\\\)*[=: \t\f]")
+# Java only ends lines at \r, \n and \r\n (str.splitlines also splits on \u2028 and friends)
+PHYSICAL_LINE = re.compile(r"[^\r\n]*(?:\r\n|[\r\n])|[^\r\n]+$")
+
+def _unescape(text):
+    out = []
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char != "\\" or i + 1 == len(text):
+            out.append(char)
+            i += 1
+            continue
+        char = text[i + 1]
+        if char == "u" and re.fullmatch(r"[0-9a-fA-F]{4}", text[i + 2:i + 6]):
+            out.append(chr(int(text[i + 2:i + 6], 16)))
+            i += 6
+        else:
+            out.append(ESCAPES.get(char, char))
+            i += 2
+    # Join any \uD83D\uDE00-style surrogate pairs into one character
+    return "".join(out).encode("utf-16", "surrogatepass").decode("utf-16")
+
+def _escape(text, is_key=False):
+    # As java.util.Properties.store writes it; non-ASCII becomes \uXXXX so
+    # both Latin-1 and UTF-8 readers load it back.
+    out = []
+    for index, char in enumerate(text):
+        if char == "\\":
+            out.append("\\\\")
+        elif char in "=:#!":
+            out.append("\\" + char)
+        elif char == " " and (is_key or index == 0):
+            out.append("\\ ")
+        elif char in "\t\n\r\f":
+            out.append("\\" + {"\t": "t", "\n": "n", "\r": "r", "\f": "f"}[char])
+        elif ord(char) < 0x20 or ord(char) > 0x7e:
+            # UTF-16 code units, so characters outside the BMP become a surrogate pair
+            data = char.encode("utf-16-be")
+            out.extend(f"\\u{int.from_bytes(data[i:i + 2], 'big'):04X}" for i in range(0, len(data), 2))
+        else:
+            out.append(char)
+    return "".join(out)
+
+def _logical_lines(text):
+    # Yields (raw text including line endings, logical line). A line ending
+    # in an odd number of backslashes continues on the next one, whose
+    # leading whitespace is dropped.
+    physical = PHYSICAL_LINE.findall(text)
+    i = 0
+    while i < len(physical):
+        raw = physical[i]
+        line = raw.rstrip("\r\n").lstrip(" \t\f")
+        i += 1
+        if not line or line[0] in "#!":
+            yield raw, None
+            continue
+        while (len(line) - len(line.rstrip("\\"))) % 2 == 1 and i < len(physical):
+            line = line[:-1] + physical[i].rstrip("\r\n").lstrip(" \t\f")
+            raw += physical[i]
+            i += 1
+        if (len(line) - len(line.rstrip("\\"))) % 2 == 1:
+            line = line[:-1]  # continuation at end of file
+        yield raw, line
+
+def _split(line):
+    # Key ends at the first unescaped '=', ':' or whitespace; the separator
+    # is whitespace with at most one '=' or ':' in it.
+    match = KEY_END.search(line)
+    if match is None:
+        return _unescape(line), ""
+    key, rest = line[:match.end() - 1], line[match.end() - 1:]
+    rest = rest.lstrip(" \t\f")
+    if rest[:1] in ("=", ":"):
+        rest = rest[1:].lstrip(" \t\f")
+    return _unescape(key), _unescape(rest)
+
+class Properties:
+    # A server.properties file kept as its original lines, so comments,
+    # order and formatting survive edits; only changed keys are rewritten.
+    def __init__(self, text=""):
+        self.entries = []  # [raw text, key or None, value]
+        self.index = {}  # key -> position in entries (the last one wins, as in Java)
+        self.newline = "\r\n" if "\r\n" in text else "\n"
+        for raw, line in _logical_lines(text):
+            if line is None:
+                self.entries.append([raw, None, None])
+            else:
+                key, value = _split(line)
+                self.index[key] = len(self.entries)
+                self.entries.append([raw, key, value])
+
+    def copy(self):
+        clone = Properties()
+        clone.entries = [list(entry) for entry in self.entries]
+        clone.index = dict(self.index)
+        clone.newline = self.newline
+        return clone
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def get(self, key, default=None):
+        position = self.index.get(key)
+        return default if position is None else self.entries[position][2]
+
+    def typed(self, key, default=None):
+        value = self.get(key)
+        return default if value is None else parse_value(key, value)
+
+    def as_dict(self):
+        return {key: self.entries[position][2] for key, position in self.index.items()}
+
+    def set(self, key, value):
+        # `value` is the string form (see format_value)
+        line = f"{_escape(key, is_key=True)}={_escape(value)}{self.newline}"
+        position = self.index.get(key)
+        if position is None:
+            if self.entries and not self.entries[-1][0].endswith(("\n", "\r")):
+                self.entries[-1][0] += self.newline
+            self.index[key] = len(self.entries)
+            self.entries.append([line, key, value])
+        elif self.entries[position][2] != value:
+            self.entries[position] = [line, key, value]
+
+    def dump(self):
+        return "".join(entry[0] for entry in self.entries)
+
+# --- Types ---
+def parse_value(key, value):
+    # The string from the file as the type the server reads it as
+    kind = SCHEMA.get(key, ("str",))
+    if kind[0] == "bool":
+        return value.strip().lower() == "true"  # Boolean.parseBoolean
+    if kind[0] == "int":
+        try:
+            return int(value.strip())
+        except ValueError:
+            return None  # the server falls back to its default
+    return value
+
+def format_value(key, value, allow_unknown=False):
+    # Validates `value` for `key` and returns the string to write.
+    kind = SCHEMA.get(key)
+    if kind is None:
+        if not allow_unknown:
+            raise ValueError(f"Unknown property '{key}'")
+        kind = ("str",)
+    if kind[0] == "bool":
+        if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+            return value.strip().lower()
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        raise ValueError(f"{key} must be true or false, not '{value}'")
+    if kind[0] == "int":
+        try:
+            number = int(str(value).strip()) if not isinstance(value, bool) else None
+        except ValueError:
+            number = None
+        if number is None or not kind[1] <= number <= kind[2]:
+            raise ValueError(f"{key} must be a whole number from {kind[1]} to {kind[2]}, not '{value}'")
+        return str(number)
+    if kind[0] == "enum":
+        text = str(value).strip().lower()
+        if text not in kind[1:]:
+            raise ValueError(f"{key} must be one of {', '.join(kind[1:])}, not '{value}'")
+        return text
+    return str(value)
+
+def validate_changes(changes, allow_unknown=False):
+    # {key: value} -> {key: string}; every problem reported at once
+    formatted, problems = {}, []
+    for key, value in changes.items():
+        try:
+            formatted[key] = format_value(key, value, allow_unknown)
+        except ValueError as e:
+            problems.append(str(e))
+    if problems:
+        raise ValueError("; ".join(problems))
+    return formatted
+
+def preset_changes(name):
+    if name not in PRESETS:
+        raise ValueError(f"Unknown preset '{name}' (choose from {', '.join(PRESETS)})")
+    return dict(PRESETS[name][1])
+
+# --- Files ---
+_cache = {}  # path -> (mtime_ns, size, Properties)
+_cache_lock = threading.Lock()
+
+def _read_text(path):
+    data = path.read_bytes()
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode("latin-1")  # what Properties.load(InputStream) assumes
+
+def load_properties(server_dir):
+    # Parsed server.properties, cached until the file's mtime or size
+    # changes. Returns a copy the caller may edit; a missing file is empty.
+    path = Path(server_dir) / PROPERTIES_NAME
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return Properties()
+    key = str(path)
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2].copy()
+    props = Properties(_read_text(path))
+    with _cache_lock:
+        _cache[key] = (st.st_mtime_ns, st.st_size, props)
+    return props.copy()
+
+def save_properties(server_dir, props):
+    # Temp file in the same directory, flushed, then renamed over the
+    # original: a crash or a server starting mid-write sees the old file or
+    # the new one, never half of one.
+    path = Path(server_dir) / PROPERTIES_NAME
+    tmp = path.with_name(f"{PROPERTIES_NAME}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            f.write(props.dump())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    st = path.stat()
+    with _cache_lock:
+        _cache[str(path)] = (st.st_mtime_ns, st.st_size, props.copy())
+
+def diff_properties(props, changes):
+    # [(key, old string or None, new string)] for the keys that would change
+    return [(key, props.get(key), value) for key, value in changes.items() if props.get(key) != value]
+
+def apply_changes(server_dirs, changes, dry_run=False, allow_unknown=False, workers=BATCH_WORKERS):
+    # Applies one change set to many servers in parallel. The whole set is
+    # validated first, so nothing is written when any value is bad. Returns
+    # a report per server: {"server", "diff", "written"} or {"server", "error"}.
+    formatted = validate_changes(changes, allow_unknown)
+
+    def run(server_dir):
+        report = {"server": Path(server_dir).name, "diff": [], "written": False}
+        try:
+            props = load_properties(server_dir)
+            report["diff"] = diff_properties(props, formatted)
+            if report["diff"] and not dry_run:
+                for key, _, value in report["diff"]:
+                    props.set(key, value)
+                save_properties(server_dir, props)
+                report["written"] = True
+        except OSError as e:
+            report["error"] = str(e)
+        return report
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run, server_dirs))
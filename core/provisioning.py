@@ -0,0 +1,207 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from .config import load_server_config, save_server_config
+from .backup_manager import _reflink, copy_file, HARDLINK_SAFE_SUFFIXES
+from .maintenance import account, in_job
+
+DEFAULT_STORE_DIR = os.path.join("cache", "store")
+HASH_BLOCK = 1024 * 1024
+PROVISION_WORKERS = 8
+# What server jars download or unpack on first boot: Paper/Forge libraries,
+# Paper's patched jars, the Fabric launcher cache. All written once, never
+# modified in place.
+SEED_DIRS = ("libraries", "versions", "cache", ".fabric")
+DEFAULT_PROPERTIES = "motd=Welcome to Moonlight Server\nmax-players=20\n"
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            digest.update(block)
+            account(len(block))
+    return digest.hexdigest()
+
+def _write_json(path, data):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp, path)
+
+def place_file(src, dst, allow_hardlink=True):
+    # Cheapest way to give `dst` the contents of `src`: a copy-on-write
+    # reflink, then a hardlink, then a real copy. Returns (method, bytes written).
+    dst = Path(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    dst.unlink(missing_ok=True)
+    try:
+        _reflink(src, dst)
+        return "reflink", 0
+    except (OSError, TypeError, AttributeError):  # no FICLONE (or no fcntl on Windows)
+        dst.unlink(missing_ok=True)
+    if allow_hardlink:
+        try:
+            os.link(src, dst)
+            return "hardlink", 0
+        except OSError:
+            pass
+    copy_file(src, dst, metadata=False)
+    return "copy", os.path.getsize(dst)
+
+class JarStore:
+    # Content-addressed store for starter jars and the libraries they
+    # unpack on first boot, shared by every server on this machine.
+    #   blobs/ab/<sha256>      file contents
+    #   starters.json          starter name -> versions seen, newest last
+    #   seeds/<sha256>.json    first-boot files of that starter: relpath -> blob
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = Path(root)
+        self.blobs_dir = self.root / "blobs"
+        self.seeds_dir = self.root / "seeds"
+        self.starters_path = self.root / "starters.json"
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        self.seeds_dir.mkdir(exist_ok=True)
+        self._lock = threading.Lock()
+        self.starters = {}
+        if self.starters_path.exists():
+            with open(self.starters_path) as f:
+                self.starters = json.load(f)
+
+    def blob_path(self, digest):
+        return self.blobs_dir / digest[:2] / digest
+
+    def add_file(self, path, digest=None):
+        # Ingested by reflink or copy, never hardlink, so later edits to the
+        # original can't change what the store hands out.
+        digest = digest or _sha256(path)
+        blob = self.blob_path(digest)
+        if not blob.exists():
+            tmp = blob.with_name(f"{digest}.{threading.get_ident()}.tmp")
+            place_file(path, tmp, allow_hardlink=False)
+            os.replace(tmp, blob)
+        return digest
+
+    def add_starter(self, path):
+        # Rehashes only when the starter's size or mtime changed; every
+        # distinct content is kept as a version.
+        path = Path(path)
+        st = path.stat()
+        with self._lock:
+            versions = self.starters.setdefault(path.name, [])
+            latest = versions[-1] if versions else None
+            if latest and latest["size"] == st.st_size and latest["mtime_ns"] == st.st_mtime_ns \
+                    and self.blob_path(latest["sha256"]).exists():
+                return latest["sha256"]
+            digest = self.add_file(path)
+            versions[:] = [v for v in versions if v["sha256"] != digest]
+            versions.append({
+                "sha256": digest,
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "added": datetime.now().isoformat(timespec="seconds"),
+            })
+            _write_json(self.starters_path, self.starters)
+            logging.info(f"Starter {path.name} stored as {digest[:12]}")
+            return digest
+
+    def seed_path(self, starter_sha):
+        return self.seeds_dir / f"{starter_sha}.json"
+
+    def load_seed(self, starter_sha):
+        path = self.seed_path(starter_sha)
+        if not path.exists():
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def harvest(self, server_dir, starter_sha):
+        # Record what a booted server unpacked so the next server created
+        # from the same starter gets it pre-seeded.
+        server_dir = Path(server_dir)
+        seed = {}
+        for dirname in SEED_DIRS:
+            for root, _, names in os.walk(server_dir / dirname):
+                for name in names:
+                    if name.endswith(".tmp") or name.endswith(".lock"):
+                        continue
+                    path = Path(root) / name
+                    seed[path.relative_to(server_dir).as_posix()] = self.add_file(path)
+        if seed:
+            _write_json(self.seed_path(starter_sha), seed)
+            logging.info(f"Seeded {len(seed)} first-boot files for starter {starter_sha[:12]}")
+        return seed
+
+class Provisioner:
+    def __init__(self, servers_dir, starters_dir, store=None):
+        self.servers_dir = Path(servers_dir)
+        self.starters_dir = Path(starters_dir)
+        self.store = store or JarStore()
+
+    def provision(self, name, template, starter_sha=None):
+        # Lays out a new server from a starter jar: server.jar and any seeded
+        # libraries are linked from the store, only small files are written.
+        started = time.perf_counter()
+        report = {"name": name, "template": template, "bytes_written": 0,
+                  "reflink": 0, "hardlink": 0, "copy": 0, "seeded": 0}
+        starter_sha = starter_sha or self.store.add_starter(self.starters_dir / template)
+        server_dir = self.servers_dir / name
+        created = not server_dir.exists()
+        server_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            self._lay_out(server_dir, template, starter_sha, report)
+        except BaseException:
+            # Failed or cancelled: don't leave a half-made server behind
+            if created:
+                shutil.rmtree(server_dir, ignore_errors=True)
+            raise
+        report["seconds"] = time.perf_counter() - started
+        return report
+
+    def _lay_out(self, server_dir, template, starter_sha, report):
+        method, written = place_file(self.store.blob_path(starter_sha), server_dir / "server.jar")
+        report[method] += 1
+        report["bytes_written"] += written
+        for rel, digest in self.store.load_seed(starter_sha).items():
+            allow_hardlink = Path(rel).suffix in HARDLINK_SAFE_SUFFIXES
+            method, written = place_file(self.store.blob_path(digest), server_dir / rel, allow_hardlink)
+            report[method] += 1
+            report["bytes_written"] += written
+            report["seeded"] += 1
+
+        props = server_dir / "server.properties"
+        if not props.exists():
+            props.write_text(DEFAULT_PROPERTIES)
+            report["bytes_written"] += len(DEFAULT_PROPERTIES)
+        config = load_server_config(server_dir)
+        config.update({"starter": template, "starter_sha256": starter_sha})
+        save_server_config(server_dir, config)
+        report["bytes_written"] += (server_dir / "config.json").stat().st_size
+
+    def create_servers(self, template, names, max_workers=PROVISION_WORKERS):
+        # Hash the starter once, then lay out every server in parallel.
+        # Returns one report per name; failures carry an "error" key.
+        starter_sha = self.store.add_starter(self.starters_dir / template)
+
+        def run(name):
+            try:
+                return self.provision(name, template, starter_sha)
+            except OSError as e:
+                logging.error(f"Provisioning '{name}' failed: {e}")
+                return {"name": name, "template": template, "error": str(e)}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(in_job(run), names))
+
+    def harvest(self, server_dir):
+        # Called after a server's first run; no-op once its starter is seeded.
+        starter_sha = load_server_config(server_dir).get("starter_sha256")
+        if not starter_sha or self.store.seed_path(starter_sha).exists():
+            return None
+        return self.store.harvest(server_dir, starter_sha)
@@ -0,0 +1,64 @@
+import socket
+import struct
+from .lifecycle import read_properties
+
+# Source RCON packet types as used by Minecraft
+LOGIN = 3
+COMMAND = 2
+RESPONSE = 0
+
+class RconError(RuntimeError):
+    pass
+
+def rcon_settings(server_dir):
+    # (port, password) from server.properties, or None when RCON is off.
+    props = read_properties(server_dir)
+    if props.get("enable-rcon", "false").lower() != "true" or not props.get("rcon.password"):
+        return None
+    return int(props.get("rcon.port") or 25575), props["rcon.password"]
+
+class RconClient:
+    def __init__(self, host, port, password, timeout=10):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.next_id = 0
+        if self._exchange(LOGIN, password)[0] == -1:
+            self.close()
+            raise RconError("RCON authentication failed")
+
+    def _recv_exact(self, size):
+        data = b""
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise RconError("RCON connection closed")
+            data += chunk
+        return data
+
+    def _exchange(self, kind, body):
+        self.next_id += 1
+        payload = struct.pack("<ii", self.next_id, kind) + body.encode("utf-8") + b"\x00\x00"
+        self.sock.sendall(struct.pack("<i", len(payload)) + payload)
+        size = struct.unpack("<i", self._recv_exact(4))[0]
+        data = self._recv_exact(size)
+        request_id, _ = struct.unpack("<ii", data[:8])
+        return request_id, data[8:-2].decode("utf-8", "replace")
+
+    def command(self, text):
+        return self._exchange(COMMAND, text)[1]
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def rcon_command(server_dir, command, timeout=10):
+    settings = rcon_settings(server_dir)
+    if settings is None:
+        raise RconError(f"RCON is not enabled in {server_dir}/server.properties")
+    port, password = settings
+    with RconClient("127.0.0.1", port, password, timeout) as client:
+        return client.command(command)
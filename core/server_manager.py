@@ -1,47 +1,65 @@
 import subprocess
-import os
 import json
 import time
+import shutil
+import threading
+from datetime import datetime
 from pathlib import Path
-from .config import load_config, save_config
+from .config import load_config, save_config, load_server_config
+from .backup_manager import backup_server, snapshot_tree
+from .console import DONE_PATTERN, ServerConsole
+from .gc_log import GCLogTailer, gc_logging_flags
+from .provisioning import Provisioner
+from .lifecycle import (STOP_DEADLINE, find_server_process, graceful_stop, record, wait_released,
+                        write_pid_file)
+from .logs import log_event, tail_text
+from .performance_tuner import MemoryAllocator, server_memory_limits, detect_java_version, profile_flags
 import logging
 import psutil
 
-# Setup logging
-logging.basicConfig(
-    filename="server_manager.log",
-    level=logging.DEBUG,
-    format="%(asctime)s %(levelname)s: %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
+def _wait(proc, timeout):
+    # Popen and psutil.Process both raise their own TimeoutExpired
+    try:
+        proc.wait(timeout)
+        return True
+    except (subprocess.TimeoutExpired, psutil.TimeoutExpired):
+        return False
 
 class ServerManager:
     def __init__(self, server_path="servers", starters_path="assets/Server Starters"):
         self.server_path = Path(server_path)
         self.starters_path = Path(starters_path)
         self.config = load_config()
+        self.processes = {}  # name -> Popen
+        self.consoles = {}  # name -> ServerConsole
+        self.backup_history = {}  # name -> [hot backup reports]
+        self.gc_tailers = {}  # name -> GCLogTailer
+        self.lifecycle_history = {}  # name -> [stop/restart reports]
+        self.allocator = MemoryAllocator(
+            self.config["memory_budget_mb"],
+            self.config["memory_reserve_mb"],
+            self.config["pin_cpus"]
+        )
+
+        self.provisioner = Provisioner(self.server_path, self.starters_path)
 
         # Use java from PATH (assumes PATH is configured properly)
         self.JAVA_PATH = "java"
 
         self.server_path.mkdir(exist_ok=True)
-        self.starters_path.mkdir(exist_ok=True)
-        print(f"[INIT] Server path: {self.server_path}")
-        print(f"[INIT] Starters path: {self.starters_path}")
-        print(f"[INIT] Using Java executable: {self.JAVA_PATH}")
-        logging.info(f"ServerManager initialized. Java path: {self.JAVA_PATH}")
+        self.starters_path.mkdir(parents=True, exist_ok=True)
+        logging.info(f"ServerManager initialized: servers in {self.server_path}, starters in {self.starters_path}, "
+                     f"Java {self.JAVA_PATH}")
 
     def _accept_eula(self, server_dir):
         eula_path = server_dir / "eula.txt"
         if not eula_path.exists() or "false" in eula_path.read_text():
             with open(eula_path, "w") as f:
                 f.write("eula=true\n")
-            print("[EULA] Automatically accepted Minecraft EULA.")
             logging.info(f"EULA accepted at {eula_path}")
 
     def _run_jar_once(self, server_dir):
         cmd = [self.JAVA_PATH, "-jar", "server.jar", "nogui"]
-        print(f"[RUN ONCE] Running command: {' '.join(cmd)} in {server_dir}")
         logging.info(f"Run once command: {' '.join(cmd)} in {server_dir}")
         try:
             proc = subprocess.Popen(
@@ -49,19 +67,44 @@ class ServerManager:
                 cwd=server_dir,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                text=True
+                encoding="utf-8",
+                errors="replace"
             )
             out, err = proc.communicate(timeout=30)
-            print(f"[RUN ONCE STDOUT]\n{out}")
-            print(f"[RUN ONCE STDERR]\n{err}")
-            logging.info(f"Run once stdout:\n{out}")
-            logging.error(f"Run once stderr:\n{err}")
+            # The full output is in the server's logs/latest.log; only keep the end
+            name = server_dir.name
+            log_event("run_once", f"Run once of '{name}' exited with code {proc.returncode}:\n" + tail_text(out),
+                      server=name, pid=proc.pid, returncode=proc.returncode)
+            if err.strip():
+                log_event("run_once", f"Run once of '{name}' stderr:\n" + tail_text(err), server=name,
+                          level=logging.ERROR)
         except subprocess.TimeoutExpired:
             proc.kill()
-            print("[RUN ONCE] Process timed out and was killed.")
             logging.error("Run once process timed out and killed.")
+            return
+        # Seeds are write-once, so only a complete first boot may become one
+        if proc.returncode == 0 and DONE_PATTERN.search(out):
+            self.provisioner.harvest(server_dir)
+
+    def create_server(self, name, starter_jar):
+        report = self.provisioner.provision(name, starter_jar)
+        log_event("create", f"Created '{name}' from {starter_jar} in {report['seconds'] * 1000:.0f} ms, "
+                            f"{report['bytes_written']} bytes written", server=name, duration=report["seconds"])
+        return report
+
+    def create_servers(self, starter_jar, names):
+        reports = self.provisioner.create_servers(starter_jar, names)
+        failed = [r["name"] for r in reports if "error" in r]
+        logging.info(f"Created {len(reports) - len(failed)}/{len(reports)} servers from {starter_jar}")
+        if failed:
+            logging.error(f"Provisioning failed for: {', '.join(failed)}")
+        return reports
 
-    def start_server(self, name, xms=1024, xmx=8192, extra_flags=None):
+    def build_launch(self, name, xms=1024, xmx=8192, extra_flags=None, wait_for_memory=False, profile=None,
+                     gc_logging=None):
+        # Reserves memory for `name` and returns (server_dir, command). Shared
+        # by start_server and the supervisor daemon, which spawns the process
+        # itself; whoever calls this must release the reservation on failure.
         if extra_flags is None:
             extra_flags = []
 
@@ -71,77 +114,215 @@ class ServerManager:
 
         self._accept_eula(server_dir)
 
-        # Automatically adjust memory if over system limit
-        system_ram = psutil.virtual_memory().total // (1024 * 1024)
-        if xmx > system_ram - 2048:
-            xmx = system_ram - 2048
-            print(f"[WARN] Max RAM reduced to {xmx}MB to fit system limit.")
-            logging.warning(f"Adjusted max RAM to {xmx}MB to avoid crash.")
+        # Fit the heap into what the rest of the fleet leaves free
+        limits = server_memory_limits(server_dir)
+        requested = xmx
+        xmx = self.allocator.reserve(
+            name,
+            min_mb=limits.get("min_mb", min(xms, xmx)),
+            max_mb=limits.get("max_mb", xmx),
+            weight=limits.get("weight", 1.0),
+            cpus=limits.get("cpus", 0),
+            wait=wait_for_memory
+        )
+        xms = min(xms, xmx)
+        if xmx < requested:
+            logging.warning(f"Adjusted max RAM for '{name}' to {xmx}MB (requested {requested}MB).")
+
+        server_config = load_server_config(server_dir)
+        gc_flags = profile_flags(
+            profile or server_config.get("jvm_profile", "auto"),
+            xmx,
+            detect_java_version(self.JAVA_PATH),
+            self.config["large_pages"],
+            self.JAVA_PATH
+        )
+        if gc_logging is None:
+            gc_logging = server_config.get("gc_logging", self.config["gc_logging"])
+        if gc_logging:
+            gc_flags += gc_logging_flags("logs")
 
         cmd = [
             self.JAVA_PATH,
             f"-Xms{xms}M",
             f"-Xmx{xmx}M",
+            *gc_flags,
             *extra_flags,
             "-jar",
             "server.jar",
             "nogui"
         ]
 
-        print(f"[START SERVER] Starting server '{name}' with command:")
-        print("  " + " ".join(cmd))
-        logging.info(f"Starting server '{name}' with command: {' '.join(cmd)}")
+        log_event("launch", f"Starting server '{name}' with command: {' '.join(cmd)}", server=name)
+        return server_dir, cmd
+
+    def write_pid(self, server_dir, pid):
+        # Save PID for later stop/restart
+        pid_file = write_pid_file(server_dir, pid)
+        logging.debug(f"Server PID {pid} saved to {pid_file}")
 
+    def start_server(self, name, xms=1024, xmx=8192, extra_flags=None, wait_for_memory=False, profile=None,
+                     gc_logging=None):
+        server_dir, cmd = self.build_launch(name, xms, xmx, extra_flags, wait_for_memory, profile, gc_logging)
         try:
             proc = subprocess.Popen(
                 cmd,
                 cwd=server_dir,
+                stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                text=True
+                # One stray byte must not end the reader threads (and with
+                # them the pipe draining) while the server keeps running
+                encoding="utf-8",
+                errors="replace",
+                bufsize=1
             )
-
-            # Save PID for later stop/restart
-            pid_file = server_dir / "server.pid"
-            with open(pid_file, "w") as f:
-                f.write(str(proc.pid))
-            print(f"[PID] Server PID saved to {pid_file}")
-            logging.info(f"Server PID {proc.pid} saved to {pid_file}")
-
-            print("[START SERVER] Waiting for initial logs...")
-            time.sleep(5)
-            out, err = proc.communicate(timeout=10)
-            print(f"[START SERVER STDOUT]\n{out}")
-            print(f"[START SERVER STDERR]\n{err}")
-            logging.info(f"Start server stdout:\n{out}")
-            logging.error(f"Start server stderr:\n{err}")
-        except subprocess.TimeoutExpired:
-            print("[START SERVER] Server started in background.")
-            logging.info("Server running in background (timeout)")
+            self.processes[name] = proc
+            self.allocator.apply_affinity(name, proc.pid)
+            console = ServerConsole(name, proc)
+            self.consoles[name] = console
+            console.on_ready(lambda startup: log_event("ready", f"Server '{name}' ready after {startup}s",
+                                                       server=name, pid=proc.pid, duration=startup))
+            console.on_exit(lambda code: self._on_exit(name, proc, server_dir, console, code))
+            self.write_pid(server_dir, proc.pid)
+            log_event("start", f"Server '{name}' started (PID {proc.pid})", server=name, pid=proc.pid)
+            return console
         except Exception as e:
-            print(f"[ERROR] Failed to start server: {e}")
-            logging.error(f"Exception during server start: {e}")
+            if name not in self.processes:
+                self.allocator.release(name)
+            log_event("start_failed", f"Exception during start of '{name}': {e}", server=name, level=logging.ERROR)
+
+    def _on_exit(self, name, proc, server_dir, console, code):
+        self._forget(name, proc)
+        # First boot unpacked libraries; keep them for the next server. Seeds
+        # are write-once, so not after a crash or kill mid-download.
+        if code == 0 and console.ready.is_set():
+            self.provisioner.harvest(server_dir)
+
+    def _forget(self, name, proc):
+        if self.processes.get(name) is proc:
+            self.processes.pop(name, None)
+            self.consoles.pop(name, None)
+            self.allocator.release(name)
+
+    def stop_server(self, name, deadline=STOP_DEADLINE):
+        # Asks the server to save and stop; SIGTERM/SIGKILL only if it won't.
+        server_dir = self.server_path / name
+        proc = self.processes.get(name)
+        console = self.consoles.get(name)
+        if proc is not None:
+            send_stop = lambda: console.send("stop")
+            wait_exit = lambda timeout: proc.poll() is not None or _wait(proc, timeout)
+            terminate, kill = proc.terminate, proc.kill
+        else:
+            # Started by an earlier session: no console, but the PID file
+            # still identifies it (and SIGTERM makes Minecraft save).
+            proc = find_server_process(server_dir)
+            if proc is None:
+                logging.warning(f"No running process found to stop {name}.")
+                (server_dir / "server.pid").unlink(missing_ok=True)
+                return None
 
-    def stop_server(self, name):
+            def send_stop():
+                raise RuntimeError("no console attached")
+
+            wait_exit = lambda timeout: _wait(proc, timeout)
+            terminate, kill = proc.terminate, proc.kill
+
+        report = graceful_stop(name, send_stop, wait_exit, terminate, kill, deadline)
+        if console is not None:
+            console.exited.wait(5)  # let exit callbacks release memory
+        (server_dir / "server.pid").unlink(missing_ok=True)
+        report["action"] = "stop"
+        record(self.lifecycle_history, name, report)
+        log_event("stop", f"Stopped server '{name}' in {report['stop_seconds']:.2f}s ({report['phase']})",
+                  server=name, pid=proc.pid, duration=report["stop_seconds"], phase=report["phase"])
+        return report
+
+    def restart_server(self, name, xms=1024, xmx=8192, extra_flags=None, deadline=STOP_DEADLINE):
+        # Starts the new process as soon as the old one has let go of its
+        # port and world lock.
+        logging.info(f"Restarting server '{name}'...")
+        began = time.time()
+        started = time.monotonic()
+        stopped = self.stop_server(name, deadline)
+        release_seconds = wait_released(self.server_path / name)
+        console = self.start_server(name, xms, xmx, extra_flags)
+        report = {
+            "name": name,
+            "action": "restart",
+            "started": began,
+            "phase": stopped["phase"] if stopped else None,
+            "stop_seconds": stopped["stop_seconds"] if stopped else 0.0,
+            "release_seconds": release_seconds,
+            "restart_seconds": time.monotonic() - started,
+        }
+        record(self.lifecycle_history, name, report)
+        if console is not None:
+            # Filled in once the new process prints "Done"
+            console.on_ready(lambda startup: report.update(ready_seconds=time.monotonic() - started))
+        log_event("restart", f"Restarted server '{name}' after {report['restart_seconds']:.2f}s", server=name,
+                  duration=report["restart_seconds"], phase=report["phase"])
+        return console
+
+    def gc_stats(self, name, max_bytes=None):
+        tailer = self.gc_tailers.get(name)
+        if tailer is None:
+            tailer = self.gc_tailers[name] = GCLogTailer(self.server_path / name / "logs")
+        return tailer.poll(max_bytes)
+
+    def send_command(self, name, command):
+        console = self.consoles.get(name)
+        if console is None:
+            raise RuntimeError(f"Server '{name}' is not running.")
+        console.send(command)
+        logging.info(f"Sent console command to '{name}': {command}")
+
+    def hot_backup(self, name, mode="archive", background=True, save_timeout=60):
         server_dir = self.server_path / name
-        pid_file = server_dir / "server.pid"
-        if pid_file.exists():
-            with open(pid_file, "r") as f:
-                pid = int(f.read())
+        console = self.consoles.get(name)
+        if console is None or console.exited.is_set():
+            logging.info(f"'{name}' is not running, taking a cold backup.")
+            return {"server": name, "pause_ms": 0.0, "backup": backup_server(server_dir, mode)}
+
+        snapshot_dir = self.server_path.parent / ".snapshots" / f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+        paused = time.perf_counter()
+        self.send_command(name, "save-off")
+        try:
+            saved = console.expect("Saved the game")
+            self.send_command(name, "save-all flush")
+            if not saved.wait(save_timeout):
+                raise TimeoutError(f"Server '{name}' did not finish saving within {save_timeout}s")
+            snapshot = snapshot_tree(server_dir, snapshot_dir)
+        except BaseException:
+            shutil.rmtree(snapshot_dir, ignore_errors=True)
+            raise
+        finally:
+            try:
+                self.send_command(name, "save-on")
+            except Exception:
+                # Don't mask the snapshot's own error; the server may have died
+                logging.exception(f"Could not re-enable saving on '{name}'")
+        pause_ms = (time.perf_counter() - paused) * 1000
+
+        report = {"server": name, "pause_ms": pause_ms, "snapshot": snapshot, "backup": None}
+        self.backup_history.setdefault(name, []).append(report)
+        log_event("backup", f"Hot backup of '{name}': save paused {pause_ms:.1f} ms, snapshot {snapshot}",
+                  server=name, duration=pause_ms / 1000)
+
+        def run():
             try:
-                os.kill(pid, 9)  # Force kill
-                print(f"[STOP SERVER] Killed process {pid}")
-                logging.info(f"Stopped server '{name}', PID {pid}")
-                pid_file.unlink()
+                report["backup"] = backup_server(snapshot_dir, mode, source=server_dir)
+                logging.info(f"Hot backup of '{name}' written to {report['backup']}")
             except Exception as e:
-                print(f"[ERROR] Could not stop server: {e}")
-                logging.error(f"Failed to stop server {name}: {e}")
+                report["error"] = str(e)
+                logging.error(f"Hot backup of '{name}' failed: {e}")
+            finally:
+                shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+        if background:
+            report["thread"] = threading.Thread(target=run, name=f"hot-backup-{name}", daemon=True)
+            report["thread"].start()
         else:
-            print(f"[STOP SERVER] No PID file found for {name}.")
-            logging.warning(f"No PID file found to stop {name}.")
-
-    def restart_server(self, name, xms=1024, xmx=8192, extra_flags=None):
-        print(f"[RESTART SERVER] Restarting server '{name}'...")
-        self.stop_server(name)
-        time.sleep(2)
-        self.start_server(name, xms, xmx, extra_flags)
+            run()
+        return report
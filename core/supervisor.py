@@ -0,0 +1,653 @@
+import os
+import sys
+import hmac
+import json
+import time
+import signal
+import asyncio
+import logging
+import secrets
+import shutil
+import argparse
+from collections import deque
+from datetime import datetime
+from .console import DONE_PATTERN, DEFAULT_BUFFER_LINES
+from .metrics import MetricsSampler
+from .server_manager import ServerManager
+from .supervisor_client import STATE_PATH, SupervisorClient
+from .lifecycle import STOP_DEADLINE, TERM_DEADLINE, record, wait_released
+from .watchdog import Watchdog
+from .logs import setup_logging, log_event
+from .backup_manager import backup_server, snapshot_tree
+from .config import load_server_config
+from .inventory import DiskUsage
+from .maintenance import MaintenanceScheduler, in_job
+
+READ_LIMIT = 1024 * 1024  # longest console line / API request
+FOLLOW_QUEUE = 10000  # lines buffered per slow console follower
+EVENT_QUEUE = 1000  # state changes buffered per slow "events" subscriber
+STREAM_OPS = {"follow": "_follow", "watch_metrics": "_watch_metrics", "events": "_events"}
+TAIL_BLOCK = 64 * 1024
+SCHEDULE_RELOAD = 60  # seconds between re-reading per-server backup schedules
+
+class ManagedServer:
+    # One supervised process. Its pipes are read by two tasks on the daemon's
+    # event loop; no threads per server.
+    def __init__(self, name, proc, server_dir, options):
+        self.name = name
+        self.proc = proc
+        self.server_dir = server_dir
+        self.options = options  # start() arguments, reused by restart
+        self.started = time.time()
+        self.lines = deque(maxlen=DEFAULT_BUFFER_LINES)  # (seq, timestamp, stream, text)
+        self.seq = 0
+        self.startup_time = None
+        self.returncode = None
+        self.ready = asyncio.Event()
+        self.exited = asyncio.Event()
+        self.followers = set()  # asyncio.Queue per follow stream
+        self.stopping = False  # set once we asked it to stop
+        self.health = None  # TickHealth, attached by the watchdog
+        self.watchdog_settings = None
+        self.on_state = None  # called with this server when it becomes ready and when it exits
+        self.pumps = [
+            asyncio.create_task(self._pump("stdout", proc.stdout)),
+            asyncio.create_task(self._pump("stderr", proc.stderr)),
+        ]
+
+    @property
+    def state(self):
+        if self.exited.is_set():
+            return "exited"
+        return "running" if self.ready.is_set() else "starting"
+
+    def info(self):
+        return {
+            "name": self.name,
+            "pid": self.proc.pid,
+            "state": self.state,
+            "started": self.started,
+            "startup_time": self.startup_time,
+            "returncode": self.returncode,
+        }
+
+    async def _pump(self, stream_name, stream):
+        while True:
+            try:
+                raw = await stream.readline()
+            except ValueError:  # line longer than READ_LIMIT; drop it
+                continue
+            if not raw:
+                break
+            self.seq += 1
+            text = raw.decode("utf-8", "replace").rstrip("\r\n")
+            entry = (self.seq, time.time(), stream_name, text)
+            self.lines.append(entry)
+            self._publish(("line", entry))
+            if self.health is not None:
+                self.health.feed(text, entry[1])
+            if not self.ready.is_set():
+                match = DONE_PATTERN.search(text)
+                if match:
+                    self.startup_time = float(match.group(1))
+                    self.ready.set()
+                    log_event("ready", f"Server '{self.name}' ready after {self.startup_time}s", server=self.name,
+                              pid=self.proc.pid, duration=self.startup_time)
+                    self._publish(("ready", self.startup_time))
+                    if self.on_state is not None:
+                        self.on_state(self)
+
+    def _publish(self, event):
+        for queue in list(self.followers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A follower that can't keep up is cut off rather than
+                # letting its backlog grow without bound.
+                self.followers.discard(queue)
+                queue.lagged = True
+
+    def finish(self, returncode):
+        self.returncode = returncode
+        self.exited.set()
+        self._publish(("exit", returncode))
+        if self.on_state is not None:
+            self.on_state(self)
+
+    async def send(self, command):
+        if self.exited.is_set() or self.proc.stdin is None:
+            raise RuntimeError(f"Server '{self.name}' is not running")
+        self.proc.stdin.write((command + "\n").encode())
+        await self.proc.stdin.drain()
+
+def tail_file(path, n):
+    # Last n lines of a file, reading backwards from the end in blocks.
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        data = b""
+        while end > 0 and data.count(b"\n") <= n:
+            start = max(0, end - TAIL_BLOCK)
+            f.seek(start)
+            data = f.read(end - start) + data
+            end = start
+    return [line.decode("utf-8", "replace") for line in data.splitlines()[-n:]]
+
+class Supervisor:
+    # Headless owner of every server process, controlled over a localhost
+    # JSON-lines API. The GUI and CLI are clients (see supervisor_client).
+    def __init__(self, manager=None, host="127.0.0.1", port=None, state_path=STATE_PATH):
+        self.manager = manager or ServerManager()
+        self.host = host
+        self.port = self.manager.config.get("supervisor_port", 0) if port is None else port
+        self.state_path = state_path
+        self.token = secrets.token_hex(16)
+        self.servers = {}  # name -> ManagedServer (kept after exit for tail/log)
+        self.starting = set()
+        self.history = {}  # name -> [stop/restart reports]
+        self.event_queues = set()  # asyncio.Queue per "events" subscriber
+        self.sampler = MetricsSampler(self._targets)
+        self.watchdog = Watchdog(self)
+        self.scheduler = MaintenanceScheduler.from_config(self.manager.config, self._lagging)
+        self.schedule_errors = {}
+        self.loop = None
+        self._server = None
+        self._shutdown = None
+
+    def _targets(self):
+        # Called from the sampler thread
+        return {name: s.proc.pid for name, s in list(self.servers.items()) if not s.exited.is_set()}
+
+    def _announce(self, server):
+        info = server.info()
+        for queue in list(self.event_queues):
+            try:
+                queue.put_nowait(info)
+            except asyncio.QueueFull:
+                self.event_queues.discard(queue)
+                queue.lagged = True
+
+    def _lagging(self):
+        # Called from maintenance workers: names the watchdog has as behind on ticks
+        return [name for name, server in list(self.servers.items())
+                if not server.exited.is_set() and server.health is not None and server.health.state == "lagging"]
+
+    def _running(self, name):
+        server = self.servers.get(name)
+        if server is None or server.exited.is_set():
+            raise RuntimeError(f"Server '{name}' is not running")
+        return server
+
+    # --- Process lifecycle ---
+    async def start(self, name, **options):
+        if name in self.starting or (name in self.servers and not self.servers[name].exited.is_set()):
+            raise RuntimeError(f"Server '{name}' is already running")
+        self.starting.add(name)
+        try:
+            # May block on the memory budget or on `java -version`
+            server_dir, cmd = await asyncio.to_thread(self.manager.build_launch, name, **options)
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    *cmd,
+                    cwd=server_dir,
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    limit=READ_LIMIT
+                )
+            except OSError:
+                self.manager.allocator.release(name)
+                raise
+            self.manager.allocator.apply_affinity(name, proc.pid)
+            self.manager.write_pid(server_dir, proc.pid)
+            server = self.servers[name] = ManagedServer(name, proc, server_dir, options)
+            server.on_state = self._announce
+            self.watchdog.attach(server)
+            self._announce(server)
+            asyncio.create_task(self._watch(server))
+            log_event("start", f"Supervisor started '{name}' (PID {proc.pid})", server=name, pid=proc.pid)
+            return server.info()
+        finally:
+            self.starting.discard(name)
+
+    async def _watch(self, server):
+        await asyncio.gather(*server.pumps)
+        returncode = await server.proc.wait()
+        if self.servers.get(server.name) is server:
+            self.manager.allocator.release(server.name)
+        (server.server_dir / "server.pid").unlink(missing_ok=True)
+        self.watchdog.on_exit(server, returncode)
+        server.finish(returncode)
+        log_event("exit", f"Server '{server.name}' exited with code {returncode}", server=server.name,
+                  pid=server.proc.pid, returncode=returncode, duration=time.time() - server.started)
+        # Seeds are write-once: a crash or kill during first boot must not
+        # freeze half-downloaded libraries into every later server
+        if returncode != 0 or not server.ready.is_set():
+            return
+        try:
+            await asyncio.to_thread(self.manager.provisioner.harvest, server.server_dir)
+        except OSError as e:
+            logging.warning(f"Could not harvest first-boot files of '{server.name}': {e}")
+
+    async def stop(self, name, deadline=None):
+        # Same escalation as lifecycle.graceful_stop, without blocking the loop:
+        # console "stop", then SIGTERM, then SIGKILL.
+        server = self._running(name)
+        started = time.monotonic()
+        report = {"name": name, "action": "stop", "phase": "stopping", "started": time.time()}
+        server.stopping = True
+        try:
+            await server.send("stop")
+            await asyncio.wait_for(server.exited.wait(), deadline or STOP_DEADLINE)
+        except (RuntimeError, ConnectionError, asyncio.TimeoutError):
+            report["phase"] = "terminating"
+            log_event("terminate", f"'{name}' did not stop cleanly; sending SIGTERM", server=name, level=logging.WARNING)
+            server.proc.terminate()
+            try:
+                await asyncio.wait_for(server.exited.wait(), TERM_DEADLINE)
+            except asyncio.TimeoutError:
+                report["phase"] = "killing"
+                log_event("kill", f"'{name}' ignored SIGTERM; sending SIGKILL", server=name, level=logging.WARNING)
+                server.proc.kill()
+                await server.exited.wait()
+        report["stop_seconds"] = time.monotonic() - started
+        report["returncode"] = server.returncode
+        record(self.history, name, report)
+        log_event("stop", f"Stopped '{name}' in {report['stop_seconds']:.2f}s ({report['phase']})", server=name,
+                  pid=server.proc.pid, duration=report["stop_seconds"], phase=report["phase"])
+        return {**server.info(), **report}
+
+    async def restart(self, name, deadline=None):
+        # Relaunch as soon as the port and world lock are free, not after a
+        # fixed sleep.
+        server = self._running(name)
+        began = time.time()
+        started = time.monotonic()
+        stopped = await self.stop(name, deadline)
+        release_seconds = await asyncio.to_thread(wait_released, server.server_dir)
+        info = await self.start(name, **server.options)
+        report = {
+            "name": name,
+            "action": "restart",
+            "started": began,
+            "phase": stopped["phase"],
+            "stop_seconds": stopped["stop_seconds"],
+            "release_seconds": release_seconds,
+            "restart_seconds": time.monotonic() - started,
+        }
+        record(self.history, name, report)
+        log_event("restart", f"Restarted '{name}' after {report['restart_seconds']:.2f}s", server=name,
+                  pid=info["pid"], duration=report["restart_seconds"], phase=report["phase"])
+        asyncio.create_task(self._record_ready(name, report, started))
+        return {**info, **report}
+
+    async def _record_ready(self, name, report, started):
+        server = self.servers[name]
+        _, pending = await asyncio.wait({asyncio.create_task(server.ready.wait()), asyncio.create_task(server.exited.wait())},
+                                        return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        if server.ready.is_set():
+            report["ready_seconds"] = time.monotonic() - started
+
+    async def _expect(self, server, text, timeout):
+        # Waits for a console line containing `text`; subscribe before
+        # sending the command that produces it.
+        queue = asyncio.Queue(FOLLOW_QUEUE)
+        server.followers.add(queue)
+        try:
+            async with asyncio.timeout(timeout):
+                while True:
+                    kind, payload = await queue.get()
+                    if kind == "line" and text in payload[3]:
+                        return payload
+                    if kind == "exit":
+                        raise RuntimeError(f"Server '{server.name}' exited")
+        finally:
+            server.followers.discard(queue)
+
+    def submit_backup(self, name, mode="archive", save_timeout=60):
+        # Queues a backup as a maintenance job (throttled, deferred while
+        # servers lag). A running server is backed up hot as in
+        # ServerManager.hot_backup: autosave is only paused while the world is
+        # snapshotted, and the backup is written from the snapshot. Stopped
+        # servers are read directly. Callable from any thread once serving.
+        server_dir = self.manager.server_path / name
+        if not server_dir.is_dir():
+            raise FileNotFoundError(f"Server '{name}' not found")
+
+        def run(job):
+            report = {"server": name, "pause_ms": 0.0, "snapshot": None, "backup": None}
+            source = server_dir
+            server = self.servers.get(name)
+            try:
+                if server is not None and not server.exited.is_set():
+                    # The snapshot's fallback copy is throttled and accounted
+                    # to this job like the backup itself; reflinks are free
+                    job.total = 2 * DiskUsage().measure(str(server_dir))
+                    source = self.manager.server_path.parent / ".snapshots" / f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+                    snapshot = asyncio.run_coroutine_threadsafe(
+                        self._snapshot(server, source, save_timeout, in_job(snapshot_tree)), self.loop)
+                    report["pause_ms"], report["snapshot"] = snapshot.result()
+                job.total = job.done + DiskUsage().measure(str(source))
+                report["backup"] = backup_server(str(source), mode, source=str(server_dir))
+            finally:
+                if source != server_dir:
+                    shutil.rmtree(source, ignore_errors=True)
+            log_event("backup", f"Backup of '{name}' written to {report['backup']}", server=name,
+                      duration=time.time() - job.started)
+            return report
+
+        return self.scheduler.submit(f"Backup {name}", run, kind="backup", server=name, deferrable=True)
+
+    async def backup(self, name, mode="archive", wait=True):
+        job = self.submit_backup(name, mode)
+        if not wait:
+            return job.info()
+        return await asyncio.wrap_future(job.future)
+
+    async def _snapshot(self, server, snapshot_dir, save_timeout, copy_tree=snapshot_tree):
+        name = server.name
+        paused = time.perf_counter()
+        saved = asyncio.create_task(self._expect(server, "Saved the game", save_timeout))
+        await asyncio.sleep(0)  # let it subscribe
+        try:
+            await server.send("save-off")
+            await server.send("save-all flush")
+            await saved
+            snapshot = await asyncio.to_thread(copy_tree, server.server_dir, snapshot_dir)
+        except TimeoutError:
+            raise TimeoutError(f"Server '{name}' did not finish saving within {save_timeout}s")
+        finally:
+            saved.cancel()
+            if not server.exited.is_set():
+                await server.send("save-on")
+        pause_ms = (time.perf_counter() - paused) * 1000
+        log_event("backup", f"Hot backup of '{name}': save paused {pause_ms:.1f} ms, snapshot {snapshot}",
+                  server=name, duration=pause_ms / 1000)
+        return pause_ms, snapshot
+
+    def _schedule_entries(self):
+        # Per-server "backup_schedule": {"cron": "30 4 * * *", "mode": "archive",
+        # "jitter_minutes": 30} in config.json
+        entries = {}
+        default_jitter = self.manager.config["backup_jitter_minutes"]
+        for entry in os.scandir(self.manager.server_path):
+            if not entry.is_dir():
+                continue
+            try:
+                schedule = load_server_config(entry.path).get("backup_schedule")
+            except (OSError, ValueError):
+                continue
+            if schedule and schedule.get("cron"):
+                submit = lambda name=entry.name, mode=schedule.get("mode", "archive"): self.submit_backup(name, mode)
+                jitter = schedule.get("jitter_minutes", default_jitter) * 60
+                entries[f"backup:{entry.name}"] = (schedule["cron"], jitter, submit)
+        return entries
+
+    async def _reload_schedules(self):
+        while True:
+            try:
+                entries = await asyncio.to_thread(self._schedule_entries)
+                errors = self.scheduler.set_schedules(entries)
+                for key, error in errors.items():
+                    if self.schedule_errors.get(key) != error:
+                        logging.warning(f"Ignoring {key} schedule: {error}")
+                self.schedule_errors = errors
+            except OSError as e:
+                logging.warning(f"Could not read backup schedules: {e}")
+            await asyncio.sleep(SCHEDULE_RELOAD)
+
+    # --- Queries ---
+    def list(self):
+        return [server.info() for server in self.servers.values()]
+
+    async def metrics(self, seconds=0, gc_bytes=None):
+        result = {}
+        for name in self._targets():
+            entry = {"latest": self.sampler.latest(name), "health": self.watchdog.status(name)}
+            if seconds:
+                entry["cpu"] = self.sampler.window(name, "cpu", seconds)[1]
+                entry["rss"] = self.sampler.window(name, "rss", seconds)[1]
+                entry["cpu_p95"] = self.sampler.percentiles(name, "cpu", 300).get(95, 0.0)
+            result[name] = entry
+        if gc_bytes is not None:
+            names = list(result)
+            stats = await asyncio.gather(*(asyncio.to_thread(self.manager.gc_stats, n, gc_bytes) for n in names))
+            for name, gc in zip(names, stats):
+                result[name]["gc"] = gc
+        return result
+
+    # --- Control API ---
+    async def _op(self, op, args):
+        if op == "ping":
+            return {"pid": os.getpid(), "servers": len(self._targets())}
+        if op == "list":
+            return self.list()
+        if op == "start":
+            return await self.start(args.pop("name"), **args)
+        if op == "stop":
+            return await self.stop(args["name"], args.get("deadline"))
+        if op == "restart":
+            return await self.restart(args["name"], args.get("deadline"))
+        if op == "backup":
+            return await self.backup(args["name"], args.get("mode", "archive"), args.get("wait", True))
+        if op == "jobs":
+            return {
+                "jobs": self.scheduler.list(),
+                "schedules": {key: due.timestamp() for key, due in self.scheduler.next_runs().items()},
+            }
+        if op == "cancel_job":
+            if not self.scheduler.cancel(args["id"]):
+                raise ValueError(f"No queued or running job {args['id']}")
+            return None
+        if op == "health":
+            names = [args["name"]] if args.get("name") else list(self.servers)
+            return {
+                "servers": {name: self.watchdog.status(name) for name in names},
+                "alerts": [a for a in self.watchdog.alerts if a["name"] in names][-args.get("alerts", 20):],
+            }
+        if op == "history":
+            return self.history.get(args["name"], [])
+        if op == "send":
+            await self._running(args["name"]).send(args["command"])
+            return None
+        if op == "tail":
+            server = self.servers.get(args["name"])
+            return [list(line) for line in server.lines][-args.get("n", 100):] if server else []
+        if op == "log":
+            path = self.manager.server_path / args["name"] / "logs" / "latest.log"
+            return await asyncio.to_thread(tail_file, path, args.get("n", 100)) if path.exists() else []
+        if op == "metrics":
+            return await self.metrics(args.get("seconds", 0), args.get("gc_bytes"))
+        if op == "shutdown":
+            asyncio.create_task(self.shutdown(args.get("stop_servers", True)))
+            return None
+        raise ValueError(f"Unknown operation '{op}'")
+
+    async def _follow(self, args, emit):
+        server = self.servers.get(args["name"])
+        if server is None:
+            raise RuntimeError(f"Server '{args['name']}' has never run under this supervisor")
+        queue = asyncio.Queue(maxsize=FOLLOW_QUEUE)
+        queue.lagged = False
+        # Register before replaying the backlog; duplicates are skipped by seq
+        server.followers.add(queue)
+        last = args.get("since", 0)
+        try:
+            for seq, timestamp, stream, text in list(server.lines):
+                if seq > last:
+                    await emit({"event": "line", "seq": seq, "time": timestamp, "stream": stream, "text": text})
+                    last = seq
+            if server.ready.is_set():
+                await emit({"event": "ready", "startup_time": server.startup_time})
+            if server.exited.is_set():
+                await emit({"event": "exit", "returncode": server.returncode})
+                return
+            while True:
+                if queue.lagged and queue.empty():
+                    # Client can resume with since=seq
+                    await emit({"event": "lagged", "seq": last})
+                    return
+                kind, payload = await queue.get()
+                if kind == "line":
+                    seq, timestamp, stream, text = payload
+                    if seq > last:
+                        await emit({"event": "line", "seq": seq, "time": timestamp, "stream": stream, "text": text})
+                        last = seq
+                elif kind == "ready":
+                    await emit({"event": "ready", "startup_time": payload})
+                elif kind == "alert":
+                    await emit({"event": "alert", **payload})
+                else:
+                    await emit({"event": "exit", "returncode": payload})
+                    return
+        finally:
+            server.followers.discard(queue)
+
+    async def _watch_metrics(self, args, emit):
+        interval = max(0.1, float(args.get("interval", 1.0)))
+        while True:
+            await emit({"event": "metrics", "time": time.time(), "servers": await self.metrics()})
+            await asyncio.sleep(interval)
+
+    async def _events(self, args, emit):
+        # Fleet-wide process state: the current list, then one "state" event
+        # per start, ready and exit. A subscriber that falls behind gets
+        # "lagged" and should reconnect for a fresh list.
+        queue = asyncio.Queue(maxsize=EVENT_QUEUE)
+        queue.lagged = False
+        self.event_queues.add(queue)
+        try:
+            await emit({"event": "servers", "servers": self.list()})
+            while True:
+                if queue.lagged and queue.empty():
+                    await emit({"event": "lagged"})
+                    return
+                await emit({"event": "state", **await queue.get()})
+        finally:
+            self.event_queues.discard(queue)
+
+    async def _handle(self, reader, writer):
+        streams = set()
+
+        async def emit(message):
+            writer.write((json.dumps(message) + "\n").encode())
+            await writer.drain()
+
+        async def run(request):
+            request_id = request.get("id")
+            op = request.get("op")
+            args = dict(request.get("args") or {})
+            try:
+                if op in STREAM_OPS:
+                    await getattr(self, STREAM_OPS[op])(args, lambda m: emit({"id": request_id, **m}))
+                    await emit({"id": request_id, "event": "end"})
+                else:
+                    await emit({"id": request_id, "ok": True, "result": await self._op(op, args)})
+            except ConnectionError:
+                pass
+            except Exception as e:
+                logging.info(f"Supervisor {op} failed: {e}")
+                try:
+                    await emit({"id": request_id, "ok": False, "error": str(e), "kind": type(e).__name__})
+                except ConnectionError:
+                    pass
+
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    break
+                if not hmac.compare_digest(str(request.get("token", "")), self.token):
+                    await emit({"id": request.get("id"), "ok": False, "error": "bad token", "kind": "PermissionError"})
+                    break
+                task = asyncio.create_task(run(request))
+                if request.get("op") in STREAM_OPS:
+                    streams.add(task)
+                    task.add_done_callback(streams.discard)
+        except asyncio.CancelledError:
+            # Shutting down with the client still connected; a cancelled
+            # handler would be logged as an error by asyncio's stream callback.
+            pass
+        finally:
+            for task in streams:
+                task.cancel()
+            writer.close()
+
+    # --- Daemon ---
+    def _write_state(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_name(self.state_path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"host": self.host, "port": self.port, "token": self.token, "pid": os.getpid()}, f)
+        os.chmod(tmp, 0o600)
+        os.replace(tmp, self.state_path)
+
+    async def serve(self):
+        if hasattr(os, "pidfd_open") and sys.version_info < (3, 12):
+            # The default child watcher parks one thread per child in waitpid()
+            watcher = asyncio.PidfdChildWatcher()
+            watcher.attach_loop(asyncio.get_running_loop())
+            asyncio.set_child_watcher(watcher)
+        self._shutdown = asyncio.Event()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=READ_LIMIT)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._write_state()
+        self.sampler.start()
+        self.loop = asyncio.get_running_loop()
+        self.scheduler.start()
+        watchdog = asyncio.create_task(self.watchdog.run())
+        schedules = asyncio.create_task(self._reload_schedules())
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, lambda: asyncio.create_task(self.shutdown()))
+            except (NotImplementedError, RuntimeError):  # Windows
+                pass
+        logging.info(f"Supervisor listening on {self.host}:{self.port} (PID {os.getpid()})")
+        await self._shutdown.wait()
+        watchdog.cancel()
+        schedules.cancel()
+
+    async def shutdown(self, stop_servers=True):
+        if self._shutdown.is_set():
+            return
+        if stop_servers:
+            await asyncio.gather(*(self.stop(name) for name in self._targets()), return_exceptions=True)
+        self._server.close()
+        self.sampler.stop()
+        self.scheduler.stop()
+        if self.state_path.exists():
+            self.state_path.unlink()
+        logging.info("Supervisor shut down")
+        self._shutdown.set()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Moonlight supervisor daemon")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--java", default=None, help="java executable (default: java on PATH)")
+    args = parser.parse_args(argv)
+    try:
+        SupervisorClient.from_state().call("ping", timeout=2)
+        print("[SUPERVISOR] Already running.")
+        return 1
+    except (ConnectionError, OSError):
+        pass
+    setup_logging()
+    manager = ServerManager()
+    if args.java:
+        manager.JAVA_PATH = args.java
+    asyncio.run(Supervisor(manager, args.host, args.port).serve())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,337 @@
+import os
+import sys
+import json
+import time
+import socket
+import threading
+from pathlib import Path
+
+# Written by the daemon on startup: {"host", "port", "token", "pid"}
+STATE_PATH = Path("moonlight/supervisor.json")
+SPAWN_TIMEOUT = 10
+CALL_TIMEOUT = 30
+BACKUP_TIMEOUT = 3600  # writing a large archive takes a while
+# The daemon's stop escalation (core.lifecycle, not imported here to keep the
+# CLI light): "stop", SIGTERM after STOP_DEADLINE, SIGKILL TERM_DEADLINE later.
+# A restart then waits up to RELEASE_TIMEOUT for the port and world lock.
+STOP_DEADLINE = 60
+TERM_DEADLINE = 10
+RELEASE_TIMEOUT = 30
+# A console stream that drops (or falls behind and is cut off as "lagged")
+# is resumed from its last line; give up once the daemon has been
+# unreachable this long.
+RESUME_TIMEOUT = 10
+RESUME_INTERVAL = 0.5
+
+class SupervisorError(RuntimeError):
+    # An operation the daemon rejected; `kind` is the daemon-side exception
+    # class name (e.g. "OvercommitError", "FileNotFoundError").
+    def __init__(self, message, kind=None):
+        super().__init__(message)
+        self.kind = kind
+
+def read_state(path=STATE_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+class SupervisorClient:
+    # Talks newline-delimited JSON to the supervisor daemon over localhost.
+    # Unary calls share one connection; each stream gets its own.
+    def __init__(self, host, port, token, timeout=CALL_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_state(cls, path=STATE_PATH):
+        state = read_state(path)
+        if state is None:
+            raise ConnectionError("Supervisor is not running")
+        return cls(state["host"], state["port"], state["token"])
+
+    @classmethod
+    def connect(cls, spawn=True, path=STATE_PATH):
+        # Connect to the running daemon, starting one in the background when
+        # there is none (spawn=True).
+        try:
+            client = cls.from_state(path)
+            client.call("ping")
+            return client
+        except (ConnectionError, OSError):
+            if not spawn:
+                raise
+        spawn_daemon()
+        deadline = time.monotonic() + SPAWN_TIMEOUT
+        while True:
+            try:
+                client = cls.from_state(path)
+                client.call("ping")
+                return client
+            except (ConnectionError, OSError):
+                if time.monotonic() > deadline:
+                    raise ConnectionError("Supervisor did not come up; see moonlight/supervisor.log")
+                time.sleep(0.1)
+
+    def clone(self):
+        # Same daemon, separate connection: a slow call on one doesn't queue
+        # calls on the other
+        return type(self)(self.host, self.port, self.token, self.timeout)
+
+    def _open(self, timeout):
+        sock = socket.create_connection((self.host, self.port), timeout=timeout)
+        return sock, sock.makefile("rb")
+
+    def _request(self, op, args):
+        self._next_id += 1
+        return self._next_id, (json.dumps({"id": self._next_id, "token": self.token, "op": op, "args": args}) + "\n").encode()
+
+    def call(self, op, timeout=None, **args):
+        with self._lock:
+            if self._sock is None:
+                self._sock, self._file = self._open(self.timeout)
+            request_id, data = self._request(op, args)
+            try:
+                self._sock.settimeout(timeout or self.timeout)
+                self._sock.sendall(data)
+                line = self._file.readline()
+            except OSError:
+                self.close()
+                raise
+            if not line:
+                self.close()
+                raise ConnectionError("Supervisor closed the connection")
+        reply = json.loads(line)
+        if not reply.get("ok"):
+            raise SupervisorError(reply.get("error", "unknown error"), reply.get("kind"))
+        return reply.get("result")
+
+    def stream(self, op, **args):
+        # Yields event dicts until the daemon ends the stream or the caller
+        # stops iterating (which closes the connection).
+        sock, file = self._open(self.timeout)
+        try:
+            sock.settimeout(None)
+            _, data = self._request(op, args)
+            sock.sendall(data)
+            for line in file:
+                event = json.loads(line)
+                if event.get("ok") is False:
+                    raise SupervisorError(event.get("error", "unknown error"), event.get("kind"))
+                if event.get("event") == "end":
+                    return
+                yield event
+        finally:
+            file.close()
+            sock.close()
+
+    def close(self):
+        if self._sock is not None:
+            self._file.close()
+            self._sock.close()
+            self._sock = self._file = None
+
+    # --- Operations ---
+    def list(self):
+        return self.call("list")
+
+    def start(self, name, **options):
+        return self.call("start", name=name, **options)
+
+    def stop(self, name, timeout=None):
+        # Worst case: the whole escalation, plus slack for the reply
+        return self.call("stop", timeout=(timeout or STOP_DEADLINE) + TERM_DEADLINE + CALL_TIMEOUT,
+                         name=name, deadline=timeout)
+
+    def restart(self, name, timeout=None):
+        # Stop, wait for the port and lock, then start (one more call's worth)
+        return self.call("restart", timeout=(timeout or STOP_DEADLINE) + TERM_DEADLINE + RELEASE_TIMEOUT
+                         + 2 * CALL_TIMEOUT, name=name, deadline=timeout)
+
+    def backup(self, name, mode="archive", wait=True):
+        # wait=False returns the queued job's info instead of the finished backup
+        return self.call("backup", timeout=BACKUP_TIMEOUT if wait else None, name=name, mode=mode, wait=wait)
+
+    def jobs(self):
+        return self.call("jobs")
+
+    def cancel_job(self, job_id):
+        return self.call("cancel_job", id=job_id)
+
+    def health(self, name=None):
+        return self.call("health", name=name)
+
+    def history(self, name):
+        return self.call("history", name=name)
+
+    def send(self, name, command):
+        return self.call("send", name=name, command=command)
+
+    def tail(self, name, n=100):
+        return self.call("tail", name=name, n=n)
+
+    def log(self, name, n=100):
+        return self.call("log", name=name, n=n)
+
+    def metrics(self, seconds=0, gc_bytes=None):
+        return self.call("metrics", seconds=seconds, gc_bytes=gc_bytes)
+
+    def follow(self, name, since=0):
+        return self.stream("follow", name=name, since=since)
+
+    def watch_metrics(self, interval=1.0):
+        return self.stream("watch_metrics", interval=interval)
+
+    def events(self):
+        return self.stream("events")
+
+    def shutdown(self, stop_servers=True):
+        return self.call("shutdown", timeout=300, stop_servers=stop_servers)
+
+def spawn_daemon(log_path=None):
+    # Detached from this process so closing the GUI or CLI leaves the
+    # daemon (and every server it owns) running. subprocess is imported
+    # here to keep it off the CLI's start-up path.
+    import subprocess
+    root = Path(__file__).resolve().parent.parent
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(root), env.get("PYTHONPATH")]))
+    log_path = Path(log_path or STATE_PATH.with_name("supervisor.log"))
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    kwargs = {}
+    if os.name == "nt":
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    with open(log_path, "ab") as log:
+        return subprocess.Popen(
+            [sys.executable, "-m", "core.supervisor"],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            env=env,
+            **kwargs
+        )
+
+class RemoteConsole:
+    # The ServerConsole interface (subscribe/tail/on_ready/on_exit/send) for
+    # a server owned by the daemon, so console widgets work unchanged. One
+    # reader thread follows the daemon's console stream.
+    def __init__(self, client, name):
+        self.client = client
+        # Commands typed into a console go out on their own connection so
+        # they never wait behind other calls on the shared client
+        self.sender = client.clone()
+        self.name = name
+        self.startup_time = None
+        self.returncode = None
+        self.ready = threading.Event()
+        self.exited = threading.Event()
+        self._lock = threading.Lock()
+        self._lines = []
+        self._subscribers = []
+        self._ready_callbacks = []
+        self._exit_callbacks = []
+        self._thread = threading.Thread(target=self._run, name=f"remote-console-{name}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        # Only an "exit" event ends the console. A "lagged" cut-off or a
+        # dropped connection resumes after the last line seen; if the daemon
+        # stays unreachable the console ends with returncode None.
+        last_seq = 0
+        failed_since = None
+        while True:
+            end = None
+            try:
+                for event in self.client.follow(self.name, since=last_seq):
+                    failed_since = None
+                    kind = event["event"]
+                    if kind == "line":
+                        last_seq = event["seq"]
+                        self._on_line((event["seq"], event["time"], event["stream"], event["text"]))
+                    elif kind == "ready":
+                        self._on_ready(event["startup_time"])
+                    elif kind in ("exit", "lagged"):
+                        end = event
+                        break
+            except SupervisorError:
+                break  # e.g. the daemon restarted and no longer knows this server
+            except (OSError, ValueError):  # ValueError: a line cut off mid-JSON
+                pass
+            if end is not None and end["event"] == "exit":
+                self.returncode = end["returncode"]
+                break
+            if end is None:
+                # Connection dropped or closed mid-stream
+                now = time.monotonic()
+                failed_since = failed_since or now
+                if now - failed_since >= RESUME_TIMEOUT:
+                    break
+                time.sleep(RESUME_INTERVAL)
+        self.sender.close()
+        with self._lock:
+            self.exited.set()
+            callbacks, self._exit_callbacks = self._exit_callbacks, []
+        for callback in callbacks:
+            callback(self.returncode)
+
+    def _on_line(self, entry):
+        with self._lock:
+            self._lines.append(entry)
+            del self._lines[:-5000]
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            callback(entry[0], entry[2], entry[3])
+
+    def _on_ready(self, startup_time):
+        # Sent again on every resumed stream
+        with self._lock:
+            if self.ready.is_set():
+                return
+            self.startup_time = startup_time
+            self.ready.set()
+            callbacks, self._ready_callbacks = self._ready_callbacks, []
+        for callback in callbacks:
+            callback(self.startup_time)
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+        return lambda: self._remove(callback)
+
+    def _remove(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def on_ready(self, callback):
+        with self._lock:
+            if not self.ready.is_set():
+                self._ready_callbacks.append(callback)
+                return
+        callback(self.startup_time)
+
+    def on_exit(self, callback):
+        with self._lock:
+            if not self.exited.is_set():
+                self._exit_callbacks.append(callback)
+                return
+        callback(self.returncode)
+
+    def tail(self, n=100):
+        with self._lock:
+            return self._lines[-n:]
+
+    def send(self, command):
+        try:
+            self.sender.send(self.name, command)
+        except (OSError, SupervisorError) as e:
+            raise RuntimeError(f"Cannot send to '{self.name}': {e}")
@@ -0,0 +1,304 @@
+import os
+import re
+import time
+import shutil
+import signal
+import asyncio
+import logging
+import subprocess
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+import psutil
+from .config import load_server_config
+from .console import DONE_PATTERN
+from .rcon import rcon_command, RconError
+from .logs import log_event
+
+CHECK_INTERVAL = 1.0
+ALERT_HISTORY = 200
+LAG = re.compile(r"Can't keep up! Is the server overloaded\? Running (\d+)ms or (\d+) ticks behind")
+TPS = re.compile(r"TPS from last 1m, 5m, 15m: \W*(\d+(?:\.\d+)?)")
+COLOR_CODE = re.compile("§.")
+# Lines the main server thread prints in answer to the probe command; any of
+# them proves it is still ticking.
+PROBE_REPLY = re.compile(r"TPS from last|players online|Unknown or incomplete command|Unknown command")
+CRASH_MARKERS = (
+    "---- Minecraft Crash Report ----",
+    "This crash report has been saved to",
+    "Encountered an unexpected exception",
+    "java.lang.OutOfMemoryError",
+)
+# Printed by the vanilla/Paper watchdog threads when the main thread is stuck
+HANG_MARKERS = ("A single server tick took", "The server has stopped responding!")
+
+# Overridden per server by the "watchdog" block of <server>/config.json
+DEFAULT_WATCHDOG = {
+    "enabled": True,
+    "window_s": 300,  # sliding window for ticks behind
+    "lag_ticks": 200,  # ticks behind within the window that count as lagging
+    "tps_min": 15.0,
+    "poll": "console",  # "console", "rcon" or "none"
+    "probe_command": "list",  # "tps" on Paper/Spigot also reports TPS
+    "probe_interval_s": 30,
+    "hung_timeout_s": 60,
+    "startup_timeout_s": 600,
+    "stop_deadline_s": 30,
+    "on_lag": ["alert"],
+    "on_hung": ["alert", "thread_dump", "restart"],
+    "on_crash": ["alert", "restart"],
+    "backoff_base_s": 5,
+    "backoff_max_s": 300,
+    "max_restarts": 5,  # within backoff_reset_s, then give up
+    "backoff_reset_s": 1800,
+}
+
+def watchdog_settings(server_dir):
+    return {**DEFAULT_WATCHDOG, **load_server_config(server_dir).get("watchdog", {})}
+
+class TickHealth:
+    # Health of one server process, fed its console lines. Pure bookkeeping
+    # so it can be driven from any loop (or a test) with explicit times.
+    def __init__(self, settings, now):
+        self.settings = settings
+        self.created = now
+        self.lag = deque()  # (time, ticks behind)
+        self.ready = False
+        self.crash = None
+        self.hang_marker = None
+        self.tps = None
+        self.probe_sent = None
+        self.last_probe = now
+        self.last_reply = None
+        self.state = "starting"
+
+    def feed(self, text, now):
+        if "Can't keep up" in text:
+            match = LAG.search(text)
+            if match:
+                self.lag.append((now, int(match.group(2))))
+            return
+        if not self.ready and DONE_PATTERN.search(text):
+            self.ready = True
+        if self.probe_sent is not None and PROBE_REPLY.search(text):
+            self.mark_reply(now)
+        if "TPS from last" in text:
+            match = TPS.search(COLOR_CODE.sub("", text))
+            if match:
+                self.tps = float(match.group(1))
+        if self.crash is None and any(marker in text for marker in CRASH_MARKERS):
+            self.crash = text
+        if self.hang_marker is None and any(marker in text for marker in HANG_MARKERS):
+            self.hang_marker = text
+
+    def ticks_behind(self, now):
+        cutoff = now - self.settings["window_s"]
+        while self.lag and self.lag[0][0] < cutoff:
+            self.lag.popleft()
+        return sum(ticks for _, ticks in self.lag)
+
+    def probe_due(self, now):
+        return (self.ready and self.probe_sent is None and self.settings["poll"] != "none"
+                and now - self.last_probe >= self.settings["probe_interval_s"])
+
+    def mark_probe(self, now):
+        self.probe_sent = self.last_probe = now
+
+    def mark_reply(self, now):
+        # An answer proves the main thread is ticking again, so an earlier
+        # OutOfMemoryError or stuck-tick warning it survived no longer counts
+        self.probe_sent = None
+        self.last_reply = now
+        self.crash = None
+        self.hang_marker = None
+
+    def evaluate(self, now):
+        s = self.settings
+        if self.crash:
+            self.state = "crashed"
+        elif self.hang_marker or (self.probe_sent is not None and now - self.probe_sent > s["hung_timeout_s"]):
+            self.state = "hung"
+        elif not self.ready:
+            self.state = "hung" if now - self.created > s["startup_timeout_s"] else "starting"
+        elif self.ticks_behind(now) > s["lag_ticks"] or (self.tps is not None and self.tps < s["tps_min"]):
+            self.state = "lagging"
+        else:
+            self.state = "healthy"
+        return self.state
+
+    def summary(self, now):
+        return {
+            "state": self.state,
+            "ticks_behind": self.ticks_behind(now),
+            "tps": self.tps,
+            "last_reply": self.last_reply,
+            "crash": self.crash,
+        }
+
+class Backoff:
+    # Restart delays of base, 2*base, 4*base... up to a cap; after
+    # max_restarts within backoff_reset_s the server is left down.
+    def __init__(self):
+        self.attempts = deque()
+
+    def next_delay(self, settings, now):
+        while self.attempts and now - self.attempts[0] > settings["backoff_reset_s"]:
+            self.attempts.popleft()
+        n = len(self.attempts)
+        if n >= settings["max_restarts"]:
+            return None
+        self.attempts.append(now)
+        return min(settings["backoff_max_s"], settings["backoff_base_s"] * 2 ** n)
+
+def capture_thread_dump(pid, server_dir, java_path="java"):
+    # jcmd writes the dump to a file; without a JDK, SIGQUIT makes the JVM
+    # print it to stdout, where it lands in the console buffer and log.
+    jcmd = shutil.which("jcmd")
+    sibling = Path(shutil.which(java_path) or java_path).with_name("jcmd.exe" if os.name == "nt" else "jcmd")
+    if jcmd is None and sibling.exists():
+        jcmd = str(sibling)
+    if jcmd:
+        path = Path(server_dir) / "logs" / f"threaddump-{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        result = subprocess.run([jcmd, str(pid), "Thread.print"], capture_output=True, text=True, timeout=60)
+        path.write_text(result.stdout + result.stderr)
+        return str(path)
+    # SIGQUIT kills anything that isn't a JVM, so check first
+    if hasattr(signal, "SIGQUIT") and psutil.Process(pid).name().startswith("java"):
+        os.kill(pid, signal.SIGQUIT)
+        return "console"
+    return None
+
+class Watchdog:
+    # Runs on the supervisor's event loop: feeds every console line to the
+    # server's TickHealth, probes liveness, and acts on state changes.
+    def __init__(self, supervisor, interval=CHECK_INTERVAL):
+        self.supervisor = supervisor
+        self.interval = interval
+        self.backoff = {}  # name -> Backoff, kept across restarts
+        self.alerts = deque(maxlen=ALERT_HISTORY)
+        self.recovering = set()
+
+    def attach(self, server):
+        server.watchdog_settings = watchdog_settings(server.server_dir)
+        server.health = TickHealth(server.watchdog_settings, time.time())
+
+    def status(self, name):
+        server = self.supervisor.servers.get(name)
+        if server is None:
+            return None
+        status = server.health.summary(time.time())
+        status["restarts"] = len(self.backoff[name].attempts) if name in self.backoff else 0
+        return status
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.time()
+            for server in list(self.supervisor.servers.values()):
+                if server.exited.is_set() or server.stopping:
+                    continue
+                health = server.health
+                previous = health.state
+                if health.evaluate(now) != previous:
+                    await self._transition(server, previous, health.state)
+                if health.probe_due(now):
+                    health.mark_probe(now)
+                    asyncio.create_task(self._probe(server))
+
+    async def _probe(self, server):
+        settings = server.watchdog_settings
+        try:
+            if settings["poll"] == "rcon":
+                reply = await asyncio.to_thread(rcon_command, server.server_dir, settings["probe_command"],
+                                                settings["hung_timeout_s"])
+                for line in reply.splitlines():
+                    server.health.feed(line, time.time())
+                server.health.mark_reply(time.time())  # any RCON answer proves liveness
+            else:
+                await server.send(settings["probe_command"])
+        except (OSError, RconError, RuntimeError) as e:
+            # No answer: the probe stays outstanding and turns into "hung"
+            logging.debug(f"Watchdog probe of '{server.name}' failed: {e}")
+
+    def on_exit(self, server, returncode):
+        # Called by the supervisor when a process ends, before the exit is
+        # published, so followers still get the crash alert.
+        if server.stopping:
+            return
+        if returncode != 0 and server.health.crash is None:
+            server.health.crash = f"exited with code {returncode}"
+        if server.health.crash is not None:
+            previous = server.health.state
+            server.health.state = "crashed"
+            if server.watchdog_settings["enabled"] and "alert" in server.watchdog_settings["on_crash"]:
+                self.alert(server, "crashed", server.health.crash)
+            asyncio.create_task(self._transition(server, previous, "crashed", alerted=True))
+
+    async def _transition(self, server, previous, state, alerted=False):
+        settings = server.watchdog_settings
+        log_event("health", f"Watchdog: '{server.name}' {previous} -> {state}", server=server.name, state=state)
+        if state == "healthy" and previous in ("lagging", "hung", "crashed"):
+            self.alert(server, "recovered", f"'{server.name}' is healthy again")
+            return
+        actions = {"lagging": "on_lag", "hung": "on_hung", "crashed": "on_crash"}.get(state)
+        if actions is None or not settings["enabled"]:
+            return
+        dump = None
+        for action in settings[actions]:
+            if action == "alert" and not alerted:
+                detail = {
+                    "lagging": f"{server.health.ticks_behind(time.time())} ticks behind in {settings['window_s']}s"
+                               + (f", TPS {server.health.tps}" if server.health.tps is not None else ""),
+                    "hung": server.health.hang_marker or f"no answer to '{settings['probe_command']}'",
+                    "crashed": server.health.crash,
+                }[state]
+                self.alert(server, state, detail)
+            elif action == "thread_dump" and not server.exited.is_set():
+                # jcmd can take up to a minute; don't hold up the other servers' checks
+                dump = asyncio.create_task(self._thread_dump(server))
+            elif action == "restart":
+                asyncio.create_task(self._recover(server, after=dump))
+
+    async def _thread_dump(self, server):
+        try:
+            where = await asyncio.to_thread(capture_thread_dump, server.proc.pid, server.server_dir,
+                                            self.supervisor.manager.JAVA_PATH)
+            self.alert(server, "thread_dump", f"thread dump: {where or 'unavailable (no jcmd, not a JVM)'}")
+        except (OSError, subprocess.SubprocessError, psutil.Error) as e:
+            logging.warning(f"Thread dump of '{server.name}' failed: {e}")
+
+    def alert(self, server, kind, detail):
+        alert = {"time": time.time(), "name": server.name, "kind": kind, "detail": detail}
+        self.alerts.append(alert)
+        server._publish(("alert", alert))
+        log_event("alert", f"Watchdog alert for '{server.name}': {kind}: {detail}", server=server.name,
+                  level=logging.WARNING, kind=kind)
+
+    async def _recover(self, server, after=None):
+        # `after`: a thread dump to finish before the server is stopped
+        name = server.name
+        if name in self.recovering:
+            return
+        self.recovering.add(name)
+        try:
+            if after is not None:
+                await after
+            settings = server.watchdog_settings
+            delay = self.backoff.setdefault(name, Backoff()).next_delay(settings, time.time())
+            if delay is None:
+                self.alert(server, "gave_up", f"{settings['max_restarts']} restarts within "
+                                              f"{settings['backoff_reset_s']}s; leaving it down")
+                return
+            if not server.exited.is_set():
+                await self.supervisor.stop(name, settings["stop_deadline_s"])
+            self.alert(server, "restart", f"restarting in {delay}s")
+            await asyncio.sleep(delay)
+            current = self.supervisor.servers.get(name)
+            if current is not server and current is not None and not current.exited.is_set():
+                return  # started by someone else meanwhile
+            await self.supervisor.start(name, **server.options)
+        except Exception as e:
+            self.alert(server, "restart_failed", str(e))
+        finally:
+            self.recovering.discard(name)
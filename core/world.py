@@ -0,0 +1,292 @@
+import os
+import re
+import mmap
+import time
+import zlib
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from .lifecycle import read_properties, world_lock_released
+
+# Anvil region files: a 4 KiB table of 1024 chunk locations (3-byte sector
+# offset, 1-byte sector count), a 4 KiB table of save timestamps, then the
+# chunks themselves, each padded to whole 4 KiB sectors.
+SECTOR = 4096
+HEADER = 2 * SECTOR
+REGION_NAME = re.compile(r"r\.(-?\d+)\.(-?\d+)\.mca$")
+# Region-file folders that share the terrain's chunk grid; when a chunk is
+# trimmed from region/ its entities and POIs go with it.
+LINKED_DIRS = ("entities", "poi")
+TICKS_PER_MINUTE = 1200
+# InhabitedTime histogram buckets, in ticks
+BUCKETS = (("never", 1), ("<1 min", TICKS_PER_MINUTE), ("<10 min", 10 * TICKS_PER_MINUTE),
+           ("<1 h", 60 * TICKS_PER_MINUTE), (">=1 h", None))
+
+GZIP, ZLIB, NONE = 1, 2, 3
+EXTERNAL = 128  # flag: chunk data lives in c.<x>.<z>.mcc next to the region
+
+# --- Minimal NBT reader ---
+# Only walks far enough to find InhabitedTime; every other tag is skipped
+# by size without building Python objects.
+FIXED_SIZES = {1: 1, 2: 2, 3: 4, 4: 8, 5: 4, 6: 8}
+ARRAY_SIZES = {7: 1, 11: 4, 12: 8}
+INHABITED = b"InhabitedTime"
+
+def _skip(data, pos, tag):
+    if tag in FIXED_SIZES:
+        return pos + FIXED_SIZES[tag]
+    if tag in ARRAY_SIZES:
+        return pos + 4 + struct.unpack_from(">i", data, pos)[0] * ARRAY_SIZES[tag]
+    if tag == 8:
+        return pos + 2 + struct.unpack_from(">H", data, pos)[0]
+    if tag == 9:
+        item, length = struct.unpack_from(">bi", data, pos)
+        pos += 5
+        if item in FIXED_SIZES:
+            return pos + length * FIXED_SIZES[item]
+        for _ in range(length):
+            pos = _skip(data, pos, item)
+        return pos
+    if tag == 10:
+        while True:
+            child = data[pos]
+            if child == 0:
+                return pos + 1
+            pos += 3 + struct.unpack_from(">H", data, pos + 1)[0]
+            pos = _skip(data, pos, child)
+    raise ValueError(f"Bad NBT tag {tag}")
+
+def _find_inhabited(data, pos):
+    # Scans one compound's entries; pre-1.18 chunks keep it under "Level".
+    while True:
+        tag = data[pos]
+        if tag == 0:
+            return None
+        length = struct.unpack_from(">H", data, pos + 1)[0]
+        name = data[pos + 3:pos + 3 + length]
+        pos += 3 + length
+        if tag == 4 and name == INHABITED:
+            return struct.unpack_from(">q", data, pos)[0]
+        if tag == 10 and name == b"Level":
+            return _find_inhabited(data, pos)
+        pos = _skip(data, pos, tag)
+
+def inhabited_time(payload, compression):
+    # InhabitedTime in ticks, or None when the chunk can't be decoded here
+    # (LZ4 or unknown compression, corrupt data).
+    try:
+        if compression == ZLIB:
+            data = zlib.decompress(payload)
+        elif compression == GZIP:
+            data = zlib.decompress(payload, 31)
+        elif compression == NONE:
+            data = payload
+        else:
+            return None
+        if data[0] != 10:
+            return None
+        return _find_inhabited(data, 3 + struct.unpack_from(">H", data, 1)[0])
+    except (zlib.error, struct.error, IndexError, ValueError, RecursionError):
+        return None
+
+# --- Region files ---
+def region_coords(path):
+    match = REGION_NAME.search(str(path))
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+def _chunks(mm, size):
+    # (index, sector offset, sector count, timestamp) of every stored chunk
+    locations = struct.unpack_from(">1024I", mm, 0)
+    timestamps = struct.unpack_from(">1024I", mm, SECTOR)
+    for index, location in enumerate(locations):
+        offset, sectors = location >> 8, location & 0xFF
+        if sectors and offset >= 2 and offset * SECTOR < size:
+            yield index, offset, sectors, timestamps[index]
+
+def _read_chunk(mm, size, path, index, offset):
+    # (payload, compression) of one chunk, following .mcc overflow files
+    start = offset * SECTOR
+    if start + 5 > size:
+        return None, None
+    length, compression = struct.unpack_from(">IB", mm, start)
+    if compression & EXTERNAL:
+        rx, rz = region_coords(path)
+        external = Path(path).with_name(f"c.{rx * 32 + index % 32}.{rz * 32 + index // 32}.mcc")
+        try:
+            return external.read_bytes(), compression & ~EXTERNAL
+        except OSError:
+            return None, None
+    if length < 1 or start + 4 + length > size:
+        return None, None
+    return mm[start + 5:start + 4 + length], compression
+
+def _bucket(ticks):
+    for label, limit in BUCKETS:
+        if limit is None or ticks < limit:
+            return label
+
+def analyze_region(path, min_inhabited=None):
+    path = Path(path)
+    rx, rz = region_coords(path)
+    size = path.stat().st_size
+    report = {
+        "file": str(path), "x": rx, "z": rz, "file_bytes": size, "chunks": 0, "chunk_bytes": 0,
+        "inhabited_total": 0, "inhabited_max": 0, "undecodable": 0, "below": 0, "below_bytes": 0,
+        "oldest": None, "newest": None, "histogram": dict.fromkeys((label for label, _ in BUCKETS), 0),
+    }
+    if size < HEADER:
+        return report
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for index, offset, sectors, timestamp in _chunks(mm, size):
+            report["chunks"] += 1
+            report["chunk_bytes"] += sectors * SECTOR
+            if timestamp:
+                report["oldest"] = min(report["oldest"] or timestamp, timestamp)
+                report["newest"] = max(report["newest"] or timestamp, timestamp)
+            ticks = inhabited_time(*_read_chunk(mm, size, path, index, offset))
+            if ticks is None:
+                report["undecodable"] += 1
+                continue
+            report["inhabited_total"] += ticks
+            report["inhabited_max"] = max(report["inhabited_max"], ticks)
+            report["histogram"][_bucket(ticks)] += 1
+            if min_inhabited is not None and ticks < min_inhabited:
+                report["below"] += 1
+                report["below_bytes"] += sectors * SECTOR
+    return report
+
+def _keep_chunk(rx, rz, index, ticks, min_inhabited, radius, center):
+    # Square radius in chunks around `center`, like the world border.
+    # Chunks that can't be decoded are always kept.
+    if radius is not None:
+        cx, cz = rx * 32 + index % 32, rz * 32 + index // 32
+        if max(abs(cx - center[0]), abs(cz - center[1])) > radius:
+            return False
+    if min_inhabited is not None and ticks is not None and ticks < min_inhabited:
+        return False
+    return True
+
+def _rewrite_region(path, keep, dry_run):
+    # Writes only the chunks whose index is in `keep`, packed back to back,
+    # via a temp file. Returns (chunks kept, chunks dropped, bytes after).
+    size = path.stat().st_size
+    if size < HEADER:
+        return 0, 0, size
+    tmp = path.with_name(path.name + ".tmp")
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        chunks = list(_chunks(mm, size))
+        kept = [chunk for chunk in chunks if chunk[0] in keep]
+        dropped = len(chunks) - len(kept)
+        if dropped == 0:
+            return len(kept), 0, size
+        after = HEADER + sum(sectors for _, _, sectors, _ in kept) * SECTOR if kept else 0
+        if dry_run:
+            return len(kept), dropped, after
+        rx, rz = region_coords(path)
+        overflow = [path.with_name(f"c.{rx * 32 + index % 32}.{rz * 32 + index // 32}.mcc")
+                    for index, offset, _, _ in chunks
+                    if index not in keep and offset * SECTOR + 4 < size and mm[offset * SECTOR + 4] & EXTERNAL]
+        if kept:
+            locations = [0] * 1024
+            timestamps = [0] * 1024
+            with open(tmp, "wb") as out:
+                out.seek(HEADER)
+                sector = 2
+                for index, offset, sectors, timestamp in kept:
+                    out.write(mm[offset * SECTOR:(offset + sectors) * SECTOR].ljust(sectors * SECTOR, b"\0"))
+                    locations[index] = sector << 8 | sectors
+                    timestamps[index] = timestamp
+                    sector += sectors
+                out.seek(0)
+                out.write(struct.pack(">1024I", *locations) + struct.pack(">1024I", *timestamps))
+    # The mapping is closed before the original is replaced (Windows)
+    if kept:
+        os.replace(tmp, path)
+    else:
+        path.unlink()
+    for external in overflow:
+        external.unlink(missing_ok=True)
+    return len(kept), dropped, after
+
+def trim_region(path, min_inhabited=None, radius=None, center=(0, 0), dry_run=False):
+    # Decides from the terrain chunks which to keep, then applies the same
+    # set to the matching entities/ and poi/ region files.
+    path = Path(path)
+    rx, rz = region_coords(path)
+    before = path.stat().st_size
+    keep = set()
+    if before >= HEADER:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for index, offset, _, _ in _chunks(mm, before):
+                ticks = None
+                if min_inhabited is not None:
+                    # Out-of-radius chunks are dropped without decompressing
+                    if not _keep_chunk(rx, rz, index, 0, None, radius, center):
+                        continue
+                    ticks = inhabited_time(*_read_chunk(mm, before, path, index, offset))
+                if _keep_chunk(rx, rz, index, ticks, min_inhabited, radius, center):
+                    keep.add(index)
+    kept, dropped, after = _rewrite_region(path, keep, dry_run)
+    report = {"file": str(path), "kept": kept, "dropped": dropped, "bytes_before": before, "bytes_after": after}
+    for linked in LINKED_DIRS:
+        other = path.parent.parent / linked / path.name
+        if other.exists():
+            report["bytes_before"] += other.stat().st_size
+            report["bytes_after"] += _rewrite_region(other, keep, dry_run)[2]
+    return report
+
+# --- Worlds ---
+def world_dir(server_dir):
+    return Path(server_dir) / (read_properties(server_dir).get("level-name") or "world")
+
+def region_files(world):
+    # Terrain region files of every dimension (region/, DIM-1/region/,
+    # dimensions/<namespace>/<name>/region/ ...)
+    return sorted(p for p in Path(world).rglob("*.mca") if p.parent.name == "region" and region_coords(p))
+
+def _map(function, jobs, workers):
+    # Region files are independent, so they're spread over processes; small
+    # jobs stay in-process to avoid the pool start-up cost.
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) < 2:
+        return [function(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        return list(pool.map(function, *zip(*jobs), chunksize=max(1, len(jobs) // (workers * 4))))
+
+def analyze_world(world, min_inhabited=None, workers=None):
+    started = time.perf_counter()
+    world = Path(world)
+    regions = _map(analyze_region, [(path, min_inhabited) for path in region_files(world)], workers)
+    summary = {"regions": len(regions), "histogram": dict.fromkeys((label for label, _ in BUCKETS), 0)}
+    for key in ("chunks", "file_bytes", "chunk_bytes", "undecodable", "below", "below_bytes", "inhabited_total"):
+        summary[key] = sum(region[key] for region in regions)
+    dimensions = {}
+    for region in regions:
+        for label, count in region["histogram"].items():
+            summary["histogram"][label] += count
+        dimension = Path(region["file"]).parent.parent.relative_to(world).as_posix()
+        dimension = "overworld" if dimension == "." else dimension
+        entry = dimensions.setdefault(dimension, {"regions": 0, "chunks": 0, "file_bytes": 0})
+        entry["regions"] += 1
+        entry["chunks"] += region["chunks"]
+        entry["file_bytes"] += region["file_bytes"]
+    summary["dimensions"] = dimensions
+    summary["region_reports"] = regions
+    summary["seconds"] = time.perf_counter() - started
+    return summary
+
+def trim_world(world, min_inhabited=None, radius=None, center=(0, 0), dry_run=False, workers=None):
+    if min_inhabited is None and radius is None:
+        raise ValueError("Give a minimum inhabited time, a radius, or both")
+    world = Path(world)
+    if not dry_run and not world_lock_released(world / "session.lock"):
+        raise RuntimeError(f"{world} is in use; stop the server before trimming")
+    started = time.perf_counter()
+    jobs = [(path, min_inhabited, radius, tuple(center), dry_run) for path in region_files(world)]
+    regions = _map(trim_region, jobs, workers)
+    report = {"regions": len(regions), "dry_run": dry_run}
+    for key in ("kept", "dropped", "bytes_before", "bytes_after"):
+        report[key] = sum(region[key] for region in regions)
+    report["regions_removed"] = sum(1 for region in regions if region["kept"] == 0)
+    report["seconds"] = time.perf_counter() - started
+    return report
@@ -0,0 +1,85 @@
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPlainTextEdit, QLineEdit, QPushButton, QLabel
+from PyQt5.QtCore import pyqtSignal
+
+MAX_VISIBLE_LINES = 2000
+
+class ConsoleWidget(QWidget):
+    # Reader threads deliver lines; signals hop them onto the GUI thread.
+    line_received = pyqtSignal(int, str, str)
+    server_ready = pyqtSignal(float)
+    server_exited = pyqtSignal(object)  # returncode, None if the supervisor was lost
+
+    def __init__(self, console):
+        super().__init__()
+        self.console = console
+        self.setWindowTitle(f"Console - {console.name}")
+        self.resize(800, 450)
+
+        self.output = QPlainTextEdit()
+        self.output.setReadOnly(True)
+        self.output.setMaximumBlockCount(MAX_VISIBLE_LINES)
+        self.status_label = QLabel("Starting...")
+        self.command_input = QLineEdit()
+        self.command_input.setPlaceholderText("Type a console command (e.g. list, say hi, stop)")
+        self.send_button = QPushButton("Send")
+
+        self.command_input.returnPressed.connect(self.send_command)
+        self.send_button.clicked.connect(self.send_command)
+        self.line_received.connect(self.append_line)
+        self.server_ready.connect(lambda t: self.status_label.setText(f"Ready (started in {t:.2f}s)"))
+        self.server_exited.connect(self.on_exited)
+
+        input_layout = QHBoxLayout()
+        input_layout.addWidget(self.command_input)
+        input_layout.addWidget(self.send_button)
+        layout = QVBoxLayout()
+        layout.addWidget(self.status_label)
+        layout.addWidget(self.output)
+        layout.addLayout(input_layout)
+        self.setLayout(layout)
+
+        self.last_seq = 0
+        self.unsubscribe = None
+        console.on_ready(lambda t: self.server_ready.emit(t or 0.0))
+        console.on_exit(self.server_exited.emit)
+
+    def append_line(self, seq, stream, text):
+        if seq <= self.last_seq:
+            return
+        self.last_seq = seq
+        self.output.appendPlainText(text if stream == "stdout" else f"[stderr] {text}")
+
+    def send_command(self):
+        command = self.command_input.text().strip()
+        if not command:
+            return
+        try:
+            self.console.send(command)
+            self.output.appendPlainText(f"> {command}")
+        except RuntimeError as e:
+            self.status_label.setText(str(e))
+        self.command_input.clear()
+
+    def on_exited(self, code):
+        if code is None:
+            self.status_label.setText("Lost connection to the supervisor")
+        else:
+            self.status_label.setText(f"Server exited with code {code}")
+        self.command_input.setEnabled(False)
+        self.send_button.setEnabled(False)
+
+    def showEvent(self, event):
+        # Subscribed only while shown, so a reopened window catches up.
+        # Subscribe before replaying the backlog so no line falls in between;
+        # anything seen twice is skipped by sequence number.
+        if self.unsubscribe is None:
+            self.unsubscribe = self.console.subscribe(self.line_received.emit)
+            for seq, _, stream, text in self.console.tail(MAX_VISIBLE_LINES):
+                self.append_line(seq, stream, text)
+        super().showEvent(event)
+
+    def closeEvent(self, event):
+        if self.unsubscribe is not None:
+            self.unsubscribe()
+            self.unsubscribe = None
+        super().closeEvent(event)
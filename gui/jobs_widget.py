@@ -0,0 +1,61 @@
+import time
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtWidgets import QTableWidget, QTableWidgetItem, QProgressBar, QPushButton, QAbstractItemView
+from gui.server_model import format_bytes
+
+COLUMNS = ("Job", "State", "Progress", "ETA", "")
+RECENT_SECONDS = 60  # finished jobs stay listed this long
+
+def format_eta(seconds):
+    if seconds is None:
+        return ""
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes // 60}h{minutes % 60:02d}m" if minutes >= 60 else f"{minutes}m{seconds:02d}s"
+
+class JobsWidget(QTableWidget):
+    # Maintenance jobs (backups, provisioning, downloads) from the GUI's own
+    # scheduler and the daemon's, refreshed by polling. Each job dict carries
+    # a "source" so cancel_requested can be routed back to its scheduler.
+    cancel_requested = pyqtSignal(str, int)
+
+    def __init__(self):
+        super().__init__(0, len(COLUMNS))
+        self.setHorizontalHeaderLabels(COLUMNS)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.verticalHeader().setVisible(False)
+        self.horizontalHeader().setStretchLastSection(True)
+        self.setMaximumHeight(140)
+        self.hide()
+
+    def set_jobs(self, jobs):
+        now = time.time()
+        jobs = [job for job in jobs if not job["finished"] or now - job["finished"] < RECENT_SECONDS]
+        self.setVisible(bool(jobs))
+        self.setRowCount(len(jobs))
+        for row, job in enumerate(jobs):
+            self.setItem(row, 0, QTableWidgetItem(job["name"]))
+            state = QTableWidgetItem(job["state"])
+            if job["error"]:
+                state.setToolTip(job["error"])
+            self.setItem(row, 1, state)
+            bar = QProgressBar()
+            if job["progress"] is not None:
+                bar.setValue(int(job["progress"] * 100))
+            elif job["finished"]:
+                bar.setValue(100 if job["state"] == "done" else 0)
+            else:
+                bar.setRange(0, 0)  # size unknown: busy indicator
+            if job["rate"]:
+                bar.setFormat(f"%p%  {format_bytes(job['rate'])}/s" if job["progress"] is not None
+                              else f"{format_bytes(job['done'])}  {format_bytes(job['rate'])}/s")
+            self.setCellWidget(row, 2, bar)
+            self.setItem(row, 3, QTableWidgetItem(format_eta(job["eta"])))
+            if job["finished"]:
+                self.removeCellWidget(row, 4)
+                self.setItem(row, 4, QTableWidgetItem(""))
+            else:
+                button = QPushButton("Cancel")
+                button.clicked.connect(lambda _, source=job["source"], job_id=job["id"]:
+                                       self.cancel_requested.emit(source, job_id))
+                self.setCellWidget(row, 4, button)
@@ -0,0 +1,112 @@
+import time
+import sqlite3
+import threading
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QLabel, QComboBox, QTableWidget, QTableWidgetItem, QHeaderView, QCheckBox
+from PyQt5.QtCore import pyqtSignal
+from core.log_index import LogIndex, parse_when
+
+MAX_RESULTS = 500
+SINCE_CHOICES = (("Any time", None), ("Last hour", "1h"), ("Last 24 hours", "1d"), ("Last 7 days", "7d"), ("Last 30 days", "30d"))
+LEVEL_CHOICES = ("Any level", "WARN", "ERROR", "INFO")
+
+class LogSearchWidget(QWidget):
+    # Searches every server's logs through the on-disk index. Indexing and
+    # queries run on a worker thread (each with its own SQLite connection);
+    # results come back through signals.
+    results_ready = pyqtSignal(int, list, float)
+    indexed = pyqtSignal(str)
+    failed = pyqtSignal(int, str)
+
+    def __init__(self, servers_dir, servers):
+        super().__init__()
+        self.servers_dir = servers_dir
+        self.generation = 0  # results from superseded searches are dropped
+        self.setWindowTitle("Search Logs")
+        self.resize(1000, 550)
+
+        self.query_input = QLineEdit()
+        self.query_input.setPlaceholderText("Text to find, e.g. Can't keep up")
+        self.fts_check = QCheckBox("FTS syntax")
+        self.fts_check.setToolTip("AND, OR, NOT, \"phrases\" and prefix* instead of a plain phrase")
+        self.server_combo = QComboBox()
+        self.server_combo.addItem("All servers")
+        self.server_combo.addItems(sorted(servers))
+        self.since_combo = QComboBox()
+        for label, _ in SINCE_CHOICES:
+            self.since_combo.addItem(label)
+        self.level_combo = QComboBox()
+        self.level_combo.addItems(LEVEL_CHOICES)
+        self.search_button = QPushButton("Search")
+        self.status_label = QLabel("Indexing logs...")
+
+        self.results = QTableWidget(0, 4)
+        self.results.setHorizontalHeaderLabels(["Time", "Server", "Level", "Line"])
+        self.results.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
+        self.results.verticalHeader().setVisible(False)
+        self.results.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.results.setWordWrap(False)
+
+        self.query_input.returnPressed.connect(self.search)
+        self.search_button.clicked.connect(self.search)
+        self.results_ready.connect(self.show_results)
+        self.indexed.connect(self.status_label.setText)
+        self.failed.connect(self.on_failed)
+
+        query_layout = QHBoxLayout()
+        query_layout.addWidget(self.query_input)
+        query_layout.addWidget(self.fts_check)
+        query_layout.addWidget(self.server_combo)
+        query_layout.addWidget(self.since_combo)
+        query_layout.addWidget(self.level_combo)
+        query_layout.addWidget(self.search_button)
+        layout = QVBoxLayout()
+        layout.addLayout(query_layout)
+        layout.addWidget(self.results)
+        layout.addWidget(self.status_label)
+        self.setLayout(layout)
+
+    def search(self):
+        # Every search first picks up log lines written since the last one
+        # (cheap: only new bytes of latest.log and new archives are read).
+        self.generation += 1
+        server = self.server_combo.currentText() if self.server_combo.currentIndex() else None
+        level = self.level_combo.currentText() if self.level_combo.currentIndex() else None
+        text = self.query_input.text().strip() or None
+        query = {
+            "text": None if self.fts_check.isChecked() else text,
+            "match": text if self.fts_check.isChecked() else None,
+            "servers": [server] if server else None,
+            "since": parse_when(SINCE_CHOICES[self.since_combo.currentIndex()][1]),
+            "levels": [level] if level else None,
+            "limit": MAX_RESULTS,
+        }
+        self.status_label.setText("Searching...")
+        threading.Thread(target=self._run, args=(self.generation, query), daemon=True).start()
+
+    def _run(self, generation, query):
+        try:
+            with LogIndex() as index:
+                report = index.update(self.servers_dir)
+                if report["lines"]:
+                    self.indexed.emit(f"Indexed {report['lines']} new lines in {report['seconds']:.2f}s")
+                started = time.perf_counter()
+                rows = index.search(**query)
+                self.results_ready.emit(generation, rows, time.perf_counter() - started)
+        except (ValueError, OSError, sqlite3.Error) as e:
+            self.failed.emit(generation, str(e))
+
+    def show_results(self, generation, rows, elapsed):
+        if generation != self.generation:
+            return
+        self.results.setRowCount(len(rows))
+        for row, result in enumerate(rows):
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(result["time"]))
+            for column, value in enumerate((stamp, result["server"], result["level"] or "", result["text"])):
+                self.results.setItem(row, column, QTableWidgetItem(value))
+        self.results.resizeColumnsToContents()
+        more = " (showing the newest)" if len(rows) == MAX_RESULTS else ""
+        self.status_label.setText(f"{len(rows)} results in {elapsed * 1000:.1f} ms{more}")
+
+    def on_failed(self, generation, message):
+        if generation == self.generation:
+            self.status_label.setText(f"Search failed: {message}")
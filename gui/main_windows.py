@@ -1,6 +1,8 @@
-from PyQt5.QtWidgets import QApplication, QMainWindow, QPushButton, QVBoxLayout, QWidget, QListWidget, QMessageBox
+from PyQt5.QtWidgets import QApplication, QMainWindow, QPushButton, QVBoxLayout, QWidget, QTableView, QAbstractItemView, QMessageBox
 from PyQt5.QtGui import QIcon
 from core.server_manager import ServerManager
+from core.inventory import Inventory
+from gui.server_model import ServerTableModel
 import os
 
 icon_path = os.path.abspath("assets/icons/favicon.ico")
@@ -12,29 +14,43 @@ class MainWindow(QMainWindow):
         self.setGeometry(200, 200, 600, 400)
         self.setWindowIcon(QIcon(icon_path))
         self.manager = ServerManager()
+        self.inventory = Inventory(self.manager.server_path)
+        self.inventory.refresh(measure=False)
         self.init_ui()
+        self.inventory.start()
 
     def init_ui(self):
-        self.list_widget = QListWidget()
-        self.refresh_servers()
+        self.server_model = ServerTableModel(self.inventory)
+        self.server_view = QTableView()
+        self.server_view.setModel(self.server_model)
+        self.server_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.server_view.verticalHeader().setVisible(False)
+        self.server_view.horizontalHeader().setStretchLastSection(True)
 
         self.create_button = QPushButton("Create Server")
         self.create_button.clicked.connect(self.create_server)
 
         layout = QVBoxLayout()
-        layout.addWidget(self.list_widget)
+        layout.addWidget(self.server_view)
         layout.addWidget(self.create_button)
 
         container = QWidget()
         container.setLayout(layout)
         self.setCentralWidget(container)
 
-    def refresh_servers(self):
-        self.list_widget.clear()
-        for server in self.manager.list_servers():
-            self.list_widget.addItem(server)
-
     def create_server(self):
-        self.manager.create_server(f"Server_{len(self.manager.list_servers())+1}")
-        self.refresh_servers()
+        starters = sorted(path.name for path in self.manager.starters_path.glob("*.jar"))
+        if not starters:
+            QMessageBox.warning(self, "No starter", f"Put a server jar in {self.manager.starters_path} first.")
+            return
+        names = set(self.inventory.names())
+        number = len(names) + 1
+        while f"Server_{number}" in names:
+            number += 1
+        self.manager.create_server(f"Server_{number}", starters[0])
+        self.inventory.invalidate()
         QMessageBox.information(self, "Success", "New server created!")
+
+    def closeEvent(self, event):
+        self.inventory.stop()
+        super().closeEvent(event)
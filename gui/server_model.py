@@ -0,0 +1,95 @@
+from bisect import bisect_left
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+
+COLUMNS = ("Name", "State", "PID", "Loader", "Version", "Disk")
+BULK_ROWS = 50  # adding more rows than this at once resets the model instead
+
+def format_bytes(size):
+    if size is None:
+        return "..."
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+class ServerTableModel(QAbstractTableModel):
+    # Rows mirror core.inventory.Inventory, sorted by name. The inventory's
+    # threads deliver diffs through a signal; only the rows that changed are
+    # inserted, removed or repainted.
+    diff_received = pyqtSignal(dict, dict, list)
+
+    def __init__(self, inventory):
+        super().__init__()
+        self.names = []
+        self.entries = {}
+        self.diff_received.connect(self.apply)
+        # Subscribe first: a diff queued meanwhile is applied again harmlessly
+        self.unsubscribe = inventory.subscribe(self.diff_received.emit)
+        self.apply(inventory.snapshot(), {}, [])
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.names)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        entry = self.entries[self.names[index.row()]]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return entry["name"]
+            if column == 1:
+                return entry["state"]
+            if column == 2:
+                return str(entry["pid"]) if entry["pid"] else ""
+            if column == 3:
+                return entry["loader"] or ""
+            if column == 4:
+                return entry["version"] or ""
+            return format_bytes(entry["disk_bytes"])
+        if role == Qt.TextAlignmentRole and column in (2, 5):
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def name_at(self, row):
+        return self.names[row] if 0 <= row < len(self.names) else None
+
+    def row_of(self, name):
+        row = bisect_left(self.names, name)
+        return row if row < len(self.names) and self.names[row] == name else -1
+
+    def apply(self, added, changed, removed):
+        for name in removed:
+            row = self.row_of(name)
+            if row >= 0:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self.names[row]
+                del self.entries[name]
+                self.endRemoveRows()
+        if len(added) > BULK_ROWS:
+            self.beginResetModel()
+            self.entries.update(added)
+            self.names = sorted(self.entries)
+            self.endResetModel()
+            added = {}
+        for name, entry in added.items():
+            if name in self.entries:
+                changed = {**changed, name: entry}
+                continue
+            row = bisect_left(self.names, name)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.names.insert(row, name)
+            self.entries[name] = entry
+            self.endInsertRows()
+        for name, entry in changed.items():
+            row = self.row_of(name)
+            if row >= 0:
+                self.entries[name] = entry
+                self.dataChanged.emit(self.index(row, 0), self.index(row, len(COLUMNS) - 1))
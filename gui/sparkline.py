@@ -0,0 +1,30 @@
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtGui import QPainter, QPen, QColor, QPolygonF
+from PyQt5.QtCore import QPointF
+
+class Sparkline(QWidget):
+    def __init__(self, color="#4aa3df", maximum=None):
+        super().__init__()
+        self.values = []
+        self.color = QColor(color)
+        self.maximum = maximum  # fixed scale (e.g. 100 for CPU%) or auto
+        self.setMinimumSize(120, 24)
+
+    def set_values(self, values):
+        self.values = values
+        self.update()
+
+    def paintEvent(self, event):
+        if len(self.values) < 2:
+            return
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(self.color, 1.5))
+        w, h = self.width() - 2, self.height() - 2
+        top = self.maximum or max(self.values) or 1.0
+        step = w / (len(self.values) - 1)
+        points = QPolygonF([
+            QPointF(1 + i * step, 1 + h - min(v, top) / top * h)
+            for i, v in enumerate(self.values)
+        ])
+        painter.drawPolyline(points)
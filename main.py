@@ -2,42 +2,91 @@
 # Full Moonlight Minecraft Server Manager Implementation
 
 import os
-import subprocess
-import json
-import shutil
+import threading
 import psutil
-import requests
-from datetime import datetime
 from pathlib import Path
-from PyQt5.QtWidgets import QApplication, QMainWindow, QPushButton, QVBoxLayout, QWidget, QListWidget, QMessageBox, QLabel, QHBoxLayout, QLineEdit, QDialog, QFormLayout, QComboBox
-from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication, QMainWindow, QPushButton, QVBoxLayout, QWidget, QTableView, QAbstractItemView, QMessageBox, QLabel, QHBoxLayout, QLineEdit, QDialog, QFormLayout, QComboBox, QGridLayout, QInputDialog
+from PyQt5.QtCore import Qt, QTimer, QFileSystemWatcher, pyqtSignal
+from core.config import load_config
+from core.plugin_manager import PluginManager
+from core.provisioning import Provisioner
+from core.inventory import Inventory
+from core.maintenance import MaintenanceScheduler
+from core.properties import PRESETS, apply_changes, load_properties, preset_changes
+from core.logs import GUI_JSON_NAME, GUI_LOG_NAME, setup_logging
+from core.supervisor_client import SupervisorClient, SupervisorError, RemoteConsole
+from gui.console_widget import ConsoleWidget
+from gui.server_model import ServerTableModel
+from gui.log_search import LogSearchWidget
+from gui.jobs_widget import JobsWidget
+from gui.sparkline import Sparkline
 
 # --- Configuration ---
 SERVERS_DIR = Path("servers")
 TEMPLATES_DIR = Path("assets/templates")
 STARTERS_DIR = Path("assets/Server Starters")
+GC_POLL_BYTES = 4 * 1024 * 1024
 
 # --- Server Manager ---
 class ServerManager:
     def __init__(self):
         self.server_path = SERVERS_DIR
-        self.processes = {}  # name -> Popen
+        self.client = SupervisorClient.connect()
+        # Lag checks come from maintenance workers; their own connection
+        # keeps them from queueing ahead of GUI calls on self.client
+        self.worker_client = self.client.clone()
+        self.provisioner = Provisioner(SERVERS_DIR, STARTERS_DIR)
         os.makedirs(self.server_path, exist_ok=True)
+        # Listing now, sizes and running state once start_inventory() runs
+        self.inventory = Inventory(self.server_path)
+        self.inventory.refresh(measure=False)
+        # Provisioning and downloads run here, backups on the daemon's scheduler
+        self.scheduler = MaintenanceScheduler.from_config(load_config(), self.lagging_servers)
+        self.scheduler.start()
+
+    def start_inventory(self):
+        self.inventory.start(lambda: SupervisorClient.connect(spawn=False))
 
     def list_servers(self):
-        return [f for f in os.listdir(self.server_path) if os.path.isdir(self.server_path / f)]
+        return self.inventory.names()
 
     def list_templates(self):
         return [f.name for f in STARTERS_DIR.glob("*.jar")]
 
+    # Disk-heavy work is queued as maintenance jobs; each returns a Job whose
+    # .future resolves to the result.
     def create_server(self, name, starter_jar):
-        new_path = self.server_path / name
-        os.makedirs(new_path, exist_ok=True)
-        shutil.copy(STARTERS_DIR / starter_jar, new_path / "server.jar")
-        with open(new_path / "server.properties", "w") as f:
-            f.write("motd=Welcome to Moonlight Server\nmax-players=20\n")
-        with open(new_path / "config.json", "w") as f:
-            json.dump({"starter": starter_jar}, f)
+        return self.scheduler.submit(f"Create {name}", lambda job: self.provisioner.provision(name, starter_jar),
+                                     kind="create", server=name, priority="normal")
+
+    def create_servers(self, starter_jar, names):
+        return self.scheduler.submit(f"Create {len(names)} servers",
+                                     lambda job: self.provisioner.create_servers(starter_jar, names),
+                                     kind="create", priority="normal")
+
+    def install_plugins(self, name, urls):
+        return self.scheduler.submit(f"Plugins for {name}",
+                                     lambda job: PluginManager(self.server_path / name).install_plugins(urls),
+                                     kind="plugins", server=name)
+
+    def backup_server(self, name, mode="archive"):
+        return self.client.backup(name, mode, wait=False)
+
+    def jobs(self):
+        jobs = [{**job, "source": "local"} for job in self.scheduler.list()]
+        jobs += [{**job, "source": "daemon"} for job in self.client.jobs()["jobs"]]
+        return sorted(jobs, key=lambda job: job["created"])
+
+    def cancel_job(self, source, job_id):
+        if source == "local":
+            self.scheduler.cancel(job_id)
+        else:
+            self.client.cancel_job(job_id)
+
+    def lagging_servers(self):
+        # Called from maintenance workers, which share worker_client
+        return [name for name, status in self.worker_client.health()["servers"].items()
+                if status and status["state"] == "lagging"]
 
     def edit_server(self, old_name, new_name):
         old_path = self.server_path / old_name
@@ -47,80 +96,45 @@ class ServerManager:
             return True
         return False
 
-    def update_settings(self, name, motd, max_players):
-        props_path = self.server_path / name / "server.properties"
-        lines = []
-        if props_path.exists():
-            with open(props_path, "r") as f:
-                for line in f:
-                    if line.startswith("motd="):
-                        lines.append(f"motd={motd}\n")
-                    elif line.startswith("max-players="):
-                        lines.append(f"max-players={max_players}\n")
-                    else:
-                        lines.append(line)
-        else:
-            lines = [f"motd={motd}\n", f"max-players={max_players}\n"]
-        with open(props_path, "w") as f:
-            f.writelines(lines)
+    def properties(self, name):
+        return load_properties(self.server_path / name)
+
+    def update_settings(self, name, motd, max_players, preset=None):
+        # Validated, comment-preserving, atomic; raises ValueError on bad values
+        changes = preset_changes(preset) if preset else {}
+        changes.update({"motd": motd, "max-players": max_players})
+        report = apply_changes([self.server_path / name], changes)[0]
+        if "error" in report:
+            raise OSError(report["error"])
+        return report
+
+    # Processes belong to the supervisor daemon, so closing the GUI leaves
+    # servers running; these are thin wrappers over its API.
+    def running_servers(self):
+        return {s["name"]: s for s in self.client.list() if s["state"] != "exited"}
+
+    def _control(self, op, *args):
+        # A stop can take over a minute; its own connection keeps the
+        # metrics and jobs polling on self.client from queueing behind it
+        client = self.client.clone()
+        try:
+            return getattr(client, op)(*args)
+        finally:
+            client.close()
 
     def start_server(self, name):
-        server_dir = self.server_path / name
-        jar_path = server_dir / "server.jar"
-        if not jar_path.exists():
-            raise FileNotFoundError("server.jar not found")
-        ram_mb = get_optimal_ram()
-        flags = get_optimized_flags(ram_mb)
-        cmd = ["java"] + flags + ["-jar", "server.jar", "nogui"]
-        proc = subprocess.Popen(cmd, cwd=server_dir)
-        self.processes[name] = proc
+        self._control("start", name)
+        return self.console(name)
+
+    def console(self, name):
+        return RemoteConsole(self.client, name)
 
     def stop_server(self, name):
-        proc = self.processes.get(name)
-        if proc:
-            proc.terminate()
-            proc.wait()
-            del self.processes[name]
-
-# --- Performance Tuning ---
-def get_optimal_ram():
-    total = psutil.virtual_memory().total // (1024 * 1024)
-    return max(1024, int(total * 0.5))
-
-def get_optimized_flags(ram_mb):
-    return [
-        f"-Xms{ram_mb}M",
-        f"-Xmx{ram_mb}M",
-        "-XX:+UseG1GC",
-        "-XX:+ParallelRefProcEnabled",
-        "-XX:MaxGCPauseMillis=200"
-    ]
-
-# --- Backup Manager ---
-def backup_server(server_dir):
-    if not os.path.exists(server_dir):
-        raise FileNotFoundError("Server directory not found")
-    backup_dir = f"{server_dir}_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    shutil.copytree(server_dir, backup_dir)
-    return backup_dir
-
-# --- Plugin Manager ---
-class PluginManager:
-    def __init__(self, server_dir):
-        self.plugins_dir = Path(server_dir) / "plugins"
-        os.makedirs(self.plugins_dir, exist_ok=True)
-
-    def install_plugin(self, plugin_url):
-        filename = plugin_url.split("/")[-1]
-        response = requests.get(plugin_url)
-        with open(self.plugins_dir / filename, "wb") as f:
-            f.write(response.content)
-
-    def list_plugins(self):
-        return os.listdir(self.plugins_dir)
-
-    def remove_plugin(self, name):
-        os.remove(self.plugins_dir / name)
+        return self._control("stop", name)
+
+    def metrics(self, seconds):
+        # Bounded GC log read per refresh so a large backlog can't stall the GUI
+        return self.client.metrics(seconds=seconds, gc_bytes=GC_POLL_BYTES)
 
 # --- GUI ---
 class EditServerDialog(QDialog):
@@ -142,18 +156,30 @@ class SettingsDialog(QDialog):
         self.setWindowTitle("Server Settings")
         self.name = server_name
         self.manager = manager
-        self.motd = QLineEdit()
-        self.max_players = QLineEdit("20")
+        props = manager.properties(server_name)
+        self.motd = QLineEdit(props.get("motd", "A Minecraft Server"))
+        self.max_players = QLineEdit(props.get("max-players", "20"))
+        self.preset_box = QComboBox()
+        self.preset_box.addItem("(keep current)")
+        for preset, (description, _) in PRESETS.items():
+            self.preset_box.addItem(preset)
+            self.preset_box.setItemData(self.preset_box.count() - 1, description, Qt.ToolTipRole)
         layout = QFormLayout()
         layout.addRow("MOTD:", self.motd)
         layout.addRow("Max Players:", self.max_players)
+        layout.addRow("Performance preset:", self.preset_box)
         self.ok_button = QPushButton("Save")
         self.ok_button.clicked.connect(self.save)
         layout.addWidget(self.ok_button)
         self.setLayout(layout)
 
     def save(self):
-        self.manager.update_settings(self.name, self.motd.text(), self.max_players.text())
+        preset = self.preset_box.currentText() if self.preset_box.currentIndex() else None
+        try:
+            self.manager.update_settings(self.name, self.motd.text(), self.max_players.text(), preset)
+        except (ValueError, OSError) as e:
+            QMessageBox.warning(self, "Invalid settings", str(e))
+            return
         self.accept()
 
 class CreateServerDialog(QDialog):
@@ -161,6 +187,7 @@ class CreateServerDialog(QDialog):
         super().__init__()
         self.setWindowTitle("Create Server")
         self.name_input = QLineEdit("MyServer")
+        self.name_input.setToolTip("Several names separated by commas create one server each")
         self.template_box = QComboBox()
         for t in manager.list_templates():
             self.template_box.addItem(t)
@@ -173,36 +200,77 @@ class CreateServerDialog(QDialog):
         self.setLayout(layout)
 
 class MainWindow(QMainWindow):
+    server_ready = pyqtSignal(str, float)
+    server_created = pyqtSignal(str, str)  # name, error ("" on success)
+    plugins_installed = pyqtSignal(str, object, object)  # name, results, error
+    call_finished = pyqtSignal(object, object, object)  # callback, result, error
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Moonlight Server Manager")
         self.setGeometry(200, 200, 800, 500)
 
         self.manager = ServerManager()
+        self.consoles = {}  # name -> RemoteConsole
+        self.console_windows = {}  # name -> ConsoleWidget
+        self.log_search_window = None
+        self.metric_rows = {}  # name -> (cpu sparkline, ram sparkline, label)
+        self.polling = False
+        self.poll_again = False
+        self.server_ready.connect(self.on_server_ready)
+        self.server_created.connect(self.on_server_created)
+        self.plugins_installed.connect(self.on_plugins_installed)
+        self.call_finished.connect(lambda callback, result, error: callback(result, error))
         self.init_ui()
         self.start_monitor_timer()
 
     def init_ui(self):
-        self.list_widget = QListWidget()
+        self.server_model = ServerTableModel(self.manager.inventory)
+        self.server_view = QTableView()
+        self.server_view.setModel(self.server_model)
+        self.server_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.server_view.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.server_view.verticalHeader().setVisible(False)
+        self.server_view.horizontalHeader().setStretchLastSection(True)
         self.status_label = QLabel("System Monitor")
+        self.log_search_input = QLineEdit()
+        self.log_search_input.setPlaceholderText("Search all server logs (Enter)")
+        self.log_search_input.returnPressed.connect(self.open_log_search)
 
-        self.refresh_servers()
+        # Directory changes wake the inventory early instead of waiting for its next sweep
+        self.watcher = QFileSystemWatcher([str(self.manager.server_path)])
+        self.watcher.directoryChanged.connect(self.manager.inventory.invalidate)
+        self.server_model.diff_received.connect(self.sync_watches)
+        self.sync_watches(self.manager.inventory.snapshot(), {}, [])
+        self.manager.start_inventory()
 
         self.create_button = QPushButton("Create Server")
         self.edit_button = QPushButton("Edit Selected")
         self.settings_button = QPushButton("Settings")
         self.start_button = QPushButton("Start Selected")
         self.stop_button = QPushButton("Stop Selected")
+        self.console_button = QPushButton("Console")
+        self.backup_button = QPushButton("Backup Selected")
+        self.plugins_button = QPushButton("Install Plugins")
 
         self.create_button.clicked.connect(self.create_server)
         self.edit_button.clicked.connect(self.edit_selected)
         self.settings_button.clicked.connect(self.open_settings)
         self.start_button.clicked.connect(self.start_selected)
         self.stop_button.clicked.connect(self.stop_selected)
+        self.console_button.clicked.connect(self.open_console)
+        self.backup_button.clicked.connect(self.backup_selected)
+        self.plugins_button.clicked.connect(self.install_plugins)
+        self.jobs_view = JobsWidget()
+        self.jobs_view.cancel_requested.connect(self.cancel_job)
 
         layout = QVBoxLayout()
-        layout.addWidget(self.list_widget)
+        layout.addWidget(self.log_search_input)
+        layout.addWidget(self.server_view)
         layout.addWidget(self.status_label)
+        self.metrics_layout = QGridLayout()
+        layout.addLayout(self.metrics_layout)
+        layout.addWidget(self.jobs_view)
 
         btn_layout = QHBoxLayout()
         btn_layout.addWidget(self.create_button)
@@ -210,6 +278,9 @@ class MainWindow(QMainWindow):
         btn_layout.addWidget(self.settings_button)
         btn_layout.addWidget(self.start_button)
         btn_layout.addWidget(self.stop_button)
+        btn_layout.addWidget(self.console_button)
+        btn_layout.addWidget(self.backup_button)
+        btn_layout.addWidget(self.plugins_button)
 
         layout.addLayout(btn_layout)
 
@@ -217,48 +288,193 @@ class MainWindow(QMainWindow):
         container.setLayout(layout)
         self.setCentralWidget(container)
 
-    def refresh_servers(self):
-        self.list_widget.clear()
-        for server in self.manager.list_servers():
-            self.list_widget.addItem(server)
+    def sync_watches(self, added, changed, removed):
+        paths = [str(self.manager.server_path / name) for name in added]
+        if paths:
+            self.watcher.addPaths(paths)
+        for name in removed:
+            self.watcher.removePath(str(self.manager.server_path / name))
+
+    def selected_server(self):
+        index = self.server_view.currentIndex()
+        return self.server_model.name_at(index.row()) if index.isValid() else None
 
     def create_server(self):
         dialog = CreateServerDialog(self.manager)
         if dialog.exec_():
-            name = dialog.name_input.text()
+            names = [n.strip() for n in dialog.name_input.text().split(",") if n.strip()]
             starter = dialog.template_box.currentText()
-            self.manager.create_server(name, starter)
-            self.refresh_servers()
+            if len(names) == 1:
+                name = names[0]
+                job = self.manager.create_server(name, starter)
+                job.future.add_done_callback(lambda future: self.server_created.emit(name, str(future.exception() or "")))
+            elif names:
+                name = ", ".join(names)
+                job = self.manager.create_servers(starter, names)
+                job.future.add_done_callback(lambda future: self.server_created.emit(name, self.create_errors(future)))
+            else:
+                return
+            self.statusBar().showMessage(f"Creating '{name}'...")
+            self.update_jobs()
+
+    def create_errors(self, future):
+        # create_servers reports failures per server
+        if future.exception():
+            return str(future.exception())
+        return "; ".join(f"{r['name']}: {r['error']}" for r in future.result() if "error" in r)
+
+    def on_server_created(self, name, error):
+        self.manager.inventory.invalidate()
+        if error:
+            QMessageBox.warning(self, "Create failed", f"Could not create '{name}': {error}")
+        else:
             QMessageBox.information(self, "Success", f"Created server '{name}'")
 
     def edit_selected(self):
-        item = self.list_widget.currentItem()
-        if item:
-            current_name = item.text()
+        current_name = self.selected_server()
+        if current_name:
             dialog = EditServerDialog(current_name)
             if dialog.exec_():
                 new_name = dialog.new_name.text().strip()
                 if new_name and self.manager.edit_server(current_name, new_name):
-                    self.refresh_servers()
+                    self.manager.inventory.invalidate()
                     QMessageBox.information(self, "Renamed", f"Server renamed to '{new_name}'")
                 else:
                     QMessageBox.warning(self, "Error", "Rename failed.")
 
     def open_settings(self):
-        item = self.list_widget.currentItem()
-        if item:
-            dialog = SettingsDialog(item.text(), self.manager)
+        name = self.selected_server()
+        if name:
+            dialog = SettingsDialog(name, self.manager)
             dialog.exec_()
 
+    # Daemon calls that can take a while run on a thread; `callback(result,
+    # error)` is called back on the GUI thread.
+    def in_background(self, function, callback):
+        def run():
+            try:
+                result, error = function(), None
+            except Exception as e:
+                result, error = None, e
+            self.call_finished.emit(callback, result, error)
+        threading.Thread(target=run, daemon=True).start()
+
     def start_selected(self):
-        item = self.list_widget.currentItem()
-        if item:
-            self.manager.start_server(item.text())
+        name = self.selected_server()
+        if name:
+            self.statusBar().showMessage(f"Starting '{name}'...")
+            self.in_background(lambda: self.manager.start_server(name),
+                               lambda console, error: self.on_started(name, console, error))
+
+    def on_started(self, name, console, error):
+        if isinstance(error, SupervisorError):
+            title = "Not enough memory" if error.kind == "OvercommitError" else "Start failed"
+            QMessageBox.warning(self, title, str(error))
+            return
+        if error is not None:
+            QMessageBox.warning(self, "Start failed", f"Could not start '{name}': {error}")
+            return
+        self.consoles[name] = console
+        console.on_ready(lambda t: self.server_ready.emit(name, t or 0.0))
+
+    def backup_selected(self):
+        name = self.selected_server()
+        if name:
+            self.in_background(lambda: self.manager.backup_server(name),
+                               lambda job, error: self.on_backup_queued(name, job, error))
+
+    def on_backup_queued(self, name, job, error):
+        if error is not None:
+            QMessageBox.warning(self, "Backup failed", str(error))
+            return
+        self.statusBar().showMessage(f"Backup of '{name}' queued (job {job['id']})", 10000)
+        self.update_jobs()
+
+    def install_plugins(self):
+        name = self.selected_server()
+        if name:
+            text, ok = QInputDialog.getMultiLineText(self, "Install Plugins", f"Plugin URLs for '{name}', one per line:")
+            urls = [line.strip() for line in text.splitlines() if line.strip()]
+            if ok and urls:
+                job = self.manager.install_plugins(name, urls)
+                job.future.add_done_callback(
+                    lambda future: self.plugins_installed.emit(name, None if future.exception() else future.result(),
+                                                               future.exception()))
+                self.statusBar().showMessage(f"Installing {len(urls)} plugins on '{name}'...")
+                self.update_jobs()
+
+    def on_plugins_installed(self, name, results, error):
+        failed = [f"{r['url']}: {r['error']}" for r in results or [] if "error" in r]
+        if error is not None:
+            failed = [str(error)]
+        if failed:
+            QMessageBox.warning(self, "Plugins", f"Plugin install on '{name}' failed:\n" + "\n".join(failed))
+        else:
+            self.statusBar().showMessage(f"Installed {len(results)} plugins on '{name}'", 10000)
+
+    def cancel_job(self, source, job_id):
+        self.in_background(lambda: self.manager.cancel_job(source, job_id),
+                           lambda _, error: self.on_job_cancelled(job_id, error))
+
+    def on_job_cancelled(self, job_id, error):
+        if error is not None:
+            self.statusBar().showMessage(f"Could not cancel job {job_id}: {error}", 10000)
+        self.update_jobs()
+
+    def on_server_ready(self, name, startup_time):
+        self.statusBar().showMessage(f"'{name}' is ready (started in {startup_time:.2f}s)", 10000)
+
+    def open_console(self):
+        name = self.selected_server()
+        if name:
+            console = self.consoles.get(name)
+            if console is None or console.exited.is_set():
+                self.in_background(self.manager.running_servers,
+                                   lambda running, error: self.on_console_checked(name, running, error))
+            else:
+                self.show_console(name, console)
+
+    def on_console_checked(self, name, running, error):
+        if error is not None:
+            QMessageBox.warning(self, "Console", f"Supervisor unavailable: {error}")
+            return
+        if name not in running:
+            QMessageBox.warning(self, "Console", f"Server '{name}' is not running.")
+            return
+        # Started elsewhere (CLI or an earlier GUI session)
+        console = self.consoles.get(name)
+        if console is None or console.exited.is_set():
+            console = self.consoles[name] = self.manager.console(name)
+        self.show_console(name, console)
+
+    def show_console(self, name, console):
+        window = self.console_windows.get(name)
+        if window is None or window.console is not console:
+            window = ConsoleWidget(console)
+            self.console_windows[name] = window
+        window.show()
+        window.raise_()
+
+    def open_log_search(self):
+        if self.log_search_window is None:
+            self.log_search_window = LogSearchWidget(self.manager.server_path, self.manager.list_servers())
+        self.log_search_window.query_input.setText(self.log_search_input.text())
+        self.log_search_window.show()
+        self.log_search_window.raise_()
+        self.log_search_window.search()
 
     def stop_selected(self):
-        item = self.list_widget.currentItem()
-        if item:
-            self.manager.stop_server(item.text())
+        name = self.selected_server()
+        if name:
+            self.statusBar().showMessage(f"Stopping '{name}'...")
+            self.in_background(lambda: self.manager.stop_server(name),
+                               lambda info, error: self.on_stopped(name, info, error))
+
+    def on_stopped(self, name, info, error):
+        if error is not None:
+            QMessageBox.warning(self, "Stop failed", f"Could not stop '{name}': {error}")
+            return
+        self.statusBar().showMessage(f"'{name}' stopped in {info['stop_seconds']:.1f}s", 10000)
 
     def start_monitor_timer(self):
         self.timer = QTimer()
@@ -269,9 +485,91 @@ class MainWindow(QMainWindow):
         cpu = psutil.cpu_percent()
         mem = psutil.virtual_memory().percent
         self.status_label.setText(f"CPU: {cpu:.1f}% | RAM: {mem:.1f}%")
+        self.update_jobs()
+
+    def update_jobs(self):
+        # Metrics and jobs come from the daemon on a thread; one poll at a
+        # time, and a request during a poll runs once it returns.
+        if self.polling:
+            self.poll_again = True
+            return
+        self.polling = True
+        self.in_background(self.poll_daemon, self.on_polled)
+
+    def poll_daemon(self):
+        try:
+            metrics = self.manager.metrics(120)
+        except (OSError, SupervisorError) as e:
+            metrics = e
+        try:
+            jobs = self.manager.jobs()
+        except (OSError, SupervisorError):
+            jobs = [{**job, "source": "local"} for job in self.manager.scheduler.list()]
+        return metrics, jobs
+
+    def on_polled(self, result, error):
+        self.polling = False
+        if self.poll_again:
+            self.poll_again = False
+            self.update_jobs()
+        if error is not None:
+            self.statusBar().showMessage(f"Refresh failed: {error}")
+            return
+        metrics, jobs = result
+        self.jobs_view.set_jobs(jobs)
+        if isinstance(metrics, Exception):
+            self.statusBar().showMessage(f"Supervisor unavailable: {metrics}")
+        else:
+            self.update_server_metrics(metrics)
+
+    def update_server_metrics(self, metrics):
+        running = set(metrics)
+        for name in set(self.metric_rows) - running:
+            for widget in self.metric_rows.pop(name):
+                self.metrics_layout.removeWidget(widget)
+                widget.deleteLater()
+        for name in sorted(running):
+            if name not in self.metric_rows:
+                row = (QLabel(name), Sparkline("#4aa3df", maximum=100 * (os.cpu_count() or 1)), Sparkline("#e0a040"), QLabel())
+                index = self.metrics_layout.rowCount()
+                for column, widget in enumerate(row):
+                    self.metrics_layout.addWidget(widget, index, column)
+                self.metric_rows[name] = row
+            _, cpu_sparkline, ram_sparkline, label = self.metric_rows[name]
+            entry = metrics[name]
+            cpu_sparkline.set_values(entry["cpu"])
+            ram_sparkline.set_values(entry["rss"])
+            latest = entry["latest"]
+            if latest:
+                p95 = entry["cpu_p95"]
+                text = (
+                    f"CPU {latest['cpu']:.0f}% (p95 {p95:.0f}%) | RAM {latest['rss'] / 2**20:.0f} MB | "
+                    f"{latest['threads']:.0f} threads | {latest['fds']:.0f} fds"
+                )
+                gc = entry["gc"]
+                if gc["pauses"]:
+                    text += (
+                        f" | GC p99 {gc['pause_p99_ms']:.0f} ms, max {gc['pause_max_ms']:.0f} ms, "
+                        f"alloc {gc['alloc_rate_mb_s']:.0f} MB/s, heap {gc['heap_after_mb']:.0f} MB "
+                        f"({gc['heap_trend_mb_min']:+.0f}/min)"
+                    )
+                health = entry.get("health")
+                if health and health["state"] != "healthy":
+                    text = f"[{health['state'].upper()}] " + text
+                label.setText(text)
+
+    def closeEvent(self, event):
+        # Servers keep running under the supervisor
+        self.manager.inventory.stop()
+        self.manager.scheduler.stop()
+        self.manager.client.close()
+        self.manager.worker_client.close()
+        super().closeEvent(event)
 
 # --- Main Entry Point ---
 def main():
+    # The daemon writes manager.log and the per-server logs
+    setup_logging(log_name=GUI_LOG_NAME, json_name=GUI_JSON_NAME, per_server=False)
     app = QApplication([])
     window = MainWindow()
     window.show()